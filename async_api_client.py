@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站视频字幕提取工具 - 异步HTTP接口客户端
+作者: wjm
+版本: v2.0.0
+
+功能说明:
+- 基于 asyncio 的接口客户端，用于批量获取视频信息和字幕JSON（数千个BV号并发请求）
+- 连接池有上限并保持长连接；安装 h2 时启用HTTP/2（同一主机的请求复用一条连接）
+- 每个请求单独设置超时，网络错误和5xx响应按退避重试
+- 统计请求数、失败数、字节数、延迟分位数和吞吐
+
+用法示例:
+    async with AsyncApiClient(headers=session.headers, max_connections=32) as client:
+        data = await client.get_json('https://api.bilibili.com/x/web-interface/view', {'bvid': bvid})
+    print(client.summary())
+
+依赖:
+- httpx（推荐）: pip install httpx；启用HTTP/2: pip install "httpx[http2]"
+- 或 aiohttp（仅HTTP/1.1）: pip install aiohttp
+"""
+
+import asyncio
+import json
+import time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def require_async_http():
+    """检查可选依赖 httpx / aiohttp"""
+    if httpx is None and aiohttp is None:
+        raise ImportError("异步接口客户端需要 httpx 或 aiohttp 库，请安装: pip install httpx")
+
+
+class AsyncApiClient:
+    """异步HTTP客户端 - 有上限的连接池、长连接、可用时启用HTTP/2，并记录每个请求的耗时"""
+
+    def __init__(self, headers=None, cookies=None, max_connections=32, timeout=10, http2=True,
+                 retries=2, backend=None):
+        """
+        Args:
+            headers: 公共请求头（如 requests.Session 的 headers）
+            cookies: 公共Cookie {name: value}
+            max_connections: 连接池上限，同时也是同时进行的请求数上限
+            timeout: 每个请求的超时（秒），get_json 可单独指定
+            http2: 是否尝试HTTP/2（仅 httpx 且安装了 h2 时生效）
+            retries: 网络错误、超时和5xx响应的重试次数
+            backend: 'httpx' 或 'aiohttp'，默认优先 httpx
+        """
+        require_async_http()
+        self.backend = backend or ('httpx' if httpx is not None else 'aiohttp')
+        # 压缩方式交给HTTP库协商（未安装 brotli 时不能声明 br）
+        self.headers = {key: value for key, value in dict(headers or {}).items()
+                        if key.lower() not in ('accept-encoding', 'connection')}
+        self.cookies = dict(cookies or {})
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.http2 = http2
+        self.retries = retries
+        self.client = None
+        self.semaphore = None
+        self.latencies = []
+        self.stats = {'requests': 0, 'failures': 0, 'retries': 0, 'bytes': 0, 'http_versions': {}}
+        self.started_at = None
+        self.finished_at = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """创建连接池（需在事件循环中调用）"""
+        self.semaphore = asyncio.Semaphore(self.max_connections)
+        if self.backend == 'httpx':
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401  httpx 的HTTP/2支持依赖 h2
+                except ImportError:
+                    http2 = False
+            self.http2 = http2
+            self.client = httpx.AsyncClient(
+                headers=self.headers, cookies=self.cookies, http2=http2, follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections, keepalive_expiry=30),
+                timeout=self.timeout
+            )
+        else:
+            self.http2 = False
+            self.client = aiohttp.ClientSession(
+                headers=self.headers, cookies=self.cookies,
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            )
+        self.started_at = time.perf_counter()
+
+    async def close(self):
+        if self.client is None:
+            return
+        if self.backend == 'httpx':
+            await self.client.aclose()
+        else:
+            await self.client.close()
+        self.client = None
+        self.finished_at = time.perf_counter()
+
+    async def get_json(self, url, params=None, timeout=None):
+        """GET请求并解析JSON
+
+        Raises:
+            Exception: 重试后仍然超时、网络错误或HTTP状态码不是2xx
+        """
+        timeout = timeout or self.timeout
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                start = time.perf_counter()
+                try:
+                    status, body, version = await asyncio.wait_for(self.fetch(url, params, timeout), timeout)
+                except (asyncio.TimeoutError, OSError) as e:
+                    error = f"请求超时或连接失败: {type(e).__name__} {url}"
+                    status = None
+                except Exception as e:
+                    if not self.is_network_error(e):
+                        raise
+                    error = f"请求失败: {type(e).__name__} {url}"
+                    status = None
+                self.latencies.append(time.perf_counter() - start)
+                self.stats['requests'] += 1
+
+            if status is not None:
+                self.stats['bytes'] += len(body)
+                self.stats['http_versions'][version] = self.stats['http_versions'].get(version, 0) + 1
+                if 200 <= status < 300:
+                    return self.parse_json(body, url)
+                error = f"HTTP {status}: {url}"
+                if status < 500 and status != 429:
+                    self.stats['failures'] += 1
+                    raise Exception(error)
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        self.stats['failures'] += 1
+        raise Exception(error)
+
+    async def fetch(self, url, params, timeout):
+        """发送请求，返回 (状态码, 响应体, HTTP版本)"""
+        if self.backend == 'httpx':
+            response = await self.client.get(url, params=params, timeout=timeout)
+            return response.status_code, response.content, response.http_version
+        async with self.client.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            body = await response.read()
+            return response.status, body, f"HTTP/{response.version.major}.{response.version.minor}"
+
+    def is_network_error(self, error):
+        if self.backend == 'httpx':
+            return isinstance(error, httpx.TransportError)
+        return isinstance(error, aiohttp.ClientError)
+
+    @staticmethod
+    def parse_json(body, url):
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise Exception(f"响应不是JSON: {url}")
+
+    def throughput(self):
+        """吞吐统计 {'requests', 'failures', 'retries', 'seconds', 'rps', 'mb_per_s', 'p50_ms', 'p95_ms'}"""
+        end = self.finished_at or time.perf_counter()
+        seconds = max(end - self.started_at, 1e-9) if self.started_at else 0
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+        return {
+            'requests': self.stats['requests'],
+            'failures': self.stats['failures'],
+            'retries': self.stats['retries'],
+            'seconds': seconds,
+            'rps': self.stats['requests'] / seconds if seconds else 0.0,
+            'mb_per_s': self.stats['bytes'] / 1048576 / seconds if seconds else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+    def summary(self):
+        figures = self.throughput()
+        versions = ', '.join(f"{name}×{count}" for name, count in self.stats['http_versions'].items()) or '-'
+        return (f"{figures['requests']} 个请求（失败 {figures['failures']}，重试 {figures['retries']}），"
+                f"{figures['seconds']:.2f}s，{figures['rps']:.1f} 请求/秒，{figures['mb_per_s']:.2f} MB/s，"
+                f"延迟 p50 {figures['p50_ms']:.0f}ms / p95 {figures['p95_ms']:.0f}ms，"
+                f"{self.backend} {versions}，连接池上限 {self.max_connections}")
@@ -33,7 +33,11 @@ Copyright (c) 2024 wjm. All rights reserved.
 import os
 import sys
 import json
+import asyncio
 import re
+import gzip
+import base64
+from html.parser import HTMLParser
 import requests
 from urllib.parse import urlparse, parse_qs
 import subprocess
@@ -41,6 +45,20 @@ import tempfile
 from pathlib import Path
 import argparse
 import time
+import queue
+import shutil
+import socket
+import threading
+import contextlib
+
+# selenium 后端依赖 selenium；devtools 后端不需要：定位方式取值相同，动作链和按键点击策略不可用（点击时跳过）
+try:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.common.action_chains import ActionChains
+except ImportError:
+    from devtools_backend import By
+    Keys = ActionChains = None
 
 # 版本信息
 __version__ = "2.0.0"
@@ -52,6 +70,627 @@ __description__ = "B站视频字幕提取工具 - 支持AI小助手和语音识
 __url__ = "[您的项目URL]"
 __status__ = "Production"
 
+# AI小助手面板及字幕列表的选择器（Python逐元素路径与页面内采集脚本共用）
+AI_PANEL_SELECTORS = [
+    "[data-video-assistant-subject-wrapper]",
+    "[class*='VideoAssistant']",
+    "[class*='InteractWrapper']",
+    "//*[contains(text(), 'AI小助手')]/ancestor::div[contains(@class, 'panel') or contains(@class, 'wrapper') or contains(@class, 'container')][1]"
+]
+SUBTITLE_CONTAINER_SELECTORS = [
+    '[data-video-assistant-subject-subtitles]',
+    '._SubtitlesList_2jiok_1',
+    '[class*="_SubtitlesList_"]',
+    '[class*="_Subtitles_"]'
+]
+SUBTITLE_SCROLL_SELECTORS = [
+    '[data-video-assistant-subject-content]',
+    '._Content_196qs_128',
+    '[class*="_Content_"]',
+    '[data-video-assistant-subject-subtitles]'
+]
+SUBTITLE_ITEM_SELECTORS = [
+    '._Part_1iu0q_16',
+    '[class*="_Part_"]',
+    '.item',
+    '[class*="subtitle"][class*="item"]',
+    'div[class*="time"]'  # 包含时间的div
+]
+SUBTITLE_TIME_SELECTORS = [
+    '._TimeText_1iu0q_35',
+    '[class*="_TimeText_"]',
+    '[class*="time"]',
+    '.time'
+]
+SUBTITLE_CONTENT_SELECTORS = [
+    '._Text_1iu0q_64',
+    '[class*="_Text_"]',
+    '[class*="content"] span',
+    '.content',
+    'span'
+]
+
+# 页面内字幕采集脚本：一次 execute_script 完成面板定位、读取当前渲染的全部字幕行并滚动一屏
+# 参数: arguments[0] = {panel, container, scroll, item, time, content: 选择器列表, scroll_ratio: 滚动比例}
+AI_SUBTITLE_HARVEST_JS = r"""
+var cfg = arguments[0];
+function visible(el) {
+    return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+}
+function textOf(el) {
+    return ((el && (el.innerText || el.textContent)) || '').trim();
+}
+function queryAll(root, selector) {
+    if (selector.indexOf('//') === 0) {
+        var out = [];
+        var snap = document.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var i = 0; i < snap.snapshotLength; i++) { out.push(snap.snapshotItem(i)); }
+        return out;
+    }
+    try { return Array.prototype.slice.call(root.querySelectorAll(selector)); } catch (e) { return []; }
+}
+function firstVisible(root, selectors) {
+    for (var i = 0; i < selectors.length; i++) {
+        var found = queryAll(root, selectors[i]);
+        for (var j = 0; j < found.length; j++) {
+            if (visible(found[j])) { return {el: found[j], selector: selectors[i]}; }
+        }
+    }
+    return null;
+}
+var result = {found: false, rows: [], selectors: {}, scrollTop: 0, clientHeight: 0, scrollHeight: 0, scrolled: false, atEnd: false};
+
+var panel = null;
+for (var i = 0; i < cfg.panel.length && !panel; i++) {
+    var candidates = queryAll(document, cfg.panel[i]);
+    for (var j = 0; j < candidates.length; j++) {
+        if (visible(candidates[j]) && (candidates[j].textContent || '').indexOf('字幕列表') !== -1) {
+            panel = candidates[j];
+            result.selectors.panel = cfg.panel[i];
+            break;
+        }
+    }
+}
+if (!panel) { return result; }
+result.found = true;
+
+var container = firstVisible(panel, cfg.container);
+var containerEl = container ? container.el : panel;
+result.selectors.container = container ? container.selector : null;
+var scroller = firstVisible(panel, cfg.scroll);
+var scrollEl = scroller ? scroller.el : containerEl;
+result.selectors.scroll = scroller ? scroller.selector : null;
+
+var items = [];
+for (var i = 0; i < cfg.item.length; i++) {
+    var found = queryAll(containerEl, cfg.item[i]).filter(function (item) {
+        if (!visible(item)) { return false; }
+        var t = textOf(item);
+        // 与Python路径一致：过滤选集列表等非字幕内容
+        return (t && t.indexOf('选集') === -1 && t.indexOf('P') === -1) || t.indexOf(':') !== -1;
+    });
+    if (found.length) { items = found; result.selectors.item = cfg.item[i]; break; }
+}
+
+function firstText(item, selectors) {
+    for (var k = 0; k < selectors.length; k++) {
+        var el = item.querySelector(selectors[k]);
+        if (el) { return textOf(el); }
+    }
+    return '';
+}
+for (var i = 0; i < items.length; i++) {
+    var timeText = firstText(items[i], cfg.time);
+    var contentText = firstText(items[i], cfg.content);
+    if (!contentText) {
+        var itemText = textOf(items[i]);
+        contentText = (timeText && itemText.indexOf(timeText) !== -1) ? itemText.replace(timeText, '').trim() : itemText;
+    }
+    if (timeText && contentText && contentText.length > 1) {
+        result.rows.push({time: timeText, content: contentText});
+    }
+}
+
+var before = scrollEl.scrollTop;
+// 本次读取的是列表底部（滚动前已到底），之后不会再有新行
+result.atEnd = before + scrollEl.clientHeight >= scrollEl.scrollHeight - 1;
+if (cfg.scroll_ratio > 0) {
+    scrollEl.scrollTop += scrollEl.clientHeight * cfg.scroll_ratio;
+}
+result.scrolled = scrollEl.scrollTop !== before;
+result.container = containerEl;
+result.scrollTop = scrollEl.scrollTop;
+result.clientHeight = scrollEl.clientHeight;
+result.scrollHeight = scrollEl.scrollHeight;
+return result;
+"""
+
+# 滚动一步（arguments[0] = 滚动容器，arguments[1] = 滚动比例），返回滚动前是否已到底部及是否发生了滚动
+SCROLL_STEP_JS = r"""
+var el = arguments[0];
+var before = el.scrollTop;
+var atEnd = before + el.clientHeight >= el.scrollHeight - 1;
+el.scrollTop += el.clientHeight * arguments[1];
+return {atEnd: atEnd, scrolled: el.scrollTop !== before};
+"""
+
+# 事件驱动等待脚本（execute_async_script）：条件满足立即返回，否则在DOM变化时重新检查，直到超时
+# 参数: arguments[0] = 条件函数体（可使用 args），arguments[1] = 超时毫秒数，arguments[2] = 附加参数列表
+WAIT_FOR_CONDITION_JS = r"""
+var condition = new Function('args', arguments[0]);
+var timeoutMs = arguments[1];
+var extra = arguments[2] || [];
+var done = arguments[arguments.length - 1];
+function check() {
+    try { return !!condition(extra); } catch (e) { return false; }
+}
+if (check()) { done(true); return; }
+var finished = false, scheduled = false, observer = null, interval = null, timer = null;
+function finish(value) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(value);
+}
+// DOM变化频繁（播放器等），每帧最多检查一次
+observer = new MutationObserver(function () {
+    if (scheduled || finished) { return; }
+    scheduled = true;
+    requestAnimationFrame(function () {
+        scheduled = false;
+        if (check()) { finish(true); }
+    });
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+// 兜底检查：滚动位置、样式等变化不一定触发DOM变动
+interval = setInterval(function () { if (check()) { finish(true); } }, 250);
+timer = setTimeout(function () { finish(check()); }, timeoutMs);
+"""
+
+# DOM静止等待脚本（execute_async_script）：根节点下连续 quiet 毫秒无变化即返回
+# 参数: arguments[0] = 根元素（null 表示整个文档），arguments[1] = 静止毫秒数，arguments[2] = 超时毫秒数
+WAIT_FOR_DOM_QUIET_JS = r"""
+var root = arguments[0] || document.documentElement;
+var quietMs = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var changed = false, quietTimer = null, timer = null;
+var observer = new MutationObserver(function () {
+    changed = true;
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(finish, quietMs);
+});
+function finish() {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(timer);
+    done(changed);
+}
+observer.observe(root, {childList: true, subtree: true, characterData: true});
+quietTimer = setTimeout(finish, quietMs);
+timer = setTimeout(finish, timeoutMs);
+"""
+
+# 等待条件（函数体，args 为附加参数列表）
+# 视频页主体已渲染：工具栏出现即可开始查找AI按钮
+PAGE_READY_CONDITION = """
+return document.readyState === 'complete' &&
+    !!document.querySelector('.video-toolbar-right, .video-toolbar, [class*="video-toolbar"]');
+"""
+# 页面访问状态：页面是否就绪、是否已登录（DedeUserID Cookie 页面脚本可读）、是否出现人机验证或登录弹窗
+PAGE_ACCESS_JS = r"""
+return {
+    ready: document.readyState === 'complete' &&
+        !!document.querySelector('.video-toolbar-right, .video-toolbar, [class*="video-toolbar"]'),
+    loggedIn: /(?:^|;\s*)DedeUserID=/.test(document.cookie),
+    blocked: !!document.querySelector('.geetest_panel, .geetest_holder, [class*="geetest_"], .bili-mini-mask, .login-panel-popover')
+};
+"""
+# 非阻塞导航后的页面就绪：地址已切换到目标视频（args[0] = BV号），避免把旧页面的就绪状态当作新页面
+NAVIGATED_PAGE_READY_CONDITION = "if (location.href.indexOf(args[0]) === -1) { return false; }" + PAGE_READY_CONDITION
+# 元素已滚动到视口内
+ELEMENT_IN_VIEW_CONDITION = """
+var rect = args[0].getBoundingClientRect();
+return rect.top >= 0 && rect.bottom <= (window.innerHeight || document.documentElement.clientHeight);
+"""
+# 页面内可见的文本指示器（与 check_if_ai_panel_exists 一致：至少命中 args[1] 个）
+VISIBLE_TEXT_CONDITION = """
+var found = 0;
+for (var i = 0; i < args[0].length; i++) {
+    var snap = document.evaluate("//*[contains(text(), '" + args[0][i] + "')]", document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var j = 0; j < snap.snapshotLength; j++) {
+        var el = snap.snapshotItem(j);
+        if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) { found++; break; }
+    }
+}
+return found >= args[1];
+"""
+# 字幕列表标签已激活（标签自身或父元素带激活样式）
+SUBTITLE_TAB_ACTIVE_CONDITION = """
+var snap = document.evaluate("//div[contains(text(), '字幕列表')] | //span[contains(text(), '字幕列表')]",
+                             document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var el = snap.snapshotItem(i);
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) { continue; }
+    var classes = (el.className || '') + ' ' + ((el.parentElement && el.parentElement.className) || '');
+    if (/active|selected/i.test(classes)) { return true; }
+}
+return false;
+"""
+# AI面板内已渲染出字幕行（args[0] = 面板选择器，args[1] = 字幕项选择器）
+SUBTITLE_ROWS_READY_CONDITION = """
+for (var i = 0; i < args[0].length; i++) {
+    if (args[0][i].indexOf('//') === 0) { continue; }
+    var panels = document.querySelectorAll(args[0][i]);
+    for (var j = 0; j < panels.length; j++) {
+        if ((panels[j].textContent || '').indexOf('字幕列表') === -1) { continue; }
+        for (var k = 0; k < args[1].length; k++) {
+            try { if (panels[j].querySelector(args[1][k])) { return true; } } catch (e) {}
+        }
+    }
+}
+return false;
+"""
+# 列表DOM已静默（args[0] = 列表容器，args[1] = 静默毫秒数，args[2] = 滚动序号）：
+# 首次检查时在容器上挂 MutationObserver 记录最后一次变化时间，之后每次检查只比较时间戳，不阻塞
+DOM_QUIET_CONDITION = """
+var el = args[0];
+if (!el) { return true; }
+var stamp = el.__domQuietStamp;
+if (!stamp) {
+    stamp = el.__domQuietStamp = {changed: Date.now(), token: null};
+    new MutationObserver(function () { stamp.changed = Date.now(); })
+        .observe(el, {childList: true, subtree: true, characterData: true});
+}
+if (stamp.token !== args[2]) {
+    stamp.token = args[2];
+    stamp.changed = Date.now();
+    return false;
+}
+return Date.now() - stamp.changed >= args[1];
+"""
+# 有效的AI面板已出现（与 is_valid_ai_panel 的判断规则一致，args[0] = 面板选择器）
+AI_PANEL_VISIBLE_CONDITION = """
+var keywords = ['AI小助手', '视频总结', '字幕列表', 'AI', '总结', '小助手', '智能', 'assistant', 'summary'];
+for (var i = 0; i < args[0].length; i++) {
+    var elements = document.querySelectorAll(args[0][i]);
+    for (var j = 0; j < elements.length; j++) {
+        var rect = elements[j].getBoundingClientRect();
+        var text = elements[j].textContent || '';
+        if (rect.width < 300 || rect.height < 400 || text.trim().length <= 100) { continue; }
+        var hasAiContent = keywords.some(function (k) { return text.indexOf(k) !== -1; });
+        var isRightSide = rect.left > window.innerWidth * 0.5;
+        var hasTabs = !!elements[j].querySelector("[class*='tab'], [class*='Tab']");
+        if ((isRightSide || hasAiContent) && (hasAiContent || hasTabs)) { return true; }
+    }
+}
+return false;
+"""
+# 点击第一个可见的"字幕列表"标签（多标签页模式下的非阻塞切换）
+SUBTITLE_TAB_CLICK_JS = r"""
+var snap = document.evaluate("//div[contains(text(), '字幕列表')] | //span[contains(text(), '字幕列表')]",
+                             document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var el = snap.snapshotItem(i);
+    if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) { el.click(); return true; }
+}
+return false;
+"""
+
+# AI面板标签检测函数：定位AI面板根元素，只在面板内查找"字幕列表"/"视频总结"标签并读取激活状态，
+# 统计面板内已渲染的带时间戳的字幕行；activate 为真且字幕列表标签未激活时点击该标签
+AI_PANEL_TABS_FUNCTION = r"""
+function visible(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); }
+function findAiPanel(panelSelectors, tabNames) {
+    for (var i = 0; i < panelSelectors.length; i++) {
+        var candidates = [];
+        try {
+            if (panelSelectors[i].indexOf('//') === 0) {
+                var snap = document.evaluate(panelSelectors[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                for (var j = 0; j < snap.snapshotLength; j++) { candidates.push(snap.snapshotItem(j)); }
+            } else {
+                candidates = document.querySelectorAll(panelSelectors[i]);
+            }
+        } catch (e) { continue; }
+        for (var j = 0; j < candidates.length; j++) {
+            var panelText = candidates[j].textContent || '';
+            if (visible(candidates[j]) && tabNames.some(function (name) { return panelText.indexOf(name) !== -1; })) {
+                return {panel: candidates[j], selector: panelSelectors[i]};
+            }
+        }
+    }
+    return {panel: null, selector: null};
+}
+function inspectPanelTabs(panelSelectors, itemSelectors, activate) {
+    var tabNames = ['字幕列表', '视频总结'];
+    var state = {found: false, selector: null, tabs: {}, rows: 0, clicked: false};
+    function ownText(el) {
+        var text = '';
+        for (var i = 0; i < el.childNodes.length; i++) {
+            if (el.childNodes[i].nodeType === 3) { text += el.childNodes[i].nodeValue; }
+        }
+        return text.trim();
+    }
+    var found = findAiPanel(panelSelectors, tabNames);
+    var panel = found.panel;
+    if (!panel) { return state; }
+    state.found = true;
+    state.selector = found.selector;
+
+    // 标签文本较短；文本与标签名完全一致的元素优先（避免匹配到正文中提到标签名的段落）
+    var tabs = {};
+    var nodes = panel.querySelectorAll('div, span, button, li, a');
+    for (var i = 0; i < nodes.length; i++) {
+        var text = ownText(nodes[i]);
+        for (var k = 0; k < tabNames.length; k++) {
+            var name = tabNames[k];
+            if (text.indexOf(name) === -1 || text.length > name.length + 10 || !visible(nodes[i])) { continue; }
+            if (!tabs[name] || (text === name && tabs[name].text !== name)) { tabs[name] = {el: nodes[i], text: text}; }
+        }
+    }
+    for (var name in tabs) {
+        var el = tabs[name].el;
+        var classes = (el.className || '') + ' ' + ((el.parentElement && el.parentElement.className) || '');
+        state.tabs[name] = {active: /active|selected/i.test(classes), text: tabs[name].text};
+    }
+
+    var timePattern = /\d{1,2}:\d{2}/;
+    for (var i = 0; i < itemSelectors.length && !state.rows; i++) {
+        var items;
+        try { items = panel.querySelectorAll(itemSelectors[i]); } catch (e) { continue; }
+        for (var j = 0; j < items.length; j++) {
+            if (visible(items[j]) && timePattern.test(items[j].textContent || '')) { state.rows++; }
+        }
+    }
+
+    if (activate && tabs['字幕列表'] && !state.tabs['字幕列表'].active) {
+        tabs['字幕列表'].el.click();
+        state.clicked = true;
+    }
+    return state;
+}
+"""
+# 参数: arguments[0] = 面板选择器，arguments[1] = 字幕项选择器，arguments[2] = 是否点击字幕列表标签
+AI_PANEL_TABS_JS = AI_PANEL_TABS_FUNCTION + """
+return inspectPanelTabs(arguments[0], arguments[1], arguments[2]);
+"""
+# 视频总结标签激活时读取AI面板的文本（总结段落与带时间戳的提纲），参数: arguments[0] = 面板选择器
+AI_SUMMARY_HARVEST_JS = AI_PANEL_TABS_FUNCTION + """
+var state = inspectPanelTabs(arguments[0], [], false);
+if (!state.found || !(state.tabs['视频总结'] && state.tabs['视频总结'].active)) { return null; }
+return {text: findAiPanel(arguments[0], ['视频总结']).panel.innerText};
+"""
+# AI面板内的字幕列表标签已激活（args[0] = 面板选择器）
+PANEL_SUBTITLE_TAB_ACTIVE_CONDITION = AI_PANEL_TABS_FUNCTION + """
+var state = inspectPanelTabs(args[0], [], false);
+return !!(state.tabs['字幕列表'] && state.tabs['字幕列表'].active);
+"""
+
+# 失败诊断快照脚本：一次调用取得页面HTML（截断）、正文文本和右侧大尺寸元素的位置
+# 参数: arguments[0] = HTML最大字符数（正文文本取其十分之一）
+DIAGNOSTIC_SNAPSHOT_JS = r"""
+var maxChars = arguments[0];
+var html = document.documentElement ? document.documentElement.outerHTML : '';
+var width = window.innerWidth;
+var right = [];
+var all = document.querySelectorAll('body *');
+for (var i = 0; i < all.length && right.length < 50; i++) {
+    var rect = all[i].getBoundingClientRect();
+    if (rect.left > width * 0.6 && rect.width > 100 && rect.height > 100) {
+        right.push({
+            tag: all[i].tagName.toLowerCase(),
+            className: String(all[i].className || '').substring(0, 100),
+            left: Math.round(rect.left), top: Math.round(rect.top),
+            width: Math.round(rect.width), height: Math.round(rect.height),
+            text: (all[i].textContent || '').trim().substring(0, 50)
+        });
+    }
+}
+return {
+    url: location.href, title: document.title,
+    window: {width: width, height: window.innerHeight},
+    htmlLength: html.length, html: html.substring(0, maxChars),
+    text: document.body ? document.body.innerText.substring(0, Math.floor(maxChars / 10)) : '',
+    rightElements: right
+};
+"""
+
+# 页面布局指纹的扫描范围：播放器、工具栏和AI小助手（按钮与面板）所在区域
+LAYOUT_ROOT_SELECTORS = [
+    '#bilibili-player', '.bpx-player-container',
+    '#arc_toolbar_report', '.video-toolbar-container',
+    '.video-ai-assistant', '[data-video-assistant-subject-wrapper]', "[class*='VideoAssistant']"
+]
+
+# 页面布局指纹脚本：收集扫描范围内CSS Modules类名中的哈希后缀（如 _Part_1iu0q_16 中的 1iu0q）
+# 参数: arguments[0] = 扫描范围的根元素选择器列表
+LAYOUT_FINGERPRINT_JS = r"""
+var hashes = {};
+var pattern = /(?:^|\s)_[A-Za-z][A-Za-z0-9]*_([a-z0-9]{5})_\d+(?=\s|$)/g;
+var roots = [], nodes = [];
+for (var i = 0; i < arguments[0].length; i++) {
+    var found;
+    try { found = document.querySelectorAll(arguments[0][i]); } catch (e) { continue; }
+    for (var j = 0; j < found.length; j++) {
+        if (roots.indexOf(found[j]) === -1) { roots.push(found[j]); }
+    }
+}
+for (var i = 0; i < roots.length; i++) {
+    nodes.push(roots[i]);
+    var inner = roots[i].querySelectorAll('[class*="_"]');
+    for (var j = 0; j < inner.length; j++) { nodes.push(inner[j]); }
+}
+for (var i = 0; i < nodes.length; i++) {
+    var cls = nodes[i].getAttribute('class') || '';
+    var match;
+    pattern.lastIndex = 0;
+    while ((match = pattern.exec(cls))) { hashes[match[1]] = true; }
+}
+return Object.keys(hashes).sort();
+"""
+
+# AI按钮候选批量特征采集脚本：一次调用完成全部选择器的查询并返回每个候选元素的评分特征
+# 参数: arguments[0] = 选择器列表；候选元素暂存在 window.__aiButtonCandidates 中，
+# 由 AI_BUTTON_TAKE_JS 按序号取回（或 AI_BUTTON_RELEASE_JS 放弃）时删除，页面全局对象不长期持有DOM节点
+AI_BUTTON_FEATURES_JS = r"""
+var selectors = arguments[0];
+var elements = [], index = new Map(), groups = [];
+for (var i = 0; i < selectors.length; i++) {
+    var found;
+    try { found = document.querySelectorAll(selectors[i]); } catch (e) { groups.push(null); continue; }
+    var ids = [];
+    for (var j = 0; j < found.length; j++) {
+        if (!index.has(found[j])) { index.set(found[j], elements.length); elements.push(found[j]); }
+        ids.push(index.get(found[j]));
+    }
+    groups.push(ids);
+}
+window.__aiButtonCandidates = elements;
+function attr(el, name) { return (el && el.getAttribute(name)) || ''; }
+var features = elements.map(function (el) {
+    var rect = el.getBoundingClientRect();
+    var style = window.getComputedStyle(el);
+    var parent = el.parentElement;
+    var grandparent = parent && parent.parentElement;
+    return {
+        // 超过50字符的文本在评分时直接排除，截断不影响结果
+        text: (el.textContent || '').trim().substring(0, 100),
+        class_name: attr(el, 'class'),
+        tag_name: el.tagName.toLowerCase(),
+        title: attr(el, 'title'),
+        aria_label: attr(el, 'aria-label'),
+        href: el.href ? String(el.href) : attr(el, 'href'),
+        data_name: attr(el, 'data-name'),
+        onclick: attr(el, 'onclick'),
+        role: attr(el, 'role'),
+        x: Math.round(rect.left + window.scrollX),
+        y: Math.round(rect.top + window.scrollY),
+        width: Math.round(rect.width),
+        height: Math.round(rect.height),
+        window_width: window.innerWidth,
+        parent_classes: [attr(parent, 'class'), attr(grandparent, 'class')],
+        displayed: rect.width > 0 && rect.height > 0 && style.display !== 'none' &&
+                   style.visibility !== 'hidden' && style.opacity !== '0',
+        enabled: !el.disabled
+    };
+});
+return {groups: groups, features: features};
+"""
+# 取回选中的候选元素并删除暂存的候选列表；参数: arguments[0] = 候选序号
+AI_BUTTON_TAKE_JS = r"""
+var candidates = window.__aiButtonCandidates || [];
+delete window.__aiButtonCandidates;
+return candidates[arguments[0]] || null;
+"""
+# 没有选中候选元素时删除暂存的候选列表
+AI_BUTTON_RELEASE_JS = "delete window.__aiButtonCandidates;"
+
+# 请求屏蔽模式下屏蔽的地址（Network.setBlockedURLs 通配符），AI面板只依赖页面脚本和接口数据
+BLOCKED_URL_PATTERNS = {
+    'media': ['*.m4s*', '*.mp4*', '*.flv*', '*.m4a*', '*.mp3*', '*bilivideo.com/upgcxcode/*', '*bilivideo.cn*'],
+    'image': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.ico*'],
+    'font': ['*.woff*', '*.ttf*', '*.otf*', '*.eot*'],
+    'tracking': ['*data.bilibili.com/*', '*cm.bilibili.com/*', '*api.bilibili.com/x/click-interface/*',
+                 '*hm.baidu.com/*', '*google-analytics.com/*', '*googletagmanager.com/*'],
+}
+BLOCKED_CATEGORY_NAMES = {'media': '媒体', 'image': '图片', 'font': '字体', 'tracking': '统计', 'other': '其他'}
+
+# 网络抓包模式下匹配的AI字幕响应地址
+AI_SUBTITLE_RESPONSE_PATTERNS = [
+    'aisubtitle.hdslb.com',                   # AI字幕JSON: {"body": [{"from", "to", "content"}]}
+    '/x/web-interface/view/conclusion/get',   # AI小助手总结接口: model_result.subtitle[].part_subtitle[]
+]
+
+# 浏览器会话中导出到 requests.Session 的登录Cookie（SESSDATA 为登录凭证，bili_jct 为CSRF令牌）
+LOGIN_COOKIE_NAMES = ['SESSDATA', 'bili_jct', 'DedeUserID', 'DedeUserID__ckMd5', 'buvid3', 'buvid4']
+# WBI签名的混合密钥重排表（由 img_key + sub_key 生成 mixin_key）
+WBI_MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+# 页面前端状态读取脚本：一次 execute_script 取得视频信息和AI小助手组件中已加载的字幕
+# 视频信息来自 window.__INITIAL_STATE__.videoData；字幕行在AI面板元素挂载的 Vue/React 组件状态中查找
+# （有限深度遍历，收集元素含 content 及 from/start_timestamp 的数组）
+# 参数: arguments[0] = AI面板选择器列表
+PAGE_STATE_JS = r"""
+var result = {video: null, subtitles: null};
+var state = window.__INITIAL_STATE__;
+var data = state && state.videoData;
+if (data && data.bvid) {
+    result.video = {
+        title: data.title, bvid: data.bvid, aid: data.aid, cid: data.cid,
+        pages: (data.pages || []).map(function (p) {
+            return {cid: p.cid, page: p.page, part: p.part, duration: p.duration};
+        })
+    };
+}
+
+function isSubtitleArray(value) {
+    if (!Array.isArray(value) || !value.length) { return false; }
+    var first = value[0];
+    return !!first && typeof first === 'object' && typeof first.content === 'string' &&
+        (first.from !== undefined || first.start_timestamp !== undefined);
+}
+var rows = [], summary = null, visited = new WeakSet(), budget = 20000;
+function search(value, depth) {
+    if (!value || typeof value !== 'object' || depth > 8 || budget-- <= 0 || visited.has(value)) { return; }
+    if (value instanceof Node || value === window) { return; }
+    visited.add(value);
+    // AI总结结果（与总结接口的 model_result 结构相同，提纲可能为空，只有总结段落）
+    if (!summary) {
+        var hasOutline = Array.isArray(value.outline) && value.outline.length > 0 && !!value.outline[0] &&
+            Array.isArray(value.outline[0].part_outline);
+        var hasSummary = typeof value.summary === 'string' && value.summary.length > 0 &&
+            (typeof value.result_type === 'number' || Array.isArray(value.outline) || value.outline === null);
+        if (hasOutline || hasSummary) {
+            summary = {summary: typeof value.summary === 'string' ? value.summary : '',
+                       outline: hasOutline ? value.outline : []};
+        }
+    }
+    if (isSubtitleArray(value)) {
+        for (var i = 0; i < value.length; i++) {
+            var item = value[i];
+            rows.push({
+                from: item.from !== undefined ? item.from : item.start_timestamp,
+                to: item.to !== undefined ? item.to : (item.end_timestamp !== undefined ? item.end_timestamp : null),
+                content: item.content
+            });
+        }
+        return;
+    }
+    var keys;
+    try { keys = Object.keys(value); } catch (e) { return; }
+    for (var k = 0; k < keys.length; k++) {
+        var child;
+        try { child = value[keys[k]]; } catch (e) { continue; }
+        search(child, depth + 1);
+    }
+}
+var selectors = arguments[0] || [];
+for (var i = 0; i < selectors.length && !rows.length; i++) {
+    if (selectors[i].indexOf('//') === 0) { continue; }
+    var panels = document.querySelectorAll(selectors[i]);
+    for (var j = 0; j < panels.length && !rows.length; j++) {
+        // 面板元素及其祖先上挂载的组件实例（Vue 2/3 与 React）
+        for (var el = panels[j], level = 0; el && level < 5 && !rows.length; el = el.parentElement, level++) {
+            var own = Object.keys(el);
+            for (var k = 0; k < own.length; k++) {
+                if (own[k].indexOf('__vue') === 0 || own[k].indexOf('__react') === 0) { search(el[own[k]], 0); }
+            }
+        }
+    }
+}
+if (rows.length) { result.subtitles = {body: rows}; }
+if (summary) { result.summary = summary; }
+return result;
+"""
+
 class BilibiliSubtitleExtractor:
     def __init__(self, output_dir="./subtitles"):
         """
@@ -71,8 +710,65 @@ class BilibiliSubtitleExtractor:
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive'
         })
+        # B站接口地址（可改为本地模拟服务器的地址以离线测试接口流程，见 fake_bilibili_api.py）
+        self.api_base = 'https://api.bilibili.com'
+        # 现有字幕模式是否在缺少登录Cookie时从调试模式浏览器导出（默认匿名请求，不涉及浏览器）
+        self.cc_login = False
         # FFmpeg路径配置
         self.ffmpeg_path = r"D:\ffmpeg-7.1.1-essentials_build\ffmpeg-7.1.1-essentials_build\bin"
+        # 浏览器会话池（批量提取时通过 enable_browser_pool 开启）
+        self.browser_pool = None
+        # 浏览器集群：多个使用登录配置副本的无头实例（通过 enable_browser_fleet 开启）
+        self.browser_fleet = None
+        # 浏览器驱动后端: 'selenium'（WebDriver）或 'devtools'（WebSocket直连调试端口，见 devtools_backend.py）
+        self.browser_backend = 'selenium'
+        # 浏览器类型、可执行文件和已登录的用户数据目录（Linux服务器可用 ChromiumBrowser('chromium', ...)）
+        self.browser = ChromiumBrowser('edge')
+        # 无头抓取模式：headless 时新启动无头浏览器，block_resources 时屏蔽媒体/图片/字体/统计请求
+        self.headless = False
+        self.block_resources = False
+        # 各会话当前页面的流量统计 {id(driver): 统计}（开启请求屏蔽时记录；并发提取时各会话互不干扰）
+        self.page_traffic = {}
+        self.page_video_info = {}  # 从页面前端状态读取的视频信息 {bvid: 与 get_video_info 相同的字段}
+        # 登录Cookie桥接：AI模式优先用浏览器导出的Cookie直接请求接口，失败时再打开视频页
+        self.use_http_api = True
+        self.login_cookie_expires = None  # SESSDATA 过期时间戳（None 表示会话Cookie或未导入）
+        self.cookie_import_failed_at = 0
+        self.cookie_lock = threading.Lock()
+        self.wbi_keys = None  # (img_key, sub_key, 获取时间)
+        # 失败诊断：background 后台写盘并分析，offline 只写盘（用 --analyze-diagnostics 离线分析），off 关闭
+        self.diagnostics_mode = 'background'
+        self.diagnostics_limits = {
+            'seconds': 3,                     # 取快照的时间预算，超出时不再截图
+            'html_chars': 2_000_000,          # 页面HTML最大字符数
+            'screenshot_bytes': 4_000_000,    # 截图（base64）超过该大小时不保存
+            'files': 50,                      # 诊断目录中保留的快照数
+        }
+        # AI流程分步计时（StepProfiler，通过 --profile 开启；为 None 时不做任何统计）
+        self.profiler = None
+        # 缓存目录（选择器命中记录等）
+        self.cache_dir = self.output_dir / '.cache'
+        self.selector_cache = SelectorCache(self.cache_dir / 'selector_cache.json')
+        # 每个页面只计算一次布局指纹：(id(driver), 标签页句柄) -> 指纹，导航或关闭标签页时清除
+        self.layout_fingerprints = {}
+        # AI字幕预检：打开浏览器前先查询AI总结接口，确认没有AI字幕的视频写入负缓存，有效期内直接跳过
+        self.ai_precheck = True
+        self.ai_negative_cache = AiAvailabilityCache(self.cache_dir / 'ai_negative_cache.json')
+        # 负缓存有效期（秒）：接口确认未识别到语音的结果保留较久；接口返回不支持AI总结（新视频可能尚未生成）
+        # 和页面上找不到按钮（也可能是布局变化）保留较短
+        self.ai_negative_ttl = {'api': 7 * 24 * 3600, 'api_unsupported': 6 * 3600, 'page': 24 * 3600}
+        # 会话池的浏览器回收策略（见 BrowserMemoryMonitor）：换标签页/重启实例的页面数与内存上限，0 表示不检查
+        self.browser_recycle = {'tab_pages': 50, 'tab_heap_mb': 512, 'restart_pages': 500, 'process_mb': 4096}
+        # 同时提取AI视频总结（总结段落与分段提纲），与字幕在同一次页面访问/接口响应中取得，另存为Markdown
+        self.include_summary = False
+        # AI流程各步骤的最长等待时间（秒），条件满足即提前结束
+        self.step_timeouts = {
+            'page_load': 20,     # 视频页主体渲染
+            'ai_panel': 6,       # 点击后AI面板出现
+            'panel_render': 10,  # AI面板标签页渲染
+            'tab_switch': 8,     # 切换到字幕列表
+            'scroll': 2,         # 每次滚动后列表重新渲染
+        }
         
     def print_banner(self):
         """打印程序横幅"""
@@ -92,178 +788,935 @@ class BilibiliSubtitleExtractor:
         """
         print(banner)
     
-    def get_ai_subtitle_with_edge(self, bvid):
-        """使用Edge浏览器获取AI小助手字幕 - 完整的用户交互流程"""
+    def get_ai_subtitle_with_edge(self, bvid, capture_network=False):
+        """使用Edge浏览器获取AI小助手字幕 - 完整的用户交互流程
+        
+        Args:
+            bvid: 视频BV号
+            capture_network: 是否通过DevTools网络抓包直接解析AI字幕接口响应
+                             （跳过标签页切换与滚动，获得精确的起止时间）
+        """
         try:
             import time
             import re
             
-            # 尝试导入selenium
-            try:
-                from selenium import webdriver
-                from selenium.webdriver.common.by import By
-                from selenium.webdriver.support.ui import WebDriverWait
-                from selenium.webdriver.support import expected_conditions as EC
-                from selenium.webdriver.edge.options import Options
-                from selenium.common.exceptions import TimeoutException, NoSuchElementException
-                from selenium.webdriver.common.action_chains import ActionChains
-                from selenium.webdriver.common.keys import Keys
-            except ImportError:
-                print("未检测到selenium，无法使用浏览器自动化")
-                print("请安装: pip install selenium")
-                return None
+            # selenium 后端需要 selenium；devtools 后端直接通过WebSocket连接浏览器，只依赖 websockets
+            if self.browser_backend != 'devtools':
+                try:
+                    import selenium
+                except ImportError:
+                    print("未检测到selenium，无法使用浏览器自动化")
+                    print("请安装: pip install selenium")
+                    return None
             
             print("🤖 启动AI字幕提取 - 完整交互流程")
-            print("🔄 连接策略: 1. 调试模式连接 → 2. 用户配置启动 → 3. 错误提示")
             
-            # 优先连接到用户当前的Edge浏览器实例
-            driver = None
-            wait = None
-            
-            # 方法1: 尝试连接已运行的Edge调试实例（推荐）
-            try:
-                debug_options = Options()
-                debug_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
-                driver = webdriver.Edge(options=debug_options)
-                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                wait = WebDriverWait(driver, 20)
-                print("✅ 成功连接到Edge调试模式（保持登录状态）")
-            except Exception as debug_error:
-                print(f"调试模式连接失败: {debug_error}")
+            with self.profile_run(bvid):
+                with self.profile_step('acquire_driver'):
+                    driver, pooled = self.acquire_edge_driver(capture_network=capture_network)
+                if not driver:
+                    raise Exception("无法启动Edge浏览器")
                 
-                # 方法2: 尝试使用默认用户数据目录启动
                 try:
-                    edge_options = Options()
-                    # 明确指定用户数据目录来保持登录状态
-                    import os
-                    user_data_dir = os.path.expandvars(r'%USERPROFILE%\AppData\Local\Microsoft\Edge\User Data')
-                    edge_options.add_argument(f'--user-data-dir={user_data_dir}')
-                    edge_options.add_argument('--profile-directory=Default')
-                    edge_options.add_argument('--no-sandbox')
-                    edge_options.add_argument('--disable-dev-shm-usage')
-                    edge_options.add_argument('--disable-web-security')
-                    edge_options.add_argument('--window-size=1920,1080')
-                    edge_options.add_argument('--start-maximized')  # 确保窗口最大化显示
-                    edge_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0')
-                    edge_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-                    edge_options.add_experimental_option('useAutomationExtension', False)
-                    # 设置为使用默认用户配置（这样能保持登录状态）
-                    edge_options.add_argument('--disable-blink-features=AutomationControlled')
+                    with self.profile_step('navigate'):
+                        video_url = f"https://www.bilibili.com/video/{bvid}"
+                        print(f"📺 访问视频页面: {video_url}")
+                        
+                        if capture_network:
+                            capture_network = self.start_network_capture(driver)
+                        if self.block_resources:
+                            self.enable_request_blocking(driver)
+                        
+                        self.forget_layout_fingerprint(driver)
+                        driver.get(video_url)
+                        print("⏳ 等待页面加载完成...")
+                        print("👀 请观察浏览器窗口，您可以看到自动化操作过程")
+                        
+                        # 确保浏览器窗口最大化和可见
+                        try:
+                            driver.maximize_window()
+                            driver.execute_script("window.focus();")
+                            print("📺 浏览器窗口已最大化")
+                        except:
+                            pass
                     
-                    driver = webdriver.Edge(options=edge_options)
-                    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                    wait = WebDriverWait(driver, 20)
-                    print("✅ 使用用户配置启动Edge浏览器（保持登录状态）")
-                    print("📝 注意: 如果未登录B站，请在新窗口中手动登录")
-                except Exception as normal_error:
-                    print(f"正常模式启动失败: {normal_error}")
-                    raise Exception(f"Edge浏览器启动失败。请先运行GUI中的'启动Edge调试模式'按钮")
-            
-            if not driver or not wait:
-                raise Exception("无法启动Edge浏览器")
+                    return self.extract_ai_subtitles_on_page(driver, bvid, capture_network)
+                finally:
+                    # 从本次已连接的会话导出登录Cookie（此时已在B站页面，无需额外导航），
+                    # 之后的视频可直接请求接口，无需另开浏览器会话
+                    with self.profile_step('cookies'):
+                        self.import_cookies_from_session(driver)
+                    with self.profile_step('release'):
+                        if self.block_resources:
+                            self.report_request_blocking(driver)
+                        self.selector_cache.flush()
+                        self.release_edge_driver(driver, pooled)
+        
+        except Exception as e:
+            print(f"❌ AI字幕获取失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def extract_ai_subtitles_on_page(self, driver, bvid, capture_network=False):
+        """在已打开（或正在加载）视频页的当前标签页上完成AI字幕提取：查找并点击AI按钮、切换到字幕列表并采集
+        
+        Args:
+            capture_network: 是否已开启网络抓包（直接解析AI字幕接口响应）
+        """
+        # 等待视频页主体渲染完成（条件满足即继续，慢速页面最多等待 page_load 秒）
+        with self.profile_step('page_load'):
+            self.wait_for_condition(driver, PAGE_READY_CONDITION, self.step_timeouts['page_load'], '页面加载')
+        
+        # 页面前端状态中已有AI字幕时直接返回（同时取得视频信息）
+        with self.profile_step('page_state'):
+            subtitles = self.read_page_state(driver, bvid)
+        state_subtitles = None
+        if subtitles:
+            print(f"\n✅ 成功获取 {len(subtitles[0]['body'])} 条字幕（页面状态）")
+            if not self.include_summary or subtitles[0].get('ai_summary'):
+                return subtitles
+            # 页面状态中没有AI总结：打开AI面板（默认显示视频总结）读取总结后返回
+            print("💡 页面状态中没有AI总结，打开AI面板读取")
+            state_subtitles = subtitles
+        
+        # 第一步：查找AI小助手按钮
+        print("\n🔍 步骤1: 查找AI小助手按钮")
+        with self.profile_step('find_button'):
+            ai_button = self.find_ai_assistant_button_enhanced(driver, None)
+        if not ai_button and state_subtitles:
+            print("⚠️ 未找到AI小助手按钮，本次只保存字幕")
+            return state_subtitles
+        if not ai_button:
+            print("❌ 未找到AI小助手按钮")
+            with self.profile_step('diagnostics'):
+                self.capture_failure_snapshot(driver, 'ai_button')
+            print("❌ 此视频可能不支持AI功能，或页面结构发生变化")
+            # 只有页面已加载且已登录（没有人机验证或登录弹窗）时，找不到按钮才说明视频没有AI小助手
+            problem = self.check_page_access(driver)
+            if problem:
+                print(f"ℹ️ {problem}，不写入负缓存")
+            else:
+                self.ai_negative_cache.record(bvid, '页面上没有AI小助手按钮', self.ai_negative_ttl['page'])
+            return None
+        
+        # 第二步：点击AI小助手按钮
+        print("\n👆 步骤2: 点击AI小助手按钮")
+        with self.profile_step('click'):
+            success = self.click_ai_assistant_enhanced(driver, ai_button)
+        if not success:
+            print("❌ AI小助手按钮点击失败")
+            return state_subtitles
+        
+        # 网络抓包模式：直接解析AI字幕接口响应，无需切换标签页和滚动
+        if capture_network:
+            print("\n📡 网络抓包: 解析AI字幕接口响应")
+            with self.profile_step('network_capture'):
+                subtitles = self.capture_ai_subtitles_from_network(driver)
+            if subtitles:
+                print(f"\n✅ 成功获取 {len(subtitles[0]['body'])} 条字幕（网络抓包）")
+                return subtitles
+            print("⚠️ 未捕获到AI字幕响应，回退到页面提取流程")
+        
+        # 第三步：等待AI面板完全加载并稳定
+        print("\n⏳ 步骤3: 等待AI面板完全加载")
+        print("💡 AI面板需要时间渲染，请耐心等待...")
+        with self.profile_step('panel_render'):
+            self.wait_for_condition(driver, VISIBLE_TEXT_CONDITION, self.step_timeouts['panel_render'],
+                                    'AI面板标签页渲染', args=[['字幕列表'], 1])
+        
+        # AI面板加载字幕数据后直接从组件状态读取，无需切换标签页和滚动
+        with self.profile_step('page_state'):
+            subtitles = self.read_page_state(driver, bvid)
+        if subtitles:
+            print(f"\n✅ 成功获取 {len(subtitles[0]['body'])} 条字幕（页面状态）")
+            return self.attach_summary_from_panel(driver, subtitles)
+        if state_subtitles:
+            return self.attach_summary_from_panel(driver, state_subtitles)
+        print("💡 页面状态中没有字幕数据，使用页面元素提取")
+        
+        # 面板打开时默认显示视频总结：切换到字幕列表前顺带读取总结，避免再访问一次页面
+        ai_summary = None
+        if self.include_summary:
+            with self.profile_step('summary'):
+                ai_summary = self.harvest_summary_in_page(driver)
+        
+        # 第四步：检查当前所在的标签页
+        print("\n🔍 步骤4: 检查当前所在的标签页")
+        print("💡 这是关键步骤！必须确认在字幕列表页才能提取字幕")
+        
+        with self.profile_step('tab_check'):
+            is_on_subtitle_tab = self.check_if_on_subtitle_tab(driver)
+        
+        print(f"\n📊 检测结果: is_on_subtitle_tab = {is_on_subtitle_tab}")
+        
+        if is_on_subtitle_tab:
+            print("✅ 已经在字幕列表标签页，可以直接提取字幕")
+        else:
+            print("❌ 当前不在字幕列表页，可能在'视频总结'页或其他页面")
+            print("🔴 这就是为什么会提取到错误数据的原因！")
+            
+            # 第五步：切换到字幕列表标签页
+            print("\n🔄 步骤5: 切换到字幕列表标签页")
+            print("💡 正在尝试点击'字幕列表'标签...")
+            
+            with self.profile_step('tab_switch'):
+                success = self.ensure_subtitle_tab_active(driver)
+            if not success:
+                print("❌ 无法切换到字幕列表标签页")
+                print("💡 可能的原因：")
+                print("   - 此视频不支持字幕功能")
+                print("   - AI面板结构发生了变化")
+                print("   - 页面加载不完整")
+                return None
             
-            try:
-                video_url = f"https://www.bilibili.com/video/{bvid}"
-                print(f"📺 访问视频页面: {video_url}")
-                
-                driver.get(video_url)
-                print("⏳ 等待页面加载完成...")
-                print("👀 请观察浏览器窗口，您可以看到自动化操作过程")
-                
-                # 确保浏览器窗口最大化和可见
-                try:
-                    driver.maximize_window()
-                    driver.execute_script("window.focus();")
-                    print("📺 浏览器窗口已最大化")
-                except:
-                    pass
-                
-                time.sleep(15)  # 给页面充分时间加载
-                
-                # 第一步：查找AI小助手按钮
-                print("\n🔍 步骤1: 查找AI小助手按钮")
-                ai_button = self.find_ai_assistant_button_enhanced(driver, wait)
-                if not ai_button:
-                    print("❌ 未找到AI小助手按钮，正在进行详细诊断...")
-                    self.debug_page_content(driver)
-                    print("❌ 此视频可能不支持AI功能，或页面结构发生变化")
-                    return None
-                
-                # 第二步：点击AI小助手按钮
-                print("\n👆 步骤2: 点击AI小助手按钮")
-                success = self.click_ai_assistant_enhanced(driver, ai_button)
-                if not success:
-                    print("❌ AI小助手按钮点击失败")
-                    return None
-                
-                # 第三步：等待AI面板完全加载并稳定
-                print("\n⏳ 步骤3: 等待AI面板完全加载")
-                print("💡 AI面板需要时间渲染，请耐心等待...")
-                time.sleep(5)  # 给AI面板更多时间完全渲染
-                
-                # 第四步：检查当前所在的标签页
-                print("\n🔍 步骤4: 检查当前所在的标签页")
-                print("💡 这是关键步骤！必须确认在字幕列表页才能提取字幕")
-                
+            # 验证切换结果：等待字幕行渲染完成
+            with self.profile_step('tab_switch'):
+                self.wait_for_condition(driver, SUBTITLE_ROWS_READY_CONDITION, self.step_timeouts['tab_switch'],
+                                        '字幕列表渲染', args=[AI_PANEL_SELECTORS, SUBTITLE_ITEM_SELECTORS])
+            with self.profile_step('tab_check'):
                 is_on_subtitle_tab = self.check_if_on_subtitle_tab(driver)
-                
-                print(f"\n📊 检测结果: is_on_subtitle_tab = {is_on_subtitle_tab}")
-                
-                if is_on_subtitle_tab:
-                    print("✅ 已经在字幕列表标签页，可以直接提取字幕")
-                else:
-                    print("❌ 当前不在字幕列表页，可能在'视频总结'页或其他页面")
-                    print("🔴 这就是为什么会提取到错误数据的原因！")
-                    
-                    # 第五步：切换到字幕列表标签页
-                    print("\n🔄 步骤5: 切换到字幕列表标签页")
-                    print("💡 正在尝试点击'字幕列表'标签...")
+            if not is_on_subtitle_tab:
+                print("❌ 切换到字幕列表标签页失败")
+                return None
+            else:
+                print("✅ 成功切换到字幕列表标签页")
+        
+        # 最后步骤：滚动获取所有字幕内容
+        print("\n📜 最后步骤: 获取字幕内容（智能滚动）")
+        print("💡 即将开始提取字幕数据，请稍等...")
+        with self.profile_step('harvest'):
+            subtitles = self.extract_subtitles_with_smart_scroll(driver)
+        
+        if subtitles and len(subtitles) > 0:
+            print(f"\n✅ 成功获取 {len(subtitles[0]['body']) if subtitles[0].get('body') else 0} 条字幕")
+            if ai_summary:
+                subtitles[0]['ai_summary'] = ai_summary
+            return subtitles
+        else:
+            print("❌ 未获取到字幕内容")
+            return None
+    
+    def get_ai_subtitles_pipelined(self, bvids, capture_network=False):
+        """流水线批量提取：采集当前视频的同时在后台标签页预加载下一个视频，完成后切换到该标签页
+        
+        页面加载与上一个视频的采集重叠，稳态下每个视频的耗时接近采集本身的耗时。
+        开启请求屏蔽时，每个预加载的标签页在导航前设置屏蔽规则，各标签页的流量合并统计。
+        
+        Returns:
+            {bvid: 字幕列表或 None}
+        """
+        results = {bvid: None for bvid in bvids}
+        if not bvids:
+            return results
+        
+        try:
+            driver, pooled = self.acquire_edge_driver(capture_network=capture_network)
+        except Exception as e:
+            print(f"❌ AI字幕获取失败: {str(e)}")
+            return results
+        if not driver:
+            print("❌ AI字幕获取失败: 无法启动Edge浏览器")
+            return results
+        home_handle = driver.current_window_handle
+        preloaded = {}  # bvid -> 预加载的标签页句柄
+        try:
+            preloaded[bvids[0]] = self.preload_video_tab(driver, bvids[0])
+            for i, bvid in enumerate(bvids):
+                handle = preloaded.pop(bvid, None)
+                if handle is None:
+                    print(f"❌ [{bvid}] 无法打开标签页")
+                    continue
+                with self.profile_run(bvid):
+                    with self.profile_step('switch_tab'):
+                        driver.switch_to.window(handle)
+                        try:
+                            # 切换到前台，解除后台标签页的定时器和渲染节流
+                            driver.execute_cdp_cmd('Page.bringToFront', {})
+                        except Exception:
+                            pass
                     
-                    success = self.ensure_subtitle_tab_active(driver)
-                    if not success:
-                        print("❌ 无法切换到字幕列表标签页")
-                        print("💡 可能的原因：")
-                        print("   - 此视频不支持字幕功能")
-                        print("   - AI面板结构发生了变化")
-                        print("   - 页面加载不完整")
-                        return None
+                    # 采集当前视频前先开始加载下一个视频
+                    if i + 1 < len(bvids):
+                        with self.profile_step('preload_next'):
+                            preloaded[bvids[i + 1]] = self.preload_video_tab(driver, bvids[i + 1])
                     
-                    # 验证切换结果
-                    time.sleep(3)  # 等待标签页切换完成
-                    is_on_subtitle_tab = self.check_if_on_subtitle_tab(driver)
-                    if not is_on_subtitle_tab:
-                        print("❌ 切换到字幕列表标签页失败")
-                        return None
-                    else:
-                        print("✅ 成功切换到字幕列表标签页")
-                
-                # 最后步骤：滚动获取所有字幕内容
-                print("\n📜 最后步骤: 获取字幕内容（智能滚动）")
-                print("💡 即将开始提取字幕数据，请稍等...")
-                subtitles = self.extract_subtitles_with_smart_scroll(driver)
-                
-                if subtitles and len(subtitles) > 0:
-                    print(f"\n✅ 成功获取 {len(subtitles[0]['body']) if subtitles[0].get('body') else 0} 条字幕")
-                    return subtitles
-                else:
-                    print("❌ 未获取到字幕内容")
-                    return None
+                    print(f"\n📺 [{i + 1}/{len(bvids)}] {bvid}")
+                    start_time = time.time()
+                    try:
+                        network = self.start_network_capture(driver) if capture_network else False
+                        results[bvid] = self.extract_ai_subtitles_on_page(driver, bvid, network)
+                    except Exception as e:
+                        print(f"❌ [{bvid}] AI字幕获取失败: {str(e)}")
+                    print(f"⏱️ [{bvid}] 用时 {time.time() - start_time:.1f}秒")
+                    with self.profile_step('close_tab'):
+                        self.close_tab(driver, handle)
+        finally:
+            for handle in preloaded.values():
+                if handle:
+                    self.close_tab(driver, handle)
+            try:
+                driver.switch_to.window(home_handle)
+            except Exception:
+                pass
+            if self.block_resources:
+                self.report_request_blocking(driver)
+            self.selector_cache.flush()
+            self.release_edge_driver(driver, pooled)
+        return results
+    
+    def preload_video_tab(self, driver, bvid):
+        """新建标签页并开始加载视频页（不等待页面加载），返回新标签页句柄，当前标签页保持不变
+        
+        标签页由 WebDriver 新建（不经过页面脚本的 window.open，不受弹窗拦截影响），
+        导航通过赋值 location.href 发起，脚本立即返回，不等待页面加载。
+        """
+        current = driver.current_window_handle
+        handle = None
+        try:
+            driver.switch_to.new_window('tab')
+            handle = driver.current_window_handle
+            if self.block_resources:
+                # 屏蔽规则按标签页生效，需在导航前设置
+                self.enable_request_blocking(driver, reset_stats=False)
+            driver.execute_script("window.location.href = arguments[0];",
+                                  f"https://www.bilibili.com/video/{bvid}")
+        except Exception as e:
+            print(f"⚠️ [{bvid}] 预加载标签页失败: {str(e)[:80]}")
+            if handle:
+                self.close_tab(driver, handle)
+            handle = None
+        try:
+            driver.switch_to.window(current)
+        except Exception:
+            pass
+        return handle
+    
+    def close_tab(self, driver, handle):
+        """关闭标签页（关闭后需切换到其他标签页才能继续操作）"""
+        self.forget_layout_fingerprint(driver, handle)
+        try:
+            driver.switch_to.window(handle)
+            driver.close()
+        except Exception:
+            pass
+    
+    def get_ai_subtitles_multi_tab(self, bvids, tabs=3, settle=0.15):
+        """在同一浏览器中打开多个标签页，交错推进各视频的AI字幕提取
+        
+        每个标签页按 页面加载 → 查找按钮 → 点击 → 等待面板 → 切换字幕列表 → 滚动采集 的步骤推进，
+        每轮只对各标签页做一次非阻塞检查或操作，一个标签页等待渲染时其他标签页继续工作。
+        
+        Args:
+            bvids: 视频BV号列表
+            tabs: 同时打开的标签页数
+            settle: 每次滚动后列表DOM保持静默多少秒视为渲染完成（非阻塞检查，期间处理其他标签页）
+        
+        Returns:
+            {bvid: 字幕列表（与 get_ai_subtitle_with_edge 结构相同），失败时为 None}
+        """
+        results = {bvid: None for bvid in bvids}
+        pending = list(dict.fromkeys(bvids))
+        if not pending:
+            return results
+        
+        try:
+            driver, pooled = self.acquire_edge_driver()
+        except Exception as e:
+            print(f"❌ AI字幕获取失败: {str(e)}")
+            return results
+        if not driver:
+            print("❌ AI字幕获取失败: 无法启动Edge浏览器")
+            return results
+        
+        tab_count = max(1, min(tabs, len(pending)))
+        print(f"🗂️ 多标签页模式: {len(pending)} 个视频，{tab_count} 个标签页")
+        start_time = time.time()
+        main_handle = driver.current_window_handle
+        opened_handles = []
+        
+        try:
+            jobs = []
+            for i in range(tab_count):
+                if i > 0:
+                    driver.switch_to.new_window('tab')
+                    opened_handles.append(driver.current_window_handle)
+                if self.block_resources:
+                    # 屏蔽规则按标签页生效，之后的导航保持有效；多个标签页的流量合并统计
+                    self.enable_request_blocking(driver, reset_stats=(i == 0))
+                jobs.append(self.start_ai_tab_job(driver, driver.current_window_handle, pending.pop(0)))
+            
+            while jobs:
+                progressed = False
+                for job in list(jobs):
+                    driver.switch_to.window(job['handle'])
+                    try:
+                        status = self.advance_ai_tab_job(driver, job, settle)
+                    except Exception as e:
+                        print(f"❌ [{job['bvid']}] 提取出错: {str(e)[:80]}")
+                        status = 'done'
                     
-            finally:
-                try:
-                    print("⏸️ 操作完成，5秒后关闭浏览器...")
-                    print("👀 您可以观察最后的页面状态")
-                    time.sleep(5)  # 给用户时间观察结果
-                    driver.quit()
-                    print("🔚 浏览器已关闭")
-                except:
-                    pass
+                    if status == 'done':
+                        results[job['bvid']] = job['result']
+                        jobs.remove(job)
+                        # 标签页空出后立即开始下一个视频
+                        if pending:
+                            jobs.append(self.start_ai_tab_job(driver, job['handle'], pending.pop(0)))
+                    if status != 'waiting':
+                        progressed = True
                 
+                if not progressed:
+                    time.sleep(0.1)
+            
+            if self.block_resources:
+                self.report_request_blocking(driver)
+        
+        finally:
+            for handle in opened_handles:
+                self.close_tab(driver, handle)
+            try:
+                driver.switch_to.window(main_handle)
+            except Exception:
+                pass
+            self.selector_cache.flush()
+            self.release_edge_driver(driver, pooled)
+        
+        success_count = sum(1 for subtitles in results.values() if subtitles)
+        print(f"🗂️ 多标签页提取完成: {success_count}/{len(results)} 成功，用时 {time.time() - start_time:.1f}秒")
+        return results
+    
+    def start_ai_tab_job(self, driver, handle, bvid):
+        """在指定标签页开始一个视频的提取任务（非阻塞导航）"""
+        video_url = f"https://www.bilibili.com/video/{bvid}"
+        print(f"📺 [{bvid}] 访问视频页面: {video_url}")
+        self.forget_layout_fingerprint(driver, handle)
+        driver.execute_script("window.location.href = arguments[0];", video_url)
+        return {
+            'handle': handle,
+            'bvid': bvid,
+            'state': 'page',
+            'deadline': time.time() + self.step_timeouts['page_load'],
+            'fingerprint': None,
+            'tab_clicked': False,
+            'rows': [],
+            'seen': set(),
+            'stuck': 0,
+            'container': None,
+            'scrolls': 0,
+            'quiet_deadline': None,
+            'not_before': 0,
+            'summary': None,
+            'result': None
+        }
+    
+    def advance_ai_tab_job(self, driver, job, settle=0.15):
+        """将标签页任务推进一步
+        
+        Returns:
+            'done'（任务结束，结果在 job['result']）、'progress'（执行了操作）或 'waiting'（条件未满足）
+        """
+        now = time.time()
+        bvid = job['bvid']
+        state = job['state']
+        
+        if now < job['not_before']:
+            return 'waiting'
+        
+        if job['deadline'] is not None and now > job['deadline']:
+            print(f"❌ [{bvid}] 步骤超时: {state}")
+            return 'done'
+        
+        if state == 'page':
+            # 导航生效前旧页面仍处于就绪状态，需同时确认地址已切换到目标视频
+            if not self.check_condition(driver, NAVIGATED_PAGE_READY_CONDITION, [bvid]):
+                return 'waiting'
+            job['fingerprint'] = self.get_layout_fingerprint(driver)
+            job['state'] = 'button'
+            return 'progress'
+        
+        if state == 'button':
+            fingerprint = job['fingerprint']
+            selectors = self.selector_cache.prioritize(fingerprint, 'ai_button', self.get_ai_button_selectors())
+            candidates = self.collect_ai_button_candidates(driver, selectors)
+            element = None
+            if candidates is not None:
+                element = self.select_ai_button_from_candidates(driver, selectors, candidates, fingerprint)
+            if element is None:
+                # 按钮可能尚未渲染，超时前稍后重试
+                job['not_before'] = now + 0.5
+                return 'waiting'
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", element)
+            print(f"👆 [{bvid}] 已点击AI小助手按钮")
+            job['state'] = 'panel'
+            job['deadline'] = now + self.step_timeouts['ai_panel'] + self.step_timeouts['panel_render']
+            job['not_before'] = now + 0.5
+            return 'progress'
+        
+        if state == 'panel':
+            if not self.check_condition(driver, VISIBLE_TEXT_CONDITION, [['字幕列表'], 1]):
+                return 'waiting'
+            # 组件状态中已有字幕时直接完成，无需切换标签页和滚动
+            job['result'] = self.read_page_state(driver, bvid)
+            if job['result']:
+                print(f"✅ [{bvid}] 成功获取 {len(job['result'][0]['body'])} 条字幕（页面状态）")
+                # 面板刚打开时显示视频总结，页面状态中没有总结时从面板读取
+                self.attach_summary_from_panel(driver, job['result'])
+                return 'done'
+            # 切换到字幕列表前顺带读取总结，采集结束后附加到结果
+            if self.include_summary:
+                job['summary'] = self.harvest_summary_in_page(driver)
+            job['state'] = 'tab'
+            job['deadline'] = now + self.step_timeouts['tab_switch']
+            return 'progress'
+        
+        if state == 'tab':
+            if self.check_condition(driver, SUBTITLE_ROWS_READY_CONDITION, [AI_PANEL_SELECTORS, SUBTITLE_ITEM_SELECTORS]):
+                print(f"✅ [{bvid}] 字幕列表已就绪")
+                job['state'] = 'harvest'
+                # 采集阶段不设时间上限：多个标签页交错推进时长视频的采集耗时无法预估，
+                # 只在滚动到底或连续多次无法滚动时结束，避免把截断的字幕当作完整结果保存
+                job['deadline'] = None
+                job['config'] = self.build_harvest_config(job['fingerprint'])
+                return 'progress'
+            if job['tab_clicked']:
+                return 'waiting'
+            state = self.inspect_panel_tabs(driver, activate=True)
+            clicked = state['clicked'] if state and state.get('found') else driver.execute_script(SUBTITLE_TAB_CLICK_JS)
+            if not clicked:
+                return 'waiting'
+            job['tab_clicked'] = True
+            print(f"🔄 [{bvid}] 切换到字幕列表标签页")
+            return 'progress'
+        
+        if state == 'harvest':
+            if job['quiet_deadline'] is not None:
+                # 上次滚动后的重新渲染未结束时先处理其他标签页；超过滚动步骤超时则直接采集
+                quiet = self.check_condition(driver, DOM_QUIET_CONDITION,
+                                             [job['container'], int(settle * 1000), job['scrolls']])
+                if not quiet and now < job['quiet_deadline']:
+                    return 'waiting'
+                job['quiet_deadline'] = None
+            
+            result = driver.execute_script(AI_SUBTITLE_HARVEST_JS, job['config'])
+            if not result or not result.get('found'):
+                return self.finish_ai_tab_job(job)
+            
+            for row in result.get('rows') or []:
+                key = (row['time'], row['content'])
+                if key not in job['seen']:
+                    job['seen'].add(key)
+                    job['rows'].append({'time': row['time'], 'content': row['content']})
+            
+            job['stuck'] = 0 if result.get('scrolled') else job['stuck'] + 1
+            if result.get('atEnd') or job['stuck'] >= 3:
+                return self.finish_ai_tab_job(job)
+            job['container'] = result.get('container')
+            job['scrolls'] += 1
+            job['quiet_deadline'] = now + self.step_timeouts['scroll']
+            return 'progress'
+        
+        return 'done'
+    
+    def finish_ai_tab_job(self, job):
+        """结束标签页任务，将已采集的字幕行转换为标准格式"""
+        if job['rows']:
+            job['result'] = self.convert_ai_subtitles_to_standard_format(job['rows']) or None
+        if job['result'] and job['summary']:
+            job['result'][0]['ai_summary'] = job['summary']
+        if job['result']:
+            print(f"✅ [{job['bvid']}] 成功获取 {len(job['result'][0]['body'])} 条字幕")
+        else:
+            print(f"❌ [{job['bvid']}] 未获取到字幕内容")
+        return 'done'
+    
+    def profile_run(self, bvid):
+        """一次视频提取的分步计时上下文（未开启计时时为空操作）"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.run(bvid)
+    
+    def profile_step(self, name):
+        """分步计时的步骤上下文（未开启计时时为空操作）"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.step(name)
+    
+    def acquire_edge_driver(self, capture_network=False):
+        """获取浏览器会话：开启会话池时从池中借出，否则新建
+        
+        Returns:
+            (driver, 是否来自会话池)
+        """
+        if self.browser_pool is not None:
+            # 从会话池借出已预热的浏览器会话，省去启动与关闭的开销
+            driver, pooled = self.browser_pool.acquire(), True
+        else:
+            print("🔄 连接策略: 1. 调试模式连接 → 2. 用户配置启动 → 3. 错误提示")
+            driver, pooled = self.create_edge_driver(capture_network=capture_network), False
+        if self.profiler is not None:
+            self.profiler.attach(driver)
+        return driver, pooled
+    
+    def release_edge_driver(self, driver, pooled):
+        """归还或关闭 acquire_edge_driver 取得的浏览器会话"""
+        if pooled:
+            # 归还会话池，由会话池决定保留（仅导航复用）还是关闭
+            self.browser_pool.release(driver)
+        else:
+            self.close_edge_driver(driver)
+    
+    def create_edge_driver(self, capture_network=False, port=None):
+        """创建 WebDriver：优先连接调试模式实例，失败时使用用户配置启动
+        
+        浏览器类型与路径由 self.browser 决定（默认Edge）；没有图形界面的Linux服务器上改为启动无头浏览器。
+        
+        Args:
+            capture_network: 是否开启性能日志以支持网络抓包
+            port: 只连接该调试端口上的实例（浏览器集群），连接失败时不再启动新浏览器
+        """
+        if self.browser_backend == 'devtools':
+            if self.headless and port is None:
+                # devtools 后端只连接已运行的调试实例，不能在此启动无头浏览器（否则会连到可见的 9222 实例）
+                raise Exception("devtools 后端不支持无头模式：请使用 --fleet 启动无头实例，或改用 selenium 后端")
+            return self.create_devtools_driver(port=port or 9222)
+        if self.headless and port is None:
+            return self.create_headless_edge_driver()
+        
+        browser = self.browser
+        
+        # 请求屏蔽统计同样依赖性能日志中的网络事件
+        capture_network = capture_network or self.block_resources
+        
+        # 方法1: 尝试连接已运行的Edge调试实例（推荐）
+        debugger_address = f"127.0.0.1:{port or 9222}"
+        try:
+            debug_options = browser.new_options()
+            debug_options.add_experimental_option("debuggerAddress", debugger_address)
+            if capture_network:
+                self.enable_performance_logging(debug_options)
+            driver = browser.start_driver(debug_options)
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            # 连接的是已运行的浏览器：驱动进程不是浏览器的父进程，quit 也不会关闭浏览器
+            driver.debugger_address = debugger_address
+            print(f"✅ 成功连接到{browser.name}调试模式（保持登录状态）: {debugger_address}")
+            return driver
+        except Exception as debug_error:
+            print(f"调试模式连接失败: {debug_error}")
+            if port is not None:
+                raise Exception(f"无法连接浏览器实例 {debugger_address}")
+        
+        if not browser.has_display():
+            print("🖥️ 未检测到图形界面，改为启动无头浏览器")
+            return self.create_headless_edge_driver()
+        
+        # 方法2: 尝试使用默认用户数据目录启动
+        try:
+            edge_options = browser.new_options()
+            # 明确指定用户数据目录来保持登录状态
+            edge_options.add_argument(f'--user-data-dir={browser.user_data_dir}')
+            edge_options.add_argument('--profile-directory=Default')
+            edge_options.add_argument('--no-sandbox')
+            edge_options.add_argument('--disable-dev-shm-usage')
+            edge_options.add_argument('--disable-web-security')
+            edge_options.add_argument('--window-size=1920,1080')
+            edge_options.add_argument('--start-maximized')  # 确保窗口最大化显示
+            edge_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0')
+            edge_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+            edge_options.add_experimental_option('useAutomationExtension', False)
+            # 设置为使用默认用户配置（这样能保持登录状态）
+            edge_options.add_argument('--disable-blink-features=AutomationControlled')
+            if capture_network:
+                self.enable_performance_logging(edge_options)
+            
+            driver = browser.start_driver(edge_options)
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            print(f"✅ 使用用户配置启动{browser.name}浏览器（保持登录状态）")
+            print("📝 注意: 如果未登录B站，请在新窗口中手动登录")
+            return driver
+        except Exception as normal_error:
+            print(f"正常模式启动失败: {normal_error}")
+            raise Exception(f"{browser.name}浏览器启动失败。请先以调试模式启动浏览器: {browser.debug_command()}")
+    
+    def create_headless_edge_driver(self):
+        """启动无头浏览器（无头抓取模式），使用 self.browser.user_data_dir 中的登录状态
+        
+        注意: 该用户数据目录不能同时被其他浏览器实例占用
+        """
+        browser = self.browser
+        options = browser.new_options()
+        options.add_argument('--headless=new')
+        options.add_argument(f'--user-data-dir={browser.user_data_dir}')
+        options.add_argument('--profile-directory=Default')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument('--mute-audio')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-background-networking')
+        options.add_argument('--autoplay-policy=user-gesture-required')  # 播放器不自动拉取视频流
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        # 无头模式下的默认UA带有 HeadlessEdg / HeadlessChrome 标识
+        options.add_argument('--user-agent=' + self.session.headers['User-Agent'])
+        options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        self.enable_performance_logging(options)
+        
+        try:
+            driver = browser.start_driver(options)
         except Exception as e:
-            print(f"❌ AI字幕获取失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            print(f"无头模式启动失败: {e}")
+            raise Exception(f"无头{browser.name}启动失败。请确认没有其他{browser.name}实例正在使用该用户数据目录: {browser.user_data_dir}")
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        print(f"✅ 已启动无头{browser.name}浏览器（无头抓取模式）")
+        return driver
+    
+    def create_devtools_driver(self, host='127.0.0.1', port=9222):
+        """通过DevTools协议直连已运行的调试模式浏览器（不经过WebDriver），网络事件始终可用"""
+        try:
+            from devtools_backend import DevToolsDriver
+            driver = DevToolsDriver.connect(host, port)
+        except ImportError as e:
+            raise Exception(str(e))
+        except Exception as e:
+            print(f"DevTools直连失败: {e}")
+            raise Exception(f"无法连接 {host}:{port}。请先运行GUI中的'启动Edge调试模式'按钮")
+        driver.debugger_address = f"{host}:{port}"
+        print("✅ 已通过DevTools协议直连Edge调试模式（保持登录状态）")
+        return driver
+    
+    def close_edge_driver(self, driver):
+        """单次提取结束后关闭浏览器（非会话池模式）"""
+        import time
+        
+        try:
+            print("⏸️ 操作完成，5秒后关闭浏览器...")
+            print("👀 您可以观察最后的页面状态")
+            time.sleep(5)  # 给用户时间观察结果
+            driver.quit()
+            print("🔚 浏览器已关闭")
+        except:
+            pass
+    
+    def enable_browser_pool(self, size=1, keep_alive=True, capture_network=False, warm_up=True):
+        """开启浏览器会话池，批量提取时复用已连接的浏览器会话
+        
+        Args:
+            size: 会话池中保持的最大会话数
+            keep_alive: True 时任务结束后保留会话，下一个任务直接导航；False 时每个任务结束后关闭
+            capture_network: 会话是否开启性能日志以支持网络抓包
+            warm_up: 是否立即预先创建全部会话
+        """
+        if self.browser_pool:
+            self.browser_pool.close_all()
+        # 会话自己启动的浏览器是驱动进程的子进程，从驱动进程向下统计内存；
+        # 连接已运行的调试实例时无法确定浏览器进程，重启也只是断开连接，因此只按标签页回收
+        self.browser_pool = BrowserSessionPool(
+            lambda: self.create_edge_driver(capture_network=capture_network),
+            size=size,
+            keep_alive=keep_alive,
+            monitor=BrowserMemoryMonitor(process_id=self.driver_process_id, restartable=self.owns_browser,
+                                         **self.browser_recycle)
+        )
+        if warm_up:
+            self.browser_pool.warm_up()
+        return self.browser_pool
+    
+    @staticmethod
+    def driver_process_id(driver):
+        """Selenium会话的驱动进程号（msedgedriver / chromedriver），其下是会话启动的浏览器进程；
+        连接已运行浏览器的会话和其他后端返回 None"""
+        if not BilibiliSubtitleExtractor.owns_browser(driver):
+            return None
+        process = getattr(getattr(driver, 'service', None), 'process', None)
+        return getattr(process, 'pid', None)
+    
+    @staticmethod
+    def owns_browser(driver):
+        """会话是否由自己启动浏览器（连接已运行的调试模式浏览器时为 False）"""
+        return getattr(driver, 'debugger_address', None) is None
+    
+    def close_browser_pool(self):
+        """关闭会话池及其中的全部浏览器会话（开启了浏览器集群时同时关闭集群实例）"""
+        if self.browser_pool:
+            self.browser_pool.close_all()
+            self.browser_pool = None
+        if self.browser_fleet:
+            self.browser_fleet.stop()
+            self.browser_fleet = None
+    
+    def enable_browser_fleet(self, size=2, base_port=9300, capture_network=False):
+        """启动浏览器集群并以其为会话池：size 个无头实例，各自使用登录配置的副本和独立调试端口
+        
+        各实例的用户数据目录互不相同，不会争用同一配置文件锁，也不影响用户正在使用的浏览器。
+        
+        Args:
+            size: 实例数（同时也是会话池大小和建议的并发数）
+            base_port: 第一个实例的调试端口，其余实例依次递增
+            capture_network: 会话是否开启性能日志以支持网络抓包
+        """
+        self.close_browser_pool()
+        fleet = BrowserFleet(self.browser.user_data_dir, self.cache_dir / 'browser_fleet',
+                             size=size, base_port=base_port, browser=self.browser)
+        fleet.start()
+        self.browser_fleet = fleet
+        self.browser_pool = BrowserSessionPool(
+            lambda: fleet.attach(lambda port: self.create_edge_driver(capture_network=capture_network, port=port)),
+            size=size,
+            keep_alive=True,
+            on_discard=fleet.detach,
+            separate_tabs=False,
+            monitor=BrowserMemoryMonitor(process_id=fleet.process_id, **self.browser_recycle),
+            on_restart=fleet.restart
+        )
+        self.browser_pool.warm_up()
+        return fleet
+    
+    def wait_for_condition(self, driver, condition, timeout, description='', args=None):
+        """事件驱动等待：在页面内用 MutationObserver 监听DOM变化并检查条件，满足即返回
+        
+        Args:
+            condition: JS条件函数体（返回布尔值，可使用 args）
+            timeout: 最长等待秒数
+            description: 日志中显示的步骤名称
+            args: 传给条件函数的附加参数列表（可包含WebElement）
+        
+        Returns:
+            条件在超时前是否满足
+        """
+        start_time = time.time()
+        try:
+            driver.set_script_timeout(timeout + 5)
+            satisfied = bool(driver.execute_async_script(
+                WAIT_FOR_CONDITION_JS, condition, int(timeout * 1000), args or []
+            ))
+        except Exception as e:
+            # 异步脚本不可用时回退为轮询
+            print(f"   ⚠️ 事件等待不可用，改为轮询: {str(e)[:60]}")
+            satisfied = self.poll_for_condition(driver, condition, timeout - (time.time() - start_time), args)
+        
+        if description:
+            elapsed = time.time() - start_time
+            print(f"   ⏱️ {description}: {'就绪' if satisfied else '超时'} ({elapsed:.1f}秒)")
+        return satisfied
+    
+    def poll_for_condition(self, driver, condition, timeout, args=None, interval=0.25):
+        """轮询检查JS条件（wait_for_condition 的回退方式）"""
+        deadline = time.time() + max(timeout, 0)
+        while True:
+            if self.check_condition(driver, condition, args):
+                return True
+            if time.time() >= deadline:
+                return False
+            time.sleep(interval)
+    
+    def check_condition(self, driver, condition, args=None):
+        """单次检查JS条件，不等待"""
+        script = f"return (function(args) {{ {condition} }})(arguments[0]);"
+        try:
+            return bool(driver.execute_script(script, args or []))
+        except Exception:
+            return False
+    
+    def wait_for_dom_quiet(self, driver, root=None, quiet=0.15, timeout=2):
+        """等待根元素下的DOM停止变化（如滚动后虚拟列表完成重新渲染）
+        
+        Returns:
+            等待期间DOM是否发生过变化
+        """
+        try:
+            driver.set_script_timeout(timeout + 5)
+            return bool(driver.execute_async_script(
+                WAIT_FOR_DOM_QUIET_JS, root, int(quiet * 1000), int(timeout * 1000)
+            ))
+        except Exception:
+            time.sleep(quiet)
+            return True
+    
+    def get_layout_fingerprint(self, driver):
+        """计算页面布局指纹：播放器、工具栏和AI小助手区域内CSS Modules类名哈希后缀集合的摘要
+        
+        每个页面只在第一次调用时计算（页面就绪后、打开AI面板前），之后返回同一指纹，
+        单标签页和多标签页流程在同一时刻取指纹，共用选择器缓存条目。
+        """
+        import hashlib
+        
+        key = self.layout_fingerprint_key(driver)
+        if key in self.layout_fingerprints:
+            return self.layout_fingerprints[key]
+        try:
+            hashes = driver.execute_script(LAYOUT_FINGERPRINT_JS, LAYOUT_ROOT_SELECTORS) or []
+        except Exception:
+            return 'default'
+        fingerprint = hashlib.md5('|'.join(hashes).encode('utf-8')).hexdigest()[:12] if hashes else 'default'
+        self.layout_fingerprints[key] = fingerprint
+        return fingerprint
+    
+    def forget_layout_fingerprint(self, driver, handle=None):
+        """页面即将导航或标签页关闭时清除已记录的布局指纹"""
+        self.layout_fingerprints.pop(self.layout_fingerprint_key(driver, handle), None)
+    
+    @staticmethod
+    def layout_fingerprint_key(driver, handle=None):
+        if handle is None:
+            try:
+                handle = driver.current_window_handle
+            except Exception:
+                handle = None
+        return (id(driver), handle)
+    
+    def check_page_access(self, driver):
+        """检查页面是否已加载且已登录、没有人机验证或登录弹窗
+        
+        Returns:
+            问题描述；页面正常时返回 None
+        """
+        try:
+            state = driver.execute_script(PAGE_ACCESS_JS) or {}
+        except Exception:
+            return '无法确认页面状态'
+        if not state.get('ready'):
+            return '页面未加载完成'
+        if state.get('blocked'):
+            return '页面出现人机验证或登录弹窗'
+        if not state.get('loggedIn'):
+            return '浏览器未登录B站'
+        return None
+    
+    def read_page_state(self, driver, bvid):
+        """一次脚本调用读取页面前端状态中的视频信息和AI字幕
+        
+        视频信息保存到 page_video_info，之后无需再请求视频信息接口。
+        
+        Returns:
+            标准格式的字幕列表；状态中没有字幕（或脚本失败）时返回 None，调用方回退到DOM提取
+        """
+        try:
+            state = driver.execute_script(PAGE_STATE_JS, AI_PANEL_SELECTORS) or {}
+        except Exception as e:
+            print(f"   ⚠️ 页面状态读取失败: {str(e)[:60]}")
+            return None
+        
+        video = state.get('video')
+        if video and video.get('bvid') == bvid:
+            self.page_video_info[bvid] = video
+        
+        if not state.get('subtitles'):
             return None
+        # 组件状态中同一字幕数组可能有多份引用（如响应式代理与原始对象），按时间和内容去重
+        seen = set()
+        rows = []
+        for row in state['subtitles']['body']:
+            key = (row['from'], row['content'])
+            if key not in seen and row['from'] is not None:
+                seen.add(key)
+                rows.append(row)
+        rows.sort(key=lambda row: float(row['from']))
+        for i, row in enumerate(rows):
+            if row['to'] is None or float(row['to']) <= float(row['from']):
+                row['to'] = rows[i + 1]['from'] if i + 1 < len(rows) else float(row['from']) + 2
+        subtitles = self.parse_ai_subtitle_response({'body': rows})
+        ai_summary = self.parse_ai_summary(state.get('summary')) if self.include_summary else None
+        if subtitles and ai_summary:
+            subtitles[0]['ai_summary'] = ai_summary
+        return subtitles
     
     def convert_ai_content_to_subtitle(self, ai_content):
         """将AI内容转换为字幕格式"""
@@ -360,7 +1813,6 @@ class BilibiliSubtitleExtractor:
         """从页面中提取AI生成的内容"""
         try:
             import re
-            from selenium.webdriver.common.by import By
             
             # 获取页面全部文本
             page_text = driver.find_element(By.TAG_NAME, "body").get_attribute('textContent')
@@ -432,88 +1884,340 @@ class BilibiliSubtitleExtractor:
             return None
             
         except Exception as e:
-            print(f"提取AI内容时出错: {str(e)}")
+            print(f"提取AI内容时出错: {str(e)}")
+            return None
+    
+    def extract_bvid_from_url(self, url):
+        """从 B站URL中提取BV号"""
+        import re
+        patterns = [
+            r'BV[a-zA-Z0-9]+',
+            r'av(\d+)',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                if pattern.startswith('av'):
+                    return match.group(0)
+                else:
+                    return match.group(0)
+        
+        raise ValueError("无法从URL中提取有效的视频ID")
+    
+    def get_video_info(self, bvid):
+        """获取视频基本信息"""
+        api_url = f"{self.api_base}/x/web-interface/view?bvid={bvid}"
+        
+        try:
+            response = self.session.get(api_url, timeout=10)
+            response.raise_for_status()
+            return self.parse_video_info(response.json())
+        except Exception as e:
+            raise Exception(f"获取视频信息失败: {str(e)}")
+    
+    def parse_video_info(self, data):
+        """将视频信息接口的响应解析为视频信息字典"""
+        if data['code'] != 0:
+            raise Exception(f"获取视频信息失败: {data['message']}")
+        
+        video_info = data['data']
+        return {
+            'title': video_info['title'],
+            'bvid': video_info['bvid'],
+            'aid': video_info['aid'],
+            'cid': video_info['cid'],
+            'owner_mid': (video_info.get('owner') or {}).get('mid'),
+            'pages': video_info['pages']
+        }
+    
+    def import_browser_cookies(self, driver=None):
+        """从浏览器会话导出B站Cookie（SESSDATA、bili_jct 等）到 self.session
+        
+        Args:
+            driver: 已连接的浏览器会话；为 None 时从会话池借用一个会话，没有会话池时只连接
+                已运行的调试模式浏览器（不为导出Cookie启动新浏览器）
+        
+        Returns:
+            是否取得登录Cookie（SESSDATA）
+        """
+        pooled = False
+        own_driver = driver is None
+        try:
+            if own_driver:
+                if self.browser_pool is not None:
+                    driver, pooled = self.browser_pool.acquire(), True
+                else:
+                    driver = self.attach_debug_driver()
+                if driver is None:
+                    print("ℹ️ 没有已运行的调试模式浏览器，跳过Cookie导出")
+                    return False
+            try:
+                # DevTools命令可一次取得全部域名的Cookie（含 HttpOnly 的 SESSDATA）
+                cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            except Exception:
+                # 不支持DevTools命令时只能取得当前页面域名下的Cookie
+                if 'bilibili.com' not in (driver.current_url or ''):
+                    driver.get('https://www.bilibili.com/')
+                cookies = driver.get_cookies()
+        except Exception as e:
+            print(f"⚠️ 从浏览器导出Cookie失败: {str(e)[:80]}")
+            return False
+        finally:
+            if own_driver and driver is not None:
+                if pooled:
+                    self.browser_pool.release(driver)
+                else:
+                    # 只断开与调试实例的连接（浏览器保持运行），无需 close_edge_driver 的观察等待
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+        
+        imported = 0
+        for cookie in cookies:
+            domain = cookie.get('domain') or ''
+            if not domain.endswith('bilibili.com'):
+                continue
+            # CDP 使用 expires（-1 表示会话Cookie），WebDriver 使用 expiry
+            expires = cookie.get('expires', cookie.get('expiry'))
+            expires = int(expires) if expires and expires > 0 else None
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=domain,
+                                     path=cookie.get('path') or '/', expires=expires,
+                                     secure=bool(cookie.get('secure')))
+            imported += 1
+            if cookie['name'] == 'SESSDATA':
+                self.login_cookie_expires = expires
+        
+        found = [name for name in LOGIN_COOKIE_NAMES if self.session.cookies.get(name, domain='.bilibili.com')]
+        logged_in = 'SESSDATA' in found
+        print(f"🍪 已从浏览器导出 {imported} 个B站Cookie（{', '.join(found) or '无登录Cookie'}）")
+        return logged_in
+    
+    def import_cookies_from_session(self, driver):
+        """接口模式下缺少登录Cookie时从AI流程已持有的会话导出（失败后10分钟内不再重试）"""
+        if not self.use_http_api or self.session.cookies.get('SESSDATA', domain='.bilibili.com'):
+            return
+        with self.cookie_lock:
+            if time.time() - self.cookie_import_failed_at < 600:
+                return
+            if not self.import_browser_cookies(driver):
+                self.cookie_import_failed_at = time.time()
+    
+    def attach_debug_driver(self, port=9222):
+        """只连接已在调试端口运行的浏览器；端口未开启或连接失败时返回 None，不启动新浏览器"""
+        if not BrowserFleet.wait_for_port(port, timeout=0):
+            return None
+        try:
+            if self.browser_backend == 'devtools':
+                return self.create_devtools_driver(port=port)
+            return self.create_edge_driver(port=port)
+        except Exception as e:
+            print(f"⚠️ 连接调试模式浏览器失败: {str(e)[:80]}")
+            return None
+    
+    def ensure_login_cookies(self, force=False):
+        """确保 self.session 持有未过期的登录Cookie，缺失或即将过期时从浏览器重新导出
+        
+        导出失败后10分钟内不再重试，避免每个视频都尝试连接浏览器。
+        
+        Args:
+            force: 忽略现有Cookie强制重新导出（接口返回未登录时）
+        """
+        with self.cookie_lock:
+            has_login = bool(self.session.cookies.get('SESSDATA', domain='.bilibili.com'))
+            expired = self.login_cookie_expires is not None and self.login_cookie_expires <= time.time() + 300
+            if has_login and not expired and not force:
+                return True
+            if time.time() - self.cookie_import_failed_at < 600:
+                return has_login and not expired
+            
+            print("🍪 登录Cookie缺失或已过期，从浏览器会话重新导出...")
+            if self.import_browser_cookies():
+                return True
+            self.cookie_import_failed_at = time.time()
+            return False
+    
+    def get_wbi_keys(self):
+        """获取WBI签名密钥（img_key, sub_key），缓存1小时"""
+        if self.wbi_keys and time.time() - self.wbi_keys[2] < 3600:
+            return self.wbi_keys[0], self.wbi_keys[1]
+        
+        response = self.session.get(f'{self.api_base}/x/web-interface/nav', timeout=10)
+        response.raise_for_status()
+        # 未登录时 code 为 -101，但 wbi_img 仍会返回
+        wbi_img = (response.json().get('data') or {}).get('wbi_img') or {}
+        img_key = wbi_img.get('img_url', '').rsplit('/', 1)[-1].split('.')[0]
+        sub_key = wbi_img.get('sub_url', '').rsplit('/', 1)[-1].split('.')[0]
+        if not img_key or not sub_key:
+            raise Exception("获取WBI签名密钥失败")
+        self.wbi_keys = (img_key, sub_key, time.time())
+        return img_key, sub_key
+    
+    def sign_wbi_params(self, params, keys=None):
+        """为接口参数添加WBI签名（wts 时间戳和 w_rid）
+        
+        Args:
+            keys: 已取得的 (img_key, sub_key)；未提供时调用 get_wbi_keys（可能发起网络请求）
+        """
+        import hashlib
+        from urllib.parse import urlencode
+        
+        img_key, sub_key = keys or self.get_wbi_keys()
+        mixin_key = ''.join((img_key + sub_key)[i] for i in WBI_MIXIN_KEY_ENC_TAB)[:32]
+        signed = dict(params, wts=int(time.time()))
+        # 参数按键名排序，值中去除 !'()* 字符
+        signed = {key: ''.join(ch for ch in str(value) if ch not in "!'()*") for key, value in sorted(signed.items())}
+        query = urlencode(signed)
+        signed['w_rid'] = hashlib.md5((query + mixin_key).encode('utf-8')).hexdigest()
+        return signed
+    
+    def api_get(self, url, params=None, wbi=False, login=False):
+        """请求B站接口并返回JSON
+        
+        Args:
+            wbi: 参数需要WBI签名（签名被拒绝时刷新密钥后重试一次）
+            login: 需要登录Cookie（返回未登录时从浏览器重新导出Cookie后重试一次）
+        """
+        if login:
+            self.ensure_login_cookies()
+        
+        for attempt in range(2):
+            query = self.sign_wbi_params(params or {}) if wbi else dict(params or {})
+            response = self.session.get(url, params=query, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            
+            if attempt == 0 and login and data.get('code') == -101 and self.ensure_login_cookies(force=True):
+                continue
+            if attempt == 0 and wbi and data.get('code') == -352:
+                self.wbi_keys = None
+                continue
+            return data
+        return data
+    
+    def get_ai_subtitle_via_api(self, bvid, video_info=None, login=True):
+        """用登录Cookie直接请求AI小助手总结接口获取字幕（无需打开浏览器）
+        
+        接口明确表示视频没有AI总结时写入负缓存（仅限携带登录Cookie的请求，未登录时的结果可能不准确）。
+        
+        Args:
+            login: 是否携带从浏览器导出的登录Cookie（仅预检时可不登录）
+        
+        Returns:
+            标准格式的字幕列表；接口失败或视频没有AI字幕时返回 None
+        """
+        try:
+            video_info = video_info or self.get_video_info(bvid)
+            params = {'bvid': bvid, 'cid': video_info['cid'], 'up_mid': video_info.get('owner_mid') or ''}
+            start_time = time.time()
+            data = self.api_get(f'{self.api_base}/x/web-interface/view/conclusion/get',
+                                params, wbi=True, login=login)
+            if data.get('code') != 0:
+                print(f"⚠️ AI总结接口返回错误: {data.get('code')} {data.get('message', '')}")
+                return None
+            # data.code: 0 有总结，-1 不支持AI总结，1 未识别到语音（均不会再有AI字幕）
+            conclusion_code = (data.get('data') or {}).get('code')
+            if conclusion_code in (-1, 1):
+                reason = '不支持AI总结' if conclusion_code == -1 else '未识别到语音'
+                print(f"ℹ️ [{bvid}] 视频没有AI字幕: {reason}")
+                if login and self.session.cookies.get('SESSDATA', domain='.bilibili.com'):
+                    ttl = self.ai_negative_ttl['api_unsupported' if conclusion_code == -1 else 'api']
+                    self.ai_negative_cache.record(bvid, reason, ttl)
+                return None
+            subtitles = self.parse_ai_subtitle_response(data)
+            if not subtitles:
+                print("⚠️ AI总结接口中没有字幕数据")
+                return None
+            print(f"✅ 通过接口获取 {len(subtitles[0]['body'])} 条AI字幕 ({(time.time() - start_time) * 1000:.0f}ms)")
+            return subtitles
+        except Exception as e:
+            print(f"⚠️ 接口获取AI字幕失败: {str(e)[:80]}")
             return None
     
-    def extract_bvid_from_url(self, url):
-        """从 B站URL中提取BV号"""
-        import re
-        patterns = [
-            r'BV[a-zA-Z0-9]+',
-            r'av(\d+)',
-        ]
+    def precheck_ai_subtitles(self, bvid, video_info=None):
+        """浏览器操作前的快速预检：查负缓存和AI总结接口，判断视频是否可能有AI字幕
         
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                if pattern.startswith('av'):
-                    return match.group(0)
-                else:
-                    return match.group(0)
+        视频信息只在需要请求AI总结接口时获取；交给浏览器提取的视频可改用页面前端状态中的视频信息。
         
-        raise ValueError("无法从URL中提取有效的视频ID")
-    
-    def get_video_info(self, bvid):
-        """获取视频基本信息"""
-        api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
+        Returns:
+            (是否需要继续用浏览器提取, 接口直接取得的字幕, 视频信息)：
+            (False, None, ...) 表示已确认没有AI字幕；(False, 字幕, 视频信息) 表示接口已取得字幕；
+            未请求接口时视频信息为传入的 video_info（可能为 None）；
+            视频信息接口失败时返回 (True, None, video_info)，由浏览器提取并使用页面状态中的视频信息
+        """
+        if self.ai_precheck:
+            cached = self.ai_negative_cache.lookup(bvid)
+            if cached:
+                checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(cached['checked_at']))
+                print(f"⏭️ [{bvid}] 已知没有AI字幕（{cached['reason']}，{checked}），跳过")
+                return False, None, video_info
+        elif not self.use_http_api:
+            return True, None, video_info
         
         try:
-            response = self.session.get(api_url)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data['code'] != 0:
-                raise Exception(f"获取视频信息失败: {data['message']}")
-            
-            video_info = data['data']
-            return {
-                'title': video_info['title'],
-                'bvid': video_info['bvid'],
-                'aid': video_info['aid'],
-                'cid': video_info['cid'],
-                'pages': video_info['pages']
-            }
+            video_info = video_info or self.get_video_info(bvid)
         except Exception as e:
-            raise Exception(f"获取视频信息失败: {str(e)}")
+            print(f"⚠️ [{bvid}] 预检跳过，改用浏览器提取: {str(e)[:80]}")
+            return True, None, video_info
+        subtitles = self.get_ai_subtitle_via_api(bvid, video_info, login=self.use_http_api)
+        if subtitles and self.use_http_api:
+            return False, subtitles, video_info
+        if self.ai_precheck and self.ai_negative_cache.lookup(bvid):
+            return False, None, video_info
+        return True, None, video_info
     
-    def extract_subtitle_from_url(self, video_url, page_num=1, use_ai=False):
+    def extract_subtitle_from_url(self, video_url, page_num=1, use_ai=False, capture_network=False,
+                                  output_format='srt'):
         """从 B站视频URL提取字幕
         
         Args:
             video_url: B站视频URL
             page_num: 页面号(多P视频)
-            use_ai: 是否优先使用AI小助手字幕
+            use_ai: 是否优先使用AI小助手字幕；为 False 时通过接口下载视频现有的字幕（不启动浏览器）
+            capture_network: AI模式下是否通过网络抓包获取字幕
+            output_format: 现有字幕的保存格式 srt / txt / json
         """
         try:
             # 提取视频ID
             bvid = self.extract_bvid_from_url(video_url)
             print(f"提取到视频ID: {bvid}")
             
-            # 获取视频信息
-            video_info = self.get_video_info(bvid)
-            print(f"视频标题: {video_info['title']}")
-            
             # 如果开启AI模式，先尝试获取AI字幕
             if use_ai:
                 print("尝试获取B站AI小助手字幕...")
-                subtitles = self.get_ai_subtitle_with_edge(bvid)
+                video_info = None
+                subtitles = None
+                use_browser = True
+                if self.use_http_api or self.ai_precheck:
+                    # 预检并使用浏览器导出的登录Cookie直接请求接口，无需打开视频页
+                    use_browser, subtitles, video_info = self.precheck_ai_subtitles(bvid)
+                if use_browser:
+                    subtitles = self.get_ai_subtitle_with_edge(bvid, capture_network=capture_network)
                 
+                # 页面前端状态中已读到视频信息时不再请求视频信息接口
+                page_info = self.page_video_info.pop(bvid, None)
                 if subtitles:
+                    video_info = video_info or page_info or self.get_video_info(bvid)
+                    print(f"视频标题: {video_info['title']}")
                     print("AI字幕获取成功!")
-                    # 保存AI字幕
-                    safe_title = re.sub(r'[^\w\-_\. ]', '_', video_info['title'])
-                    filename = f"{safe_title}_AI字幕.srt"
-                    output_file = self.output_dir / filename
-                    
-                    # 转换为SRT格式并保存
-                    srt_content = self.convert_to_srt(subtitles[0]['body'])
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(srt_content)
-                    
-                    print(f"AI字幕已保存到: {output_file}")
+                    self.save_ai_subtitles(video_info, subtitles)
                     return True
                 else:
                     print("AI字幕获取失败")
+            else:
+                # 获取视频信息，直接请求播放器接口下载现有字幕
+                start_time = time.time()
+                video_info = self.get_video_info(bvid)
+                print(f"视频标题: {video_info['title']}")
+                
+                track = self.get_existing_subtitles(video_info, page_num)
+                if track:
+                    output_file = self.save_existing_subtitles(video_info, track, output_format)
+                    print(f"现有字幕已保存到: {output_file} ({(time.time() - start_time) * 1000:.0f}ms)")
+                    return True
+                print("该视频没有现有字幕")
+                return False
             
             # 如果没有AI字幕，返回失败（v2版本主要专注于AI功能）
             print("本版本主要支持AI字幕功能，请尝试使用语音识别模式")
@@ -523,6 +2227,296 @@ class BilibiliSubtitleExtractor:
             print(f"提取字幕时出错: {str(e)}")
             return False
     
+    def get_existing_subtitles(self, video_info, page_num=1):
+        """通过播放器接口获取视频现有的字幕轨道并下载字幕JSON（无需浏览器）
+        
+        有多条字幕时优先选择UP主上传的字幕，其次是AI生成的字幕（lan 以 ai- 开头）。
+        默认匿名请求（self.session 中已有的Cookie会一并发送）；部分视频的字幕列表只对登录用户返回，
+        开启 cc_login 时才会在缺少登录Cookie时从调试模式浏览器导出。
+        
+        Returns:
+            {'lan', 'lan_doc', 'subtitle_url', 'body': [{'from', 'to', 'content'}]}；视频没有字幕时返回 None
+        """
+        data = self.api_get(f'{self.api_base}/x/player/wbi/v2', self.player_params(video_info, page_num),
+                            wbi=True, login=self.cc_login)
+        track = self.select_subtitle_track(data)
+        if not track:
+            return None
+        
+        response = self.session.get(track['subtitle_url'], timeout=10)
+        response.raise_for_status()
+        track['body'] = self.parse_subtitle_body(response.json())
+        if not track['body']:
+            return None
+        print(f"✅ 下载 {track['lan_doc'] or track['lan']} 字幕: {len(track['body'])} 条")
+        return track
+    
+    def player_params(self, video_info, page_num=1):
+        """播放器接口参数（多P视频按页面号取对应分P的 cid）"""
+        pages = video_info.get('pages') or []
+        cid = pages[page_num - 1]['cid'] if 0 < page_num <= len(pages) else video_info['cid']
+        return {'bvid': video_info['bvid'], 'cid': cid}
+    
+    def select_subtitle_track(self, data, verbose=True):
+        """从播放器接口响应中选择要下载的字幕轨道
+        
+        Returns:
+            {'lan', 'lan_doc', 'subtitle_url'}（地址已补全）；没有字幕时返回 None
+        """
+        if data.get('code') != 0:
+            raise Exception(f"获取字幕列表失败: {data.get('code')} {data.get('message', '')}")
+        
+        tracks = ((data.get('data') or {}).get('subtitle') or {}).get('subtitles') or []
+        tracks = [track for track in tracks if track.get('subtitle_url')]
+        if not tracks:
+            return None
+        if verbose:
+            print(f"找到 {len(tracks)} 条字幕: {', '.join(track.get('lan_doc') or track.get('lan', '') for track in tracks)}")
+        track = sorted(tracks, key=lambda item: (item.get('lan') or '').startswith('ai-'))[0]
+        
+        # 字幕地址通常省略协议（//aisubtitle.hdslb.com/...）；以 / 开头的相对地址按接口地址补全
+        subtitle_url = track['subtitle_url']
+        if subtitle_url.startswith('//'):
+            subtitle_url = 'https:' + subtitle_url
+        elif subtitle_url.startswith('/'):
+            subtitle_url = self.api_base + subtitle_url
+        return {'lan': track.get('lan'), 'lan_doc': track.get('lan_doc'), 'subtitle_url': subtitle_url}
+    
+    def parse_subtitle_body(self, data):
+        """将字幕JSON {"body": [{"from", "to", "content"}]} 解析为字幕条目列表（去除空行）"""
+        return [
+            {'from': float(item['from']), 'to': float(item['to']), 'content': item['content'].strip()}
+            for item in data.get('body') or []
+            if (item.get('content') or '').strip()
+        ]
+    
+    async def resolve_videos_async(self, bvids, subtitles=True, page_num=1, max_connections=32, timeout=10):
+        """并发获取一批视频的信息和现有字幕（异步HTTP客户端，见 async_api_client.py）
+        
+        每个视频依次请求视频信息、播放器字幕列表和字幕JSON；不同视频之间并发，
+        同时进行的请求数不超过 max_connections。
+        
+        Args:
+            subtitles: 是否同时下载现有字幕（False 时只获取视频信息）
+            timeout: 每个请求的超时（秒）
+        
+        Returns:
+            ({bvid: {'video_info', 'track', 'error'}}, 客户端)，track 为 None 表示视频没有字幕；
+            客户端的 summary() / throughput() 给出吞吐统计
+        """
+        from async_api_client import AsyncApiClient
+        
+        loop = asyncio.get_running_loop()
+        wbi = {'keys': None}
+        if subtitles:
+            # 导出Cookie和获取签名密钥是阻塞调用，放到线程池执行；之后各请求只做本地签名
+            if self.cc_login:
+                await loop.run_in_executor(None, self.ensure_login_cookies)
+            wbi['keys'] = await loop.run_in_executor(None, self.get_wbi_keys)
+        cookies = {cookie.name: cookie.value for cookie in self.session.cookies}
+        refresh_lock = asyncio.Lock()
+        results = {}
+        
+        async def refresh_wbi_keys(rejected_keys):
+            """签名被拒绝（-352）时刷新一次密钥；并发请求同时被拒绝时只刷新一次"""
+            async with refresh_lock:
+                if wbi['keys'] is rejected_keys:
+                    self.wbi_keys = None
+                    wbi['keys'] = await loop.run_in_executor(None, self.get_wbi_keys)
+        
+        async def get_player(client, params):
+            keys = wbi['keys']
+            data = await client.get_json(f'{self.api_base}/x/player/wbi/v2', self.sign_wbi_params(params, keys))
+            if data.get('code') == -352:
+                await refresh_wbi_keys(keys)
+                data = await client.get_json(f'{self.api_base}/x/player/wbi/v2',
+                                             self.sign_wbi_params(params, wbi['keys']))
+            return data
+        
+        async def resolve(client, bvid):
+            result = results[bvid] = {'video_info': None, 'track': None, 'error': None}
+            try:
+                data = await client.get_json(f'{self.api_base}/x/web-interface/view', {'bvid': bvid})
+                result['video_info'] = video_info = self.parse_video_info(data)
+                if not subtitles:
+                    return
+                data = await get_player(client, self.player_params(video_info, page_num))
+                track = self.select_subtitle_track(data, verbose=False)
+                if track:
+                    track['body'] = self.parse_subtitle_body(await client.get_json(track['subtitle_url']))
+                    result['track'] = track if track['body'] else None
+            except Exception as e:
+                result['error'] = str(e)
+        
+        async with AsyncApiClient(headers=self.session.headers, cookies=cookies,
+                                  max_connections=max_connections, timeout=timeout) as client:
+            await asyncio.gather(*(resolve(client, bvid) for bvid in dict.fromkeys(bvids)))
+        return results, client
+    
+    def extract_existing_subtitles_from_urls(self, video_urls, output_format='srt', max_connections=32, page_num=1):
+        """并发下载一批视频的现有字幕并保存（不启动浏览器）
+        
+        Returns:
+            {url: 是否成功}
+        """
+        outcome = {}
+        bvids = {}
+        for url in video_urls:
+            try:
+                bvids[url] = self.extract_bvid_from_url(url)
+            except Exception as e:
+                print(f"❌ 无法解析视频链接 {url}: {str(e)[:80]}")
+                outcome[url] = False
+        if not bvids:
+            return outcome
+        print(f"🌐 并发获取 {len(set(bvids.values()))} 个视频的现有字幕（连接池上限 {max_connections}）")
+        results, client = asyncio.run(self.resolve_videos_async(list(bvids.values()), page_num=page_num,
+                                                                max_connections=max_connections))
+        
+        for url, bvid in bvids.items():
+            result = results[bvid]
+            if result['error']:
+                print(f"❌ [{bvid}] {result['error'][:80]}")
+            elif not result['track']:
+                print(f"ℹ️ [{bvid}] 该视频没有现有字幕")
+            else:
+                output_file = self.save_existing_subtitles(result['video_info'], result['track'], output_format)
+                print(f"✅ [{bvid}] {len(result['track']['body'])} 条字幕 → {output_file.name}")
+            outcome[url] = bool(result['track'])
+        print(f"📊 接口吞吐: {client.summary()}")
+        return outcome
+    
+    def save_existing_subtitles(self, video_info, track, output_format='srt'):
+        """按指定格式保存现有字幕，文件名为 {标题}_{字幕语言}"""
+        safe_title = re.sub(r'[^\w\-_\. ]', '_', video_info['title'])
+        safe_lan = re.sub(r'[^\w\-_\. ]', '_', track.get('lan_doc') or track.get('lan') or '字幕')
+        # 标题中可能含有"."，先带上扩展名，避免 save_subtitle_with_format 替换后缀时截断标题
+        output_file = self.output_dir / f"{safe_title}_{safe_lan}.{output_format}"
+        return self.save_subtitle_with_format(track['body'], output_file, output_format)
+    
+    def extract_ai_subtitles_from_urls_parallel(self, video_urls, workers=2, page_num=1, capture_network=False):
+        """多个浏览器会话并发提取一批视频的AI字幕（每个工作线程从会话池借出一个会话）
+        
+        需先调用 enable_browser_fleet 或 enable_browser_pool，否则每个任务各自新建浏览器。
+        
+        Returns:
+            {video_url: 是否成功}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                video_url: executor.submit(self.extract_subtitle_from_url, video_url, page_num,
+                                           use_ai=True, capture_network=capture_network)
+                for video_url in video_urls
+            }
+            return {video_url: future.result() for video_url, future in futures.items()}
+    
+    def save_ai_subtitles(self, video_info, subtitles):
+        """将AI字幕保存为SRT文件"""
+        safe_title = re.sub(r'[^\w\-_\. ]', '_', video_info['title'])
+        filename = f"{safe_title}_AI字幕.srt"
+        output_file = self.output_dir / filename
+        
+        # 转换为SRT格式并保存
+        srt_content = self.convert_to_srt(subtitles[0]['body'])
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(srt_content)
+        
+        print(f"AI字幕已保存到: {output_file}")
+        if subtitles[0].get('ai_summary'):
+            self.save_ai_summary(video_info, subtitles[0]['ai_summary'])
+        self.ai_negative_cache.discard(video_info.get('bvid'))
+        return output_file
+    
+    def save_ai_summary(self, video_info, ai_summary):
+        """将AI视频总结保存为Markdown文件（提纲条目带时间戳）"""
+        safe_title = re.sub(r'[^\w\-_\. ]', '_', video_info['title'])
+        output_file = self.output_dir / f"{safe_title}_AI总结.md"
+        
+        lines = [f"# {video_info['title']}", '']
+        if ai_summary.get('summary'):
+            lines += [ai_summary['summary'], '']
+        for section in ai_summary.get('outline') or []:
+            if section.get('title'):
+                lines += [f"## {self.format_time_simple(section['timestamp'])} {section['title']}", '']
+            for item in section.get('items') or []:
+                lines.append(f"- {self.format_time_simple(item['timestamp'])} {item['content']}")
+            lines.append('')
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        
+        print(f"AI总结已保存到: {output_file}")
+        return output_file
+    
+    def extract_ai_subtitles_from_urls_multi_tab(self, video_urls, tabs=3):
+        """多标签页并发提取一批视频的AI字幕并保存
+        
+        Returns:
+            {video_url: 是否成功}
+        """
+        return self.extract_ai_subtitles_batch(video_urls, lambda bvids: self.get_ai_subtitles_multi_tab(bvids, tabs=tabs))
+    
+    def extract_ai_subtitles_from_urls_pipelined(self, video_urls, capture_network=False):
+        """流水线提取一批视频的AI字幕并保存（后台预加载下一个视频）
+        
+        Returns:
+            {video_url: 是否成功}
+        """
+        return self.extract_ai_subtitles_batch(
+            video_urls, lambda bvids: self.get_ai_subtitles_pipelined(bvids, capture_network=capture_network)
+        )
+    
+    def extract_ai_subtitles_batch(self, video_urls, fetch_with_browser):
+        """批量提取AI字幕并保存：先用接口获取，其余视频交给 fetch_with_browser(bvids) 通过浏览器提取
+        
+        Returns:
+            {video_url: 是否成功}
+        """
+        # 接口能直接取得字幕或已确认没有AI字幕的视频不再打开标签页；
+        # 视频信息只在预检请求接口时获取，浏览器提取的视频使用页面前端状态中的视频信息
+        bvids = {}
+        video_infos = {}
+        results = {}
+        for video_url in video_urls:
+            try:
+                bvid = self.extract_bvid_from_url(video_url)
+                if bvid in video_infos:
+                    bvids[video_url] = bvid  # 重复的视频只预检一次
+                    continue
+                use_browser, subtitles, video_infos[bvid] = self.precheck_ai_subtitles(bvid)
+                bvids[video_url] = bvid
+            except Exception as e:
+                print(f"❌ 跳过 {video_url}: {str(e)}")
+                continue
+            if not use_browser:
+                results[bvid] = subtitles
+        
+        browser_bvids = [bvid for bvid in dict.fromkeys(bvids.values()) if bvid not in results]
+        if browser_bvids:
+            try:
+                results.update(fetch_with_browser(browser_bvids))
+            except Exception as e:
+                # 浏览器提取失败不影响已通过接口取得的字幕
+                print(f"❌ 浏览器批量提取失败: {str(e)}")
+            for bvid in browser_bvids:
+                page_info = self.page_video_info.pop(bvid, None)
+                video_infos[bvid] = video_infos.get(bvid) or page_info
+        
+        outcome = {video_url: False for video_url in video_urls}
+        for video_url, bvid in bvids.items():
+            subtitles = results.get(bvid)
+            if not subtitles:
+                continue
+            try:
+                video_info = video_infos.get(bvid) or self.get_video_info(bvid)
+                video_infos[bvid] = video_info
+                self.save_ai_subtitles(video_info, subtitles)
+                outcome[video_url] = True
+            except Exception as e:
+                print(f"❌ [{bvid}] 保存失败: {str(e)}")
+        return outcome
+    
     def save_subtitle_with_format(self, subtitle_data, output_file, format_type='srt'):
         """根据指定格式保存字幕"""
         output_file = Path(output_file)
@@ -723,11 +2717,72 @@ class BilibiliSubtitleExtractor:
     
     def find_ai_assistant_button_enhanced(self, driver, wait):
         """增强版AI小助手按钮查找 - 专门针对图标按钮"""
-        from selenium.webdriver.common.by import By
         import time
         
         print("🔍 使用图标识别策略查找AI小助手按钮...")
         
+        all_selectors = self.get_ai_button_selectors()
+        
+        # 优先尝试该页面布局下上次命中的选择器
+        fingerprint = self.get_layout_fingerprint(driver)
+        cached_selector = self.selector_cache.lookup(fingerprint, 'ai_button')
+        all_selectors = self.selector_cache.prioritize(fingerprint, 'ai_button', all_selectors)
+        if cached_selector:
+            print(f"💾 选择器缓存: 优先尝试 {cached_selector}")
+        
+        print(f"将尝试 {len(all_selectors)} 种不同的选择器策略")
+        
+        # 优先使用批量特征采集：一次脚本调用取得全部候选元素的特征，评分在Python中完成
+        candidates = self.collect_ai_button_candidates(driver, all_selectors)
+        if candidates is not None:
+            element = self.select_ai_button_from_candidates(driver, all_selectors, candidates, fingerprint)
+            if element is not None:
+                return element
+        else:
+            print("⚠️ 批量特征采集不可用，逐个元素评估")
+            for i, selector in enumerate(all_selectors):
+                try:
+                    print(f"🔎 策略 {i+1}/{len(all_selectors)}: {selector}")
+                    
+                    # 查找元素
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    
+                    if not elements:
+                        continue
+                    
+                    print(f"   找到 {len(elements)} 个候选元素")
+                    
+                    # 对每个元素进行详细评估
+                    for j, element in enumerate(elements):
+                        try:
+                            if not (element.is_displayed() and element.is_enabled()):
+                                continue
+                            
+                            # 使用图标识别评分系统
+                            score = self.calculate_ai_icon_score(element)
+                            
+                            if score > 0.6:  # 降低阈值，因为图标识别更严格
+                                element_info = self.get_detailed_element_info(element)
+                                print(f"   ✅ 候选 {j+1}: {element_info} (评分: {score:.2f})")
+                                self.selector_cache.record(fingerprint, 'ai_button', selector)
+                                return element
+                            elif score > 0.3:
+                                element_info = self.get_detailed_element_info(element)
+                                print(f"   📋 候选 {j+1}: {element_info} (评分: {score:.2f}) - 分数偏低")
+                        
+                        except Exception as e:
+                            continue
+                            
+                except Exception as e:
+                    print(f"   ❌ 策略失败: {str(e)[:50]}")
+                    continue
+        
+        print("❌ 所有策略均未找到合适的AI按钮")
+        self.selector_cache.record(fingerprint, 'ai_button', None)
+        return None
+    
+    def get_ai_button_selectors(self):
+        """AI小助手按钮的候选选择器（按优先级排序）"""
         # 策略1: B站视频页面的精确选择器（基于实际结构）
         bilibili_specific_selectors = [
             # B站视频页面右侧工具栏
@@ -762,47 +2817,65 @@ class BilibiliSubtitleExtractor:
             ".video-page button", ".bilibili-player button", ".player-auxiliary-area button"
         ]
         
-        all_selectors = bilibili_specific_selectors + attribute_selectors + visual_selectors
+        return bilibili_specific_selectors + attribute_selectors + visual_selectors
+    
+    def collect_ai_button_candidates(self, driver, selectors):
+        """一次脚本调用查询全部选择器，返回候选元素特征表
         
-        print(f"将尝试 {len(all_selectors)} 种不同的选择器策略")
+        Returns:
+            {'groups': 每个选择器对应的候选序号列表, 'features': 特征字典列表}；脚本失败时返回 None
+        """
+        try:
+            candidates = driver.execute_script(AI_BUTTON_FEATURES_JS, selectors)
+        except Exception as e:
+            print(f"   ❌ 批量特征采集失败: {str(e)[:50]}")
+            return None
+        if not candidates or 'features' not in candidates:
+            return None
+        print(f"📊 批量采集 {len(candidates['features'])} 个候选元素的特征")
+        return candidates
+    
+    def select_ai_button_from_candidates(self, driver, selectors, candidates, fingerprint):
+        """按选择器顺序对特征表评分，返回第一个超过阈值的元素"""
+        features = candidates['features']
+        scores = {}  # 同一元素可能被多个选择器命中，只评分一次
         
-        for i, selector in enumerate(all_selectors):
-            try:
-                print(f"🔎 策略 {i+1}/{len(all_selectors)}: {selector}")
-                
-                # 查找元素
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                
-                if not elements:
+        for i, selector in enumerate(selectors):
+            ids = candidates['groups'][i]
+            if not ids:
+                continue
+            
+            for j, index in enumerate(ids):
+                feature = features[index]
+                if not (feature['displayed'] and feature['enabled']):
                     continue
-                    
-                print(f"   找到 {len(elements)} 个候选元素")
                 
-                # 对每个元素进行详细评估
-                for j, element in enumerate(elements):
+                if index not in scores:
+                    scores[index] = self.score_ai_icon_features(feature)
+                score = scores[index]
+                
+                if score > 0.6:
+                    print(f"🔎 策略 {i+1}/{len(selectors)}: {selector}")
+                    print(f"   ✅ 候选 {j+1}: {self.describe_element_features(feature)} (评分: {score:.2f})")
                     try:
-                        if not (element.is_displayed() and element.is_enabled()):
-                            continue
-                            
-                        # 使用图标识别评分系统
-                        score = self.calculate_ai_icon_score(element)
-                        
-                        if score > 0.6:  # 降低阈值，因为图标识别更严格
-                            element_info = self.get_detailed_element_info(element)
-                            print(f"   ✅ 候选 {j+1}: {element_info} (评分: {score:.2f})")
-                            return element
-                        elif score > 0.3:
-                            element_info = self.get_detailed_element_info(element)
-                            print(f"   📋 候选 {j+1}: {element_info} (评分: {score:.2f}) - 分数偏低")
-                            
+                        element = driver.execute_script(AI_BUTTON_TAKE_JS, index)
                     except Exception as e:
-                        continue
-                        
-            except Exception as e:
-                print(f"   ❌ 策略失败: {str(e)[:50]}")
-                continue
+                        print(f"   ❌ 无法取回候选元素: {str(e)[:50]}")
+                        return None
+                    if element is None:
+                        print("   ❌ 候选元素已失效")
+                        return None
+                    self.selector_cache.record(fingerprint, 'ai_button', selector)
+                    return element
         
-        print("❌ 所有策略均未找到合适的AI按钮")
+        try:
+            driver.execute_script(AI_BUTTON_RELEASE_JS)
+        except Exception:
+            pass
+        low_scores = sorted((score, index) for index, score in scores.items() if score > 0.3)
+        for score, index in low_scores[-5:]:
+            print(f"   📋 候选: {self.describe_element_features(features[index])} (评分: {score:.2f}) - 分数偏低")
+        print(f"   共评估 {len(scores)} 个可见候选元素")
         return None
     
     def is_valid_ai_button(self, driver, element):
@@ -833,308 +2906,324 @@ class BilibiliSubtitleExtractor:
             location = element.location
             size = element.size
             is_reasonable_size = size['width'] > 20 and size['height'] > 20
-            is_reasonable_position = location['x'] >= 0 and location['y'] >= 0
-            
-            return (has_ai_text or has_ai_class) and is_interactive and is_reasonable_size and is_reasonable_position
-            
-        except Exception:
-            return False
-    
-    def smart_text_search_ai_button(self, driver):
-        """智能文本搜索AI按钮"""
-        from selenium.webdriver.common.by import By
-        
-        try:
-            # 获取所有可能的交互元素
-            interactive_selectors = [
-                "button", "a", "div[role='button']", "span[role='button']", 
-                "[onclick]", "[data-action]", "[class*='btn']", "[class*='button']"
-            ]
-            
-            candidates = []
-            for selector in interactive_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    candidates.extend(elements)
-                except:
-                    continue
-            
-            # 智能评分系统
-            best_candidate = None
-            best_score = 0
-            
-            for element in candidates:
-                score = self.calculate_ai_button_score(element)
-                if score > best_score and score > 0.5:  # 阈值0.5
-                    best_score = score
-                    best_candidate = element
-            
-            if best_candidate:
-                print(f"🏆 智能匹配找到AI按钮（评分: {best_score:.2f}）")
-                return best_candidate
-            
-        except Exception as e:
-            print(f"智能搜索失败: {e}")
-        
-        return None
-    
-    def debug_page_content(self, driver):
-        """调试页面内容，查找可能的AI元素"""
-        try:
-            from selenium.webdriver.common.by import By
-            print("🔍 开始页面调试分析...")
-            
-            # 检查页面标题
-            try:
-                title = driver.title
-                print(f"📝 页面标题: {title}")
-            except:
-                print("❌ 无法获取页面标题")
-            
-            # 检查当前 URL
-            try:
-                current_url = driver.current_url
-                print(f"🔗 当前 URL: {current_url}")
-            except:
-                print("❌ 无法获取当前 URL")
-            
-            # 查找所有按钮和链接
-            buttons_and_links = []
-            try:
-                buttons = driver.find_elements(By.TAG_NAME, "button")
-                links = driver.find_elements(By.TAG_NAME, "a")
-                divs_with_role = driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
-                spans_with_role = driver.find_elements(By.CSS_SELECTOR, "span[role='button']")
-                
-                all_interactive = buttons + links + divs_with_role + spans_with_role
-                
-                print(f"🔍 找到 {len(all_interactive)} 个交互元素")
-                
-                ai_related = []
-                for element in all_interactive:
-                    try:
-                        if not element.is_displayed():
-                            continue
-                        
-                        text = (element.get_attribute('textContent') or '').strip()
-                        class_name = element.get_attribute('class') or ''
-                        title_attr = element.get_attribute('title') or ''
-                        aria_label = element.get_attribute('aria-label') or ''
-                        
-                        all_text = f"{text} {class_name} {title_attr} {aria_label}".lower()
-                        
-                        # 查找AI相关关键词
-                        ai_keywords = ['ai', '总结', '小助手', '智能', 'summary', 'assistant']
-                        if any(keyword in all_text for keyword in ai_keywords):
-                            ai_related.append({
-                                'tag': element.tag_name,
-                                'text': text[:50],
-                                'class': class_name[:50],
-                                'title': title_attr[:50],
-                                'aria_label': aria_label[:50]
-                            })
-                    except:
-                        continue
-                
-                if ai_related:
-                    print(f"🤖 找到 {len(ai_related)} 个AI相关元素:")
-                    for i, element_info in enumerate(ai_related[:10]):  # 只显示前10个
-                        print(f"  {i+1}. {element_info['tag']}: '{element_info['text']}'")
-                        if element_info['class']:
-                            print(f"     class: {element_info['class']}")
-                else:
-                    print("❌ 未找到任何AI相关元素")
-                    
-            except Exception as e:
-                print(f"❌ 元素分析失败: {e}")
-            
-            # 检查页面是否包含登录提示
-            try:
-                body_text = driver.find_element(By.TAG_NAME, "body").get_attribute('textContent')
-                if '登录' in body_text or 'login' in body_text.lower():
-                    print("⚠️ 页面可能需要登录")
-                if '不支持' in body_text or '暂无' in body_text:
-                    print("⚠️ 页面可能显示不支持AI功能")
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"❌ 页面调试失败: {str(e)}")
-    
-    def debug_ai_panel_status(self, driver):
-        """调试AI面板状态，分析为什么未出现面板"""
-        try:
-            from selenium.webdriver.common.by import By
-            print("🔍 AI面板状态调试分析:")
-            
-            # 1. 检查窗口尺寸
-            window_size = driver.get_window_size()
-            print(f"   📺 窗口尺寸: {window_size['width']}x{window_size['height']}")
-            
-            # 2. 检查右侧区域的所有可见元素
-            right_elements = driver.execute_script(f"""
-                var rightElements = [];
-                var allElements = document.querySelectorAll('*');
-                for (var i = 0; i < allElements.length; i++) {{
-                    var element = allElements[i];
-                    var rect = element.getBoundingClientRect();
-                    var style = window.getComputedStyle(element);
-                    
-                    if (rect.left > {window_size['width'] * 0.6} && 
-                        rect.width > 100 && rect.height > 100 &&
-                        style.display !== 'none' && style.visibility !== 'hidden') {{
-                        rightElements.push({{
-                            tagName: element.tagName,
-                            className: element.className,
-                            id: element.id,
-                            width: Math.round(rect.width),
-                            height: Math.round(rect.height),
-                            left: Math.round(rect.left),
-                            top: Math.round(rect.top),
-                            text: element.textContent ? element.textContent.substring(0, 50) : ''
-                        }});
-                    }}
-                }}
-                return rightElements;
-            """)
-            
-            if right_elements:
-                print(f"   📋 右侧区域找到 {len(right_elements)} 个可见元素:")
-                for i, elem in enumerate(right_elements[:5]):  # 只显示前5个
-                    print(f"     {i+1}. {elem['tagName']}.{elem['className'][:30]} [{elem['width']}x{elem['height']}] @({elem['left']},{elem['top']}) '{elem['text'][:30]}'")
-                if len(right_elements) > 5:
-                    print(f"     ... 还有 {len(right_elements) - 5} 个元素")
-            else:
-                print("   ❌ 右侧区域没有找到大尺寸可见元素")
-            
-            # 3. 检查是否有AI相关的元素
-            ai_related_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'AI') or contains(text(), '字幕') or contains(text(), '总结')]")
-            print(f"   🤖 页面中包含AI相关文本的元素数量: {len(ai_related_elements)}")
-            
-            # 4. 检查是否有错误或加载信息
-            try:
-                error_elements = driver.find_elements(By.XPATH, "//*[contains(text(), '错误') or contains(text(), '失败') or contains(text(), '加载') or contains(text(), '网络')]")
-                if error_elements:
-                    print(f"   ⚠️ 可能的错误信息:")
-                    for elem in error_elements[:3]:
-                        text = elem.text.strip()
-                        if text:
-                            print(f"     - {text[:50]}")
-            except:
-                pass
-            
-            # 5. 检查当前页面URL和标题
-            current_url = driver.current_url
-            page_title = driver.title
-            print(f"   🔗 当前URL: {current_url}")
-            print(f"   📝 页面标题: {page_title}")
-            
-            # 6. 检查是否有登录问题
-            try:
-                login_elements = driver.find_elements(By.XPATH, "//*[contains(text(), '登录') or contains(text(), '登陆')]")
-                if login_elements:
-                    print(f"   🔑 可能需要登录: 找到 {len(login_elements)} 个登录相关元素")
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"   ❌ 调试分析失败: {str(e)}")
-    
-    def calculate_ai_icon_score(self, element):
-        """专门针对AI图标按钮的评分系统"""
-        try:
-            from selenium.webdriver.common.by import By
-            score = 0.0
-            
-            # 获取元素信息
-            text = (element.get_attribute('textContent') or element.text or '').strip()
-            class_name = (element.get_attribute('class') or '').lower()
-            tag_name = element.tag_name.lower()
-            title = (element.get_attribute('title') or '').lower()
-            aria_label = (element.get_attribute('aria-label') or '').lower()
-            href = (element.get_attribute('href') or '').lower()
-            data_name = (element.get_attribute('data-name') or '').lower()
-            onclick = (element.get_attribute('onclick') or '').lower()
-            
-            # 过滤明显的非目标元素
-            if self.is_obviously_not_ai_button(element, text, href):
-                return 0
+            is_reasonable_position = location['x'] >= 0 and location['y'] >= 0
             
-            # 1. 精确匹配AI相关关键词（最高分）
-            all_text = f"{text} {class_name} {title} {aria_label} {data_name} {onclick}".lower()
+            return (has_ai_text or has_ai_class) and is_interactive and is_reasonable_size and is_reasonable_position
             
-            # 精确匹配
-            if 'ai小助手' in all_text:
-                score += 1.0
-            elif 'ai总结' in all_text or 'ai智能总结' in all_text:
-                score += 0.9
-            elif '视频总结' in all_text or '智能总结' in all_text:
-                score += 0.8
-            elif 'ai' in all_text and ('助手' in all_text or '智能' in all_text or '总结' in all_text):
-                score += 0.7
+        except Exception:
+            return False
+    
+    def smart_text_search_ai_button(self, driver):
+        """智能文本搜索AI按钮"""
+        try:
+            # 获取所有可能的交互元素
+            interactive_selectors = [
+                "button", "a", "div[role='button']", "span[role='button']", 
+                "[onclick]", "[data-action]", "[class*='btn']", "[class*='button']"
+            ]
             
-            # 2. 基于CSS类名的匹配
-            if any(ai_class in class_name for ai_class in ['ai-', '_ai_', 'summary', 'assistant', 'smart']):
-                score += 0.6
+            candidates = []
+            for selector in interactive_selectors:
+                try:
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    candidates.extend(elements)
+                except:
+                    continue
             
-            # 3. 基于数据属性的匹配
-            if any(keyword in data_name for keyword in ['ai', 'summary', 'assistant']):
-                score += 0.5
+            # 智能评分系统
+            best_candidate = None
+            best_score = 0
             
-            # 4. 位置和尺寸特征加分
-            location = element.location
-            size = element.size
+            for element in candidates:
+                score = self.calculate_ai_button_score(element)
+                if score > best_score and score > 0.5:  # 阈值0.5
+                    best_score = score
+                    best_candidate = element
             
-            # 合理的图标按钮尺寸（20-80px宽高）
-            if 20 <= size['width'] <= 80 and 20 <= size['height'] <= 80:
-                score += 0.3
-            elif 15 <= size['width'] <= 120 and 15 <= size['height'] <= 120:
-                score += 0.2
+            if best_candidate:
+                print(f"🏆 智能匹配找到AI按钮（评分: {best_score:.2f}）")
+                return best_candidate
             
-            # 在视频页面右侧的位置加分
+        except Exception as e:
+            print(f"智能搜索失败: {e}")
+        
+        return None
+    
+    def capture_failure_snapshot(self, driver, stage):
+        """失败诊断：取一次页面快照（HTML、正文文本、右侧元素位置和截图），压缩写盘与分析交给后台线程
+        
+        只有取快照的两次浏览器调用在关键路径上，耗时和大小受 diagnostics_limits 限制。
+        
+        Args:
+            stage: 失败的步骤（写入文件名和报告）
+        
+        Returns:
+            快照文件路径；未开启诊断或取快照失败时返回 None
+        """
+        if self.diagnostics_mode == 'off':
+            return None
+        limits = self.diagnostics_limits
+        start_time = time.time()
+        try:
+            snapshot = driver.execute_script(DIAGNOSTIC_SNAPSHOT_JS, limits['html_chars']) or {}
+        except Exception as e:
+            print(f"⚠️ 诊断快照获取失败: {str(e)[:80]}")
+            return None
+        snapshot['stage'] = stage
+        snapshot['captured_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        snapshot['screenshot'] = None
+        if time.time() - start_time < limits['seconds']:
             try:
-                window_size = element.parent.execute_script("return {width: window.innerWidth, height: window.innerHeight};") if hasattr(element, 'parent') else {'width': 1920, 'height': 1080}
-                if location['x'] > window_size.get('width', 1920) * 0.6:  # 在右侦
-                    score += 0.2
-            except:
+                screenshot = driver.get_screenshot_as_base64()
+                if len(screenshot) <= limits['screenshot_bytes']:
+                    snapshot['screenshot'] = screenshot
+            except Exception:
                 pass
-            
-            # 5. 交互性特征
-            if tag_name == 'button' or element.get_attribute('role') == 'button':
-                score += 0.3
-            elif 'btn' in class_name or 'button' in class_name:
-                score += 0.2
-            
-            # 6. 特殊情况处理：无文本的图标按钮
-            if len(text.strip()) == 0:  # 纯图标按钮
-                # 通过其他特征判断
-                if any(keyword in class_name for keyword in ['tool', 'action', 'icon', 'feature']):
-                    score += 0.4
-                if size['width'] <= 50 and size['height'] <= 50:  # 小尺寸图标
-                    score += 0.3
-                # 在合适的位置
-                if location['x'] > 200 and location['y'] > 100:  # 不在左上角
-                    score += 0.2
-            
-            # 7. 在B站特定容器中的加分
-            parent_classes = []
+        
+        match = re.search(r'BV[0-9A-Za-z]{10}', snapshot.get('url') or '')
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{int(time.time() * 1000) % 1000:03d}_{match.group(0) if match else 'page'}_{stage}.json.gz"
+        path = self.output_dir / '.diagnostics' / name
+        print(f"🩺 已保存诊断快照（{(time.time() - start_time) * 1000:.0f}ms），后台写入: {path}")
+        threading.Thread(target=self.write_diagnostic_snapshot, args=(path, snapshot),
+                         name='diagnostics').start()
+        return path
+    
+    def write_diagnostic_snapshot(self, path, snapshot):
+        """压缩写入诊断快照并清理旧文件；background 模式下随后打印分析报告（在后台线程中运行）"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            # 只保留最近的 files 个快照
+            snapshots = sorted(path.parent.glob('*.json.gz'), key=lambda item: item.stat().st_mtime)
+            for old in snapshots[:-self.diagnostics_limits['files']]:
+                old.unlink()
+        except OSError as e:
+            print(f"⚠️ 诊断快照写入失败: {e}")
+            return
+        if self.diagnostics_mode == 'background':
+            print('\n'.join(self.analyze_diagnostic_snapshot(snapshot)))
+        else:
+            print(f"🩺 离线分析: python bilibili_subtitle_extractor.py --analyze-diagnostics \"{path}\"")
+    
+    def load_diagnostic_snapshot(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def analyze_diagnostic_snapshot(self, snapshot):
+        """分析诊断快照（不需要浏览器）：AI相关交互元素、右侧大尺寸元素、登录/不支持/错误提示
+        
+        Returns:
+            报告文本行列表
+        """
+        window = snapshot.get('window') or {}
+        lines = [
+            f"🩺 诊断报告 [{snapshot.get('stage')}] {snapshot.get('captured_at', '')}",
+            f"   📝 页面标题: {snapshot.get('title', '')}",
+            f"   🔗 当前URL: {snapshot.get('url', '')}",
+            f"   📺 窗口尺寸: {window.get('width')}x{window.get('height')}",
+        ]
+        html = snapshot.get('html') or ''
+        if snapshot.get('htmlLength', 0) > len(html):
+            lines.append(f"   ✂️ HTML已截断: {len(html)}/{snapshot['htmlLength']} 字符")
+        
+        parser = DiagnosticHtmlParser()
+        try:
+            parser.feed(html)
+        except Exception:
+            pass
+        ai_keywords = ['ai', '总结', '小助手', '智能', 'summary', 'assistant']
+        ai_related = [
+            element for element in parser.elements
+            if any(keyword in f"{element['text']} {element['class']} {element['title']} {element['aria_label']}".lower()
+                   for keyword in ai_keywords)
+        ]
+        lines.append(f"   🔍 交互元素 {len(parser.elements)} 个，其中AI相关 {len(ai_related)} 个")
+        for i, element in enumerate(ai_related[:10]):
+            lines.append(f"     {i + 1}. {element['tag']}: '{element['text'][:50]}' class: {element['class'][:50]}")
+        
+        right_elements = snapshot.get('rightElements') or []
+        if right_elements:
+            lines.append(f"   📋 右侧区域大尺寸元素 {len(right_elements)} 个:")
+            for i, elem in enumerate(right_elements[:5]):
+                lines.append(f"     {i + 1}. {elem['tag']}.{elem['className'][:30]} [{elem['width']}x{elem['height']}] "
+                             f"@({elem['left']},{elem['top']}) '{elem['text'][:30]}'")
+        else:
+            lines.append("   ❌ 右侧区域没有大尺寸元素（AI面板未出现）")
+        
+        text = snapshot.get('text') or ''
+        if '登录' in text or '登陆' in text or 'login' in text.lower():
+            lines.append("   🔑 页面可能需要登录")
+        if '不支持' in text or '暂无' in text:
+            lines.append("   ⚠️ 页面可能显示不支持AI功能")
+        errors = [line.strip() for line in text.splitlines()
+                  if line.strip() and len(line.strip()) < 60 and any(word in line for word in ('错误', '失败', '网络异常'))]
+        for line in errors[:3]:
+            lines.append(f"   ⚠️ 可能的错误信息: {line}")
+        if snapshot.get('screenshot'):
+            lines.append(f"   📸 截图 {len(snapshot['screenshot']) * 3 // 4 // 1024} KB（PNG，base64 保存在快照中）")
+        return lines
+    
+    def analyze_diagnostics(self, path):
+        """离线分析诊断快照文件或目录中的全部快照，可选导出截图"""
+        path = Path(path)
+        files = sorted(path.glob('*.json.gz')) if path.is_dir() else [path]
+        if not files:
+            print(f"❌ 没有找到诊断快照: {path}")
+            return
+        for file in files:
             try:
-                parent = element.find_element(By.XPATH, "./..")
-                parent_classes.append(parent.get_attribute('class') or '')
-                grandparent = parent.find_element(By.XPATH, "./..")
-                parent_classes.append(grandparent.get_attribute('class') or '')
-            except:
-                pass
-            
-            parent_text = ' '.join(parent_classes).lower()
-            if any(container in parent_text for container in ['video', 'toolbar', 'action', 'tool', 'operation']):
-                score += 0.3
-                
-            return min(max(score, 0), 1.0)
-            
+                snapshot = self.load_diagnostic_snapshot(file)
+            except (OSError, ValueError) as e:
+                print(f"❌ 无法读取 {file}: {e}")
+                continue
+            print(f"\n📂 {file}")
+            print('\n'.join(self.analyze_diagnostic_snapshot(snapshot)))
+            if snapshot.get('screenshot'):
+                image_file = Path(str(file)[:-len('.json.gz')] + '.png')
+                if not image_file.exists():
+                    image_file.write_bytes(base64.b64decode(snapshot['screenshot']))
+                print(f"   🖼️ 截图: {image_file}")
+    
+    def calculate_ai_icon_score(self, element):
+        """专门针对AI图标按钮的评分系统"""
+        try:
+            return self.score_ai_icon_features(self.collect_ai_icon_features(element))
         except Exception as e:
             return 0
     
+    def collect_ai_icon_features(self, element):
+        """逐个读取单个元素的评分特征（批量脚本不可用时的回退方式）"""
+        location = element.location
+        size = element.size
+        try:
+            window_width = element.parent.execute_script("return window.innerWidth;")
+        except Exception:
+            window_width = 1920
+        
+        parent_classes = []
+        try:
+            parent = element.find_element(By.XPATH, "./..")
+            parent_classes.append(parent.get_attribute('class') or '')
+            grandparent = parent.find_element(By.XPATH, "./..")
+            parent_classes.append(grandparent.get_attribute('class') or '')
+        except:
+            pass
+        
+        return {
+            'text': (element.get_attribute('textContent') or element.text or '').strip(),
+            'class_name': element.get_attribute('class') or '',
+            'tag_name': element.tag_name,
+            'title': element.get_attribute('title') or '',
+            'aria_label': element.get_attribute('aria-label') or '',
+            'href': element.get_attribute('href') or '',
+            'data_name': element.get_attribute('data-name') or '',
+            'onclick': element.get_attribute('onclick') or '',
+            'role': element.get_attribute('role') or '',
+            'x': location['x'],
+            'y': location['y'],
+            'width': size['width'],
+            'height': size['height'],
+            'window_width': window_width or 1920,
+            'parent_classes': parent_classes
+        }
+    
+    def score_ai_icon_features(self, features):
+        """根据元素特征计算AI图标按钮评分（0-1）
+        
+        Args:
+            features: collect_ai_icon_features 或 AI_BUTTON_FEATURES_JS 返回的特征字典
+        """
+        score = 0.0
+        
+        # 获取元素信息
+        text = features['text'].strip()
+        class_name = features['class_name'].lower()
+        tag_name = features['tag_name'].lower()
+        title = features['title'].lower()
+        aria_label = features['aria_label'].lower()
+        href = features['href'].lower()
+        data_name = features['data_name'].lower()
+        onclick = features['onclick'].lower()
+        
+        # 过滤明显的非目标元素
+        if self.is_obviously_not_ai_button(None, text, href):
+            return 0
+        
+        # 1. 精确匹配AI相关关键词（最高分）
+        all_text = f"{text} {class_name} {title} {aria_label} {data_name} {onclick}".lower()
+        
+        # 精确匹配
+        if 'ai小助手' in all_text:
+            score += 1.0
+        elif 'ai总结' in all_text or 'ai智能总结' in all_text:
+            score += 0.9
+        elif '视频总结' in all_text or '智能总结' in all_text:
+            score += 0.8
+        elif 'ai' in all_text and ('助手' in all_text or '智能' in all_text or '总结' in all_text):
+            score += 0.7
+        
+        # 2. 基于CSS类名的匹配
+        if any(ai_class in class_name for ai_class in ['ai-', '_ai_', 'summary', 'assistant', 'smart']):
+            score += 0.6
+        
+        # 3. 基于数据属性的匹配
+        if any(keyword in data_name for keyword in ['ai', 'summary', 'assistant']):
+            score += 0.5
+        
+        # 4. 位置和尺寸特征加分
+        x, y = features['x'], features['y']
+        width, height = features['width'], features['height']
+        
+        # 合理的图标按钮尺寸（20-80px宽高）
+        if 20 <= width <= 80 and 20 <= height <= 80:
+            score += 0.3
+        elif 15 <= width <= 120 and 15 <= height <= 120:
+            score += 0.2
+        
+        # 在视频页面右侧的位置加分
+        if x > features.get('window_width', 1920) * 0.6:
+            score += 0.2
+        
+        # 5. 交互性特征
+        if tag_name == 'button' or features['role'] == 'button':
+            score += 0.3
+        elif 'btn' in class_name or 'button' in class_name:
+            score += 0.2
+        
+        # 6. 特殊情况处理：无文本的图标按钮
+        if len(text) == 0:  # 纯图标按钮
+            # 通过其他特征判断
+            if any(keyword in class_name for keyword in ['tool', 'action', 'icon', 'feature']):
+                score += 0.4
+            if width <= 50 and height <= 50:  # 小尺寸图标
+                score += 0.3
+            # 在合适的位置
+            if x > 200 and y > 100:  # 不在左上角
+                score += 0.2
+        
+        # 7. 在B站特定容器中的加分
+        parent_text = ' '.join(features['parent_classes']).lower()
+        if any(container in parent_text for container in ['video', 'toolbar', 'action', 'tool', 'operation']):
+            score += 0.3
+        
+        return min(max(score, 0), 1.0)
+    
+    def describe_element_features(self, features):
+        """根据特征字典生成元素描述（与 get_detailed_element_info 格式一致）"""
+        info_parts = [f"Tag:{features['tag_name']}"]
+        if features['text']:
+            info_parts.append(f"Text:'{features['text'][:20]}'")
+        if features['class_name']:
+            info_parts.append(f"Class:'{features['class_name'][:30]}'")
+        if features['title']:
+            info_parts.append(f"Title:'{features['title'][:20]}'")
+        if features['data_name']:
+            info_parts.append(f"Data:'{features['data_name'][:20]}'")
+        info_parts.append(f"Size:{features['width']}x{features['height']}")
+        info_parts.append(f"Pos:({features['x']},{features['y']})")
+        return ' | '.join(info_parts)
+    
     def is_obviously_not_ai_button(self, element, text, href):
         """过滤明显不是AI按钮的元素"""
         # 文本过长，可能是视频标题等
@@ -1269,12 +3358,16 @@ class BilibiliSubtitleExtractor:
         except:
             return "unknown element"
     
-    def click_ai_assistant_enhanced(self, driver, ai_button):
-        """增强版AI小助手按钮点击"""
+    def click_ai_assistant_enhanced(self, driver, ai_button, fingerprint=None):
+        """增强版AI小助手按钮点击
+        
+        按浏览器和页面布局记录上次打开面板的点击方式，下次优先尝试；
+        双击可能把刚打开的面板再次关闭，始终放在最后。
+        
+        Args:
+            fingerprint: 页面布局指纹（未提供时取当前页面已记录的指纹）
+        """
         import time
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.action_chains import ActionChains
-        from selenium.webdriver.common.keys import Keys
         
         try:
             print(f"👆 准备点击AI按钮: {self.get_element_info(ai_button)}")
@@ -1284,7 +3377,7 @@ class BilibiliSubtitleExtractor:
                 arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});
                 arguments[0].style.border = '2px solid red';
             """, ai_button)
-            time.sleep(2)
+            self.wait_for_condition(driver, ELEMENT_IN_VIEW_CONDITION, 2, '按钮滚动到视口', args=[ai_button])
             
             # 获取点击前的页面状态
             before_panels = len(driver.find_elements(By.CSS_SELECTOR, "[class*='InteractWrapper'], [class*='VideoAssistant'], [data-video-assistant-subject-wrapper]"))
@@ -1304,16 +3397,27 @@ class BilibiliSubtitleExtractor:
                     'name': '动作链点击',
                     'action': lambda: ActionChains(driver).move_to_element(ai_button).click().perform()
                 },
-                {
-                    'name': '双击策略',
-                    'action': lambda: ActionChains(driver).move_to_element(ai_button).double_click().perform()
-                },
                 {
                     'name': '焦点+回车',
                     'action': lambda: (ai_button.click(), ai_button.send_keys(Keys.RETURN))
+                },
+                {
+                    'name': '双击策略',
+                    'action': lambda: ActionChains(driver).move_to_element(ai_button).double_click().perform()
                 }
             ]
             
+            # 优先尝试该浏览器和页面布局下上次成功的点击方式（双击除外，始终最后尝试）
+            if fingerprint is None:
+                fingerprint = self.get_layout_fingerprint(driver)
+            click_key = f"{self.get_browser_key(driver)}|{fingerprint}"
+            names = [strategy['name'] for strategy in click_strategies[:-1]]
+            cached_name = self.selector_cache.lookup(click_key, 'ai_click')
+            order = self.selector_cache.prioritize(click_key, 'ai_click', names)
+            click_strategies = [next(s for s in click_strategies if s['name'] == name) for name in order] + click_strategies[-1:]
+            if cached_name in names:
+                print(f"💾 点击方式缓存: 优先尝试{cached_name}")
+            
             for i, strategy in enumerate(click_strategies):
                 try:
                     print(f"🔄 尝试{strategy['name']}...")
@@ -1321,34 +3425,32 @@ class BilibiliSubtitleExtractor:
                     # 执行点击
                     strategy['action']()
                     
-                    # 等待响应（优化等待时间）
+                    # 等待响应：监听DOM变化，AI面板出现即返回
                     print("⏳ 等待AI面板加载...")
                     
-                    # 每0.5秒检查一次，最多等待12次（6秒）
-                    for wait_attempt in range(12):
-                        time.sleep(0.5)  # 等待0.5秒
-                        
-                        # 只检查AI面板是否出现，不检查是否在字幕列表页
-                        ai_panel_exists = self.check_if_ai_panel_exists(driver)
-                        if ai_panel_exists:
-                            print(f"✅ {strategy['name']}成功! AI面板已出现 (等待{(wait_attempt + 1) * 0.5:.1f}秒后检测到)")
-                            print("💡 注意：AI面板可能默认在'视频总结'页，后续需要切换到'字幕列表'页")
-                            return True
-                        
-                        if wait_attempt < 11:  # 不是最后一次
-                            print(f"   ⏳ 继续等待... ({(wait_attempt + 1) * 0.5:.1f}/6.0秒)")
+                    # 只检查AI面板是否出现，不检查是否在字幕列表页（与 check_if_ai_panel_exists 条件一致）
+                    timeout = self.step_timeouts['ai_panel']
+                    ai_panel_exists = self.wait_for_condition(
+                        driver, VISIBLE_TEXT_CONDITION, timeout, 'AI面板出现',
+                        args=[["视频总结", "字幕列表", "AI小助手"], 2]
+                    )
+                    if ai_panel_exists:
+                        print(f"✅ {strategy['name']}成功! AI面板已出现")
+                        print("💡 注意：AI面板可能默认在'视频总结'页，后续需要切换到'字幕列表'页")
+                        self.selector_cache.record(click_key, 'ai_click', strategy['name'])
+                        return True
                     
-                    print(f"❌ {strategy['name']}失败 - 等待6秒后仍未检测到AI面板")
+                    print(f"❌ {strategy['name']}失败 - 等待{timeout}秒后仍未检测到AI面板")
                         
                 except Exception as e:
                     print(f"❌ {strategy['name']}出错: {str(e)}")
                     continue
             
             print("❌ 所有点击策略均失败")
+            self.selector_cache.record(click_key, 'ai_click', None)
             
-            # 添加详细的页面调试信息
-            print("🔍 进行详细的页面调试分析...")
-            self.debug_ai_panel_status(driver)
+            # 页面快照交给后台分析，不阻塞失败返回
+            self.capture_failure_snapshot(driver, 'ai_panel')
             
             return False
             
@@ -1356,11 +3458,19 @@ class BilibiliSubtitleExtractor:
             print(f"❌ 点击AI按钮失败: {str(e)}")
             return False
     
+    def get_browser_key(self, driver):
+        """浏览器标识（名称+主版本号），不同浏览器对同一点击方式的响应可能不同"""
+        try:
+            capabilities = driver.capabilities or {}
+            name = capabilities.get('browserName') or self.browser_backend
+            version = str(capabilities.get('browserVersion') or '').split('.')[0]
+            return f"{name}{version}" if version else name
+        except Exception:
+            return self.browser_backend
+    
     def check_if_ai_panel_exists(self, driver):
         """检查AI面板是否存在（不要求在字幕列表页）"""
         try:
-            from selenium.webdriver.common.by import By
-            
             # 简单检查AI面板是否存在
             ai_panel_indicators = [
                 "视频总结",  # 左侧标签
@@ -1384,8 +3494,6 @@ class BilibiliSubtitleExtractor:
 
     def verify_ai_panel_exists(self, driver):
         """简单验证AI面板是否出现（不检查字幕列表）"""
-        from selenium.webdriver.common.by import By
-        
         try:
             print("🔍 检测AI面板是否出现...")
             
@@ -1424,7 +3532,6 @@ class BilibiliSubtitleExtractor:
 
     def verify_subtitle_tab_active(self, driver):
         """验证AI面板是否出现且在字幕列表页 - 严格检测版"""
-        from selenium.webdriver.common.by import By
         import time
         
         try:
@@ -1524,9 +3631,6 @@ class BilibiliSubtitleExtractor:
     
     def wait_for_ai_panel_enhanced(self, driver, wait):
         """增强版等待AI面板出现"""
-        import time
-        from selenium.webdriver.common.by import By
-        
         print("🔍 等待AI面板出现...")
         
         # 基于您提供的HTML结构的精确选择器
@@ -1550,27 +3654,23 @@ class BilibiliSubtitleExtractor:
             "[class*='modal']"
         ]
         
-        # 等待最多20秒
-        for attempt in range(40):  # 20秒，每0.5秒检查一次
+        # 在页面内监听DOM变化，有效面板出现后再定位元素（最多等待20秒）
+        if not self.wait_for_condition(driver, AI_PANEL_VISIBLE_CONDITION, 20, '等待AI面板',
+                                       args=[precise_panel_selectors]):
+            print("❌ 超时，未找到AI面板")
+            return None
+        
+        for selector in precise_panel_selectors:
             try:
-                for selector in precise_panel_selectors:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if self.is_valid_ai_panel(driver, element):
-                            print(f"✅ 找到AI面板: {selector}")
-                            return element
-                
-                # 显示进度
-                if attempt % 4 == 0:  # 每2秒显示一次
-                    print(f"⏳ 等待中... ({attempt//2 + 1}/20秒)")
-                
-                time.sleep(0.5)
-                
+                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                for element in elements:
+                    if self.is_valid_ai_panel(driver, element):
+                        print(f"✅ 找到AI面板: {selector}")
+                        return element
             except Exception:
-                time.sleep(0.5)
                 continue
         
-        print("❌ 超时，未找到AI面板")
+        print("❌ 未找到AI面板")
         return None
     
     def is_valid_ai_panel(self, driver, element):
@@ -1604,10 +3704,52 @@ class BilibiliSubtitleExtractor:
         except Exception:
             return False
     
+    def inspect_panel_tabs(self, driver, activate=False):
+        """在AI面板内一次脚本调用读取各标签的激活状态和已渲染的字幕行数
+        
+        Args:
+            activate: 字幕列表标签未激活时是否点击该标签
+        
+        Returns:
+            {'found', 'selector', 'tabs': {标签名: {'active', 'text'}}, 'rows', 'clicked'}；脚本执行失败时返回 None
+        """
+        try:
+            return driver.execute_script(AI_PANEL_TABS_JS, AI_PANEL_SELECTORS, SUBTITLE_ITEM_SELECTORS, activate)
+        except Exception as e:
+            print(f"⚠️ 面板标签检测脚本执行失败: {str(e)[:80]}")
+            return None
+    
     def check_if_on_subtitle_tab(self, driver):
-        """检查当前是否在字幕列表标签页 - 严格检测版"""
+        """检查当前是否在字幕列表标签页：字幕列表标签已激活且面板内已渲染至少2行字幕
+        
+        只在AI面板内检测（一次脚本调用）；未定位到AI面板时回退到逐元素检测。
+        """
+        print("🔍 严格检查当前所在标签页（AI面板内）...")
+        state = self.inspect_panel_tabs(driver)
+        if not state or not state.get('found'):
+            print("   ⚠️ 未定位到AI面板，回退到逐元素检测")
+            return self.check_if_on_subtitle_tab_by_elements(driver)
+        
+        subtitle_tab = state['tabs'].get('字幕列表')
+        if not subtitle_tab:
+            print("   ❌ AI面板中没有字幕列表标签")
+            return False
+        if not subtitle_tab['active']:
+            summary_tab = state['tabs'].get('视频总结')
+            if summary_tab and summary_tab['active']:
+                print("   ❌ 找到激活的视频总结标签，当前在视频总结页")
+            else:
+                print("   ⚪ 找到字幕列表标签但未激活")
+            return False
+        if state['rows'] >= 2:
+            print(f"   ✅ 确认在字幕列表页：激活标签 + {state['rows']}行字幕")
+            return True
+        print(f"   ❌ 字幕列表标签已激活但未看到足够字幕内容（只有{state['rows']}行）")
+        return False
+    
+    def check_if_on_subtitle_tab_by_elements(self, driver):
+        """检查当前是否在字幕列表标签页 - 严格检测版（全文档逐元素检测，未定位到AI面板时使用）"""
         try:
-            from selenium.webdriver.common.by import By
             import re
             
             print("🔍 严格检查当前所在标签页...")
@@ -1738,11 +3880,26 @@ class BilibiliSubtitleExtractor:
             return False
 
     def ensure_subtitle_tab_active(self, driver, timeout=10):
-        """确保字幕列表标签页处于激活状态"""
+        """确保字幕列表标签页处于激活状态：在AI面板内一次脚本调用完成检测与点击，失败时回退到逐元素查找"""
+        state = self.inspect_panel_tabs(driver, activate=True)
+        if not state or not state.get('found') or '字幕列表' not in state['tabs']:
+            print("⚠️ 未在AI面板内找到字幕列表标签，回退到逐元素查找")
+            return self.ensure_subtitle_tab_active_by_elements(driver, timeout)
+        if not state['clicked']:
+            print("✅ 字幕列表标签页已经处于激活状态")
+            return True
+        
+        print(f"👆 已点击AI面板内的字幕列表标签: '{state['tabs']['字幕列表']['text']}'")
+        if self.wait_for_condition(driver, PANEL_SUBTITLE_TAB_ACTIVE_CONDITION, self.step_timeouts['tab_switch'],
+                                   '标签页切换', args=[AI_PANEL_SELECTORS]):
+            return True
+        print("⚠️ 标签页未切换，回退到逐元素点击")
+        return self.ensure_subtitle_tab_active_by_elements(driver, timeout)
+    
+    def ensure_subtitle_tab_active_by_elements(self, driver, timeout=10):
+        """确保字幕列表标签页处于激活状态（全文档逐元素查找，面板内检测失败时使用）"""
         try:
             import time
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.common.action_chains import ActionChains
             
             print("📋 查找并点击字幕列表标签页...")
             
@@ -1834,7 +3991,9 @@ class BilibiliSubtitleExtractor:
                         for method_name, click_action in click_methods:
                             try:
                                 click_action()
-                                time.sleep(2)  # 等待标签页切换
+                                # 等待标签页切换：字幕列表标签出现激活样式即继续
+                                self.wait_for_condition(driver, SUBTITLE_TAB_ACTIVE_CONDITION,
+                                                        self.step_timeouts['tab_switch'], '标签页切换')
                                 print(f"✅ {method_name}成功")
                                 click_success = True
                                 break
@@ -1862,23 +4021,110 @@ class BilibiliSubtitleExtractor:
             return False
     
     def extract_subtitles_with_smart_scroll(self, driver, timeout=30):
-        """智能滚动提取所有字幕内容"""
+        """智能滚动提取所有字幕内容 - 优先页面内一次性采集，失败时回退到逐元素提取"""
+        try:
+            print("开始智能滚动提取字幕...")
+            
+            # 优先使用页面内采集脚本（每次滚动只需一次 execute_script）
+            entries = self.harvest_subtitles_in_page(driver)
+            if entries:
+                return self.convert_ai_subtitles_to_standard_format(entries)
+            
+            print("⚠️ 页面内采集未获取到字幕，回退到逐元素提取")
+            return self.extract_subtitles_by_elements(driver, timeout)
+            
+        except Exception as e:
+            print(f"智能滚动提取字幕时出错: {str(e)}")
+            return []
+    
+    def build_harvest_config(self, fingerprint):
+        """页面内采集脚本的参数：各阶段优先尝试该页面布局下上次命中的选择器"""
+        cache = self.selector_cache
+        return {
+            'panel': cache.prioritize(fingerprint, 'panel', AI_PANEL_SELECTORS),
+            'container': cache.prioritize(fingerprint, 'container', SUBTITLE_CONTAINER_SELECTORS),
+            'scroll': cache.prioritize(fingerprint, 'scroll', SUBTITLE_SCROLL_SELECTORS),
+            'item': cache.prioritize(fingerprint, 'item', SUBTITLE_ITEM_SELECTORS),
+            'time': SUBTITLE_TIME_SELECTORS,
+            'content': SUBTITLE_CONTENT_SELECTORS,
+            'scroll_ratio': 0.8
+        }
+    
+    def harvest_subtitles_in_page(self, driver, max_scroll_attempts=None):
+        """在页面内运行采集脚本，每一步用一次 execute_script 读取全部已渲染字幕行并滚动
+        
+        滚动到列表底部（scrollTop + clientHeight >= scrollHeight）并读取最后一屏后结束，
+        max_scroll_attempts 为 None 时不限制滚动次数
+        
+        Returns:
+            [{'time', 'content'}] 列表；未找到AI面板或脚本执行失败时返回 None
+        """
+        fingerprint = self.get_layout_fingerprint(driver)
+        cache = self.selector_cache
+        config = self.build_harvest_config(fingerprint)
+        
+        all_subtitles = []
+        seen = set()  # (时间, 内容)
+        stuck_count = 0
+        scroll_attempt = 0
+        
+        while max_scroll_attempts is None or scroll_attempt < max_scroll_attempts:
+            try:
+                result = driver.execute_script(AI_SUBTITLE_HARVEST_JS, config)
+            except Exception as e:
+                print(f"页面内采集脚本执行失败: {str(e)[:80]}")
+                return None
+            
+            if not result or not result.get('found'):
+                if scroll_attempt == 0:
+                    print("❌ 页面内采集未找到AI面板容器")
+                    cache.record(fingerprint, 'panel', None)
+                    return None
+                break
+            
+            if scroll_attempt == 0:
+                selectors = result.get('selectors') or {}
+                print(f"✅ 页面内采集: 面板 {selectors.get('panel')} | 字幕项 {selectors.get('item')}")
+                for stage in ('panel', 'container', 'scroll', 'item'):
+                    cache.record(fingerprint, stage, selectors.get(stage))
+            
+            for row in result.get('rows') or []:
+                key = (row['time'], row['content'])
+                if key not in seen:
+                    seen.add(key)
+                    all_subtitles.append({'time': row['time'], 'content': row['content']})
+            
+            scroll_attempt += 1
+            print(f"滚动 {scroll_attempt}: 已收集 {len(all_subtitles)} 条字幕（页面内采集）")
+            
+            if result.get('atEnd'):
+                print("已到达字幕列表底部，结束收集")
+                break
+            # 未到底部却无法继续滚动（滚动容器识别错误等），重试几次后结束
+            stuck_count = 0 if result.get('scrolled') else stuck_count + 1
+            if stuck_count >= 3:
+                print("字幕列表无法继续滚动，结束收集")
+                break
+            
+            # 等待虚拟列表完成重新渲染（列表静止即继续）
+            self.wait_for_dom_quiet(driver, result.get('container'), timeout=self.step_timeouts['scroll'])
+        
+        print(f"✅ 页面内采集完成，共获取 {len(all_subtitles)} 条字幕")
+        cache.flush()
+        return all_subtitles
+    
+    def extract_subtitles_by_elements(self, driver, timeout=30):
+        """逐元素滚动提取字幕（页面内采集失败时的回退路径）"""
         try:
             import time
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support.ui import WebDriverWait
-            from selenium.webdriver.support import expected_conditions as EC
             
-            print("开始智能滚动提取字幕...")
+            # 优先尝试该页面布局下上次命中的选择器
+            fingerprint = self.get_layout_fingerprint(driver)
+            cache = self.selector_cache
             
             # 首先查找AI面板容器，确保只在AI面板内查找字幕
             ai_panel = None
-            ai_panel_selectors = [
-                "[data-video-assistant-subject-wrapper]",
-                "[class*='VideoAssistant']",
-                "[class*='InteractWrapper']",
-                "//*[contains(text(), 'AI小助手')]/ancestor::div[contains(@class, 'panel') or contains(@class, 'wrapper') or contains(@class, 'container')][1]"
-            ]
+            ai_panel_selectors = cache.prioritize(fingerprint, 'panel', AI_PANEL_SELECTORS)
             
             for selector in ai_panel_selectors:
                 try:
@@ -1906,12 +4152,7 @@ class BilibiliSubtitleExtractor:
             
             # 在AI面板内查找字幕容器
             subtitle_container = None
-            container_selectors = [
-                '[data-video-assistant-subject-subtitles]',
-                '._SubtitlesList_2jiok_1',
-                '[class*="_SubtitlesList_"]',
-                '[class*="_Subtitles_"]'
-            ]
+            container_selectors = cache.prioritize(fingerprint, 'container', SUBTITLE_CONTAINER_SELECTORS)
             
             for selector in container_selectors:
                 try:
@@ -1929,12 +4170,7 @@ class BilibiliSubtitleExtractor:
             
             # 查找可滚动的区域（在AI面板内）
             scrollable_container = None
-            scroll_selectors = [
-                '[data-video-assistant-subject-content]',
-                '._Content_196qs_128',
-                '[class*="_Content_"]',
-                '[data-video-assistant-subject-subtitles]'
-            ]
+            scroll_selectors = cache.prioritize(fingerprint, 'scroll', SUBTITLE_SCROLL_SELECTORS)
             
             for selector in scroll_selectors:
                 try:
@@ -1951,22 +4187,16 @@ class BilibiliSubtitleExtractor:
             
             # 收集所有字幕
             all_subtitles = []
-            last_subtitle_count = 0
-            no_new_content_count = 0
-            max_scroll_attempts = 20
+            seen = set()  # (时间, 内容)
+            stuck_count = 0
+            scroll_attempt = 0
             
             print("开始收集字幕内容...")
             
-            for scroll_attempt in range(max_scroll_attempts):
+            while True:
                 # 在字幕容器内查找字幕项（不是全页面查找）
                 subtitle_items = []
-                item_selectors = [
-                    '._Part_1iu0q_16',
-                    '[class*="_Part_"]',
-                    '.item',
-                    '[class*="subtitle"][class*="item"]',
-                    'div[class*="time"]'  # 包含时间的div
-                ]
+                item_selectors = cache.prioritize(fingerprint, 'item', SUBTITLE_ITEM_SELECTORS)
                 
                 for selector in item_selectors:
                     try:
@@ -2004,23 +4234,17 @@ class BilibiliSubtitleExtractor:
                         for line in lines:
                             line = line.strip()
                             if line and ':' in line and len(line) > 5:  # 可能是时间戳+内容
-                                if line not in [item['content'] for item in all_subtitles]:
-                                    all_subtitles.append({
-                                        'time': line.split(' ')[0] if ' ' in line else '00:00',
-                                        'content': line
-                                    })
+                                time_text = line.split(' ')[0] if ' ' in line else '00:00'
+                                if (time_text, line) not in seen:
+                                    seen.add((time_text, line))
+                                    all_subtitles.append({'time': time_text, 'content': line})
                 
                 # 提取字幕数据
                 for item in subtitle_items:
                     try:
                         # 提取时间
                         time_text = ''
-                        time_selectors = [
-                            '._TimeText_1iu0q_35',
-                            '[class*="_TimeText_"]',
-                            '[class*="time"]',
-                            '.time'
-                        ]
+                        time_selectors = SUBTITLE_TIME_SELECTORS
                         
                         for time_sel in time_selectors:
                             try:
@@ -2032,13 +4256,7 @@ class BilibiliSubtitleExtractor:
                         
                         # 提取内容
                         content_text = ''
-                        content_selectors = [
-                            '._Text_1iu0q_64',
-                            '[class*="_Text_"]',
-                            '[class*="content"] span',
-                            '.content',
-                            'span'
-                        ]
+                        content_selectors = SUBTITLE_CONTENT_SELECTORS
                         
                         for content_sel in content_selectors:
                             try:
@@ -2057,45 +4275,39 @@ class BilibiliSubtitleExtractor:
                             else:
                                 content_text = item_text
                         
-                        # 验证和添加字幕项
+                        # 验证和添加字幕项（按时间和内容去重）
                         if time_text and content_text and len(content_text) > 1:
-                            subtitle_entry = {
-                                'time': time_text,
-                                'content': content_text
-                            }
-                            
-                            # 避免重复
-                            if subtitle_entry not in all_subtitles:
-                                all_subtitles.append(subtitle_entry)
+                            if (time_text, content_text) not in seen:
+                                seen.add((time_text, content_text))
+                                all_subtitles.append({'time': time_text, 'content': content_text})
                                 
                     except Exception as e:
                         continue
                 
-                current_count = len(all_subtitles)
-                print(f"滚动 {scroll_attempt + 1}/{max_scroll_attempts}: 已收集 {current_count} 条字幕")
-                
-                # 检查是否有新内容
-                if current_count == last_subtitle_count:
-                    no_new_content_count += 1
-                    if no_new_content_count >= 3:
-                        print("连续3次滚动无新内容，结束收集")
-                        break
-                else:
-                    no_new_content_count = 0
-                    last_subtitle_count = current_count
+                scroll_attempt += 1
+                print(f"滚动 {scroll_attempt}: 已收集 {len(all_subtitles)} 条字幕")
                 
                 # 滚动到下一部分
                 try:
-                    driver.execute_script(
-                        "arguments[0].scrollTop += arguments[0].clientHeight * 0.8;",
-                        scrollable_container
-                    )
-                    time.sleep(0.5)  # 等待内容加载
+                    step = driver.execute_script(SCROLL_STEP_JS, scrollable_container, 0.8) or {}
+                    if step.get('atEnd'):
+                        print("已到达字幕列表底部，结束收集")
+                        break
+                    # 未到底部却无法继续滚动，重试几次后结束
+                    stuck_count = 0 if step.get('scrolled') else stuck_count + 1
+                    if stuck_count >= 3:
+                        print("字幕列表无法继续滚动，结束收集")
+                        break
+                    # 等待内容加载（字幕容器静止即继续）
+                    self.wait_for_dom_quiet(driver, subtitle_container, timeout=self.step_timeouts['scroll'])
                 except:
-                    # 如果滚动失败，尝试其他方式
+                    # 如果滚动失败，尝试其他方式（无法判断是否到底，同样计入重试次数）
+                    stuck_count += 1
+                    if stuck_count >= 3:
+                        break
                     try:
                         driver.execute_script("window.scrollBy(0, 300);")
-                        time.sleep(0.5)
+                        self.wait_for_dom_quiet(driver, subtitle_container, timeout=self.step_timeouts['scroll'])
                     except:
                         break
             
@@ -2108,7 +4320,7 @@ class BilibiliSubtitleExtractor:
                 return []
                 
         except Exception as e:
-            print(f"智能滚动提取字幕时出错: {str(e)}")
+            print(f"逐元素提取字幕时出错: {str(e)}")
             return []
     
     def convert_ai_subtitles_to_standard_format(self, subtitle_entries):
@@ -2130,12 +4342,12 @@ class BilibiliSubtitleExtractor:
                     time_str = entry['time']
                     content = entry['content']
                     
-                    # 解析时间（格式如 "00:01", "01:25" 等）
-                    time_parts = time_str.split(':')
+                    # 解析时间（格式如 "00:01", "01:25", "1:02:03" 等）
+                    time_parts = [int(part) for part in time_str.strip().split(':')]
                     if len(time_parts) >= 2:
-                        minutes = int(time_parts[0])
-                        seconds = int(time_parts[1])
-                        start_time = minutes * 60 + seconds
+                        start_time = 0
+                        for part in time_parts:
+                            start_time = start_time * 60 + part
                         end_time = start_time + 3  # 假设每条字幕持续3秒
                         
                         subtitle_item['body'].append({
@@ -2143,24 +4355,307 @@ class BilibiliSubtitleExtractor:
                             'to': end_time,
                             'content': content
                         })
-                except Exception as e:
-                    print(f"处理字幕项时出错: {e}")
-                    continue
-            
-            if subtitle_item['body']:
-                print(f"转换完成: {len(subtitle_item['body'])} 条有效字幕")
-                return [subtitle_item]
-            else:
-                return []
-                
+                except Exception as e:
+                    print(f"处理字幕项时出错: {e}")
+                    continue
+            
+            if subtitle_item['body']:
+                # 滚动采集的行可能乱序到达，按时间排序（同一时间保持采集顺序）
+                subtitle_item['body'].sort(key=lambda item: item['from'])
+                print(f"转换完成: {len(subtitle_item['body'])} 条有效字幕")
+                return [subtitle_item]
+            else:
+                return []
+                
+        except Exception as e:
+            print(f"转换字幕格式时出错: {str(e)}")
+            return []
+    
+    def enable_performance_logging(self, options):
+        """为浏览器选项开启性能日志，DevTools网络事件随后可通过 get_log('performance') 读取"""
+        # Edge 使用 ms: 前缀，Chrome/Chromium 使用 goog: 前缀
+        vendor_prefix = options.KEY.split(':')[0]
+        options.set_capability(f'{vendor_prefix}:loggingPrefs', {'performance': 'ALL'})
+    
+    def start_network_capture(self, driver):
+        """开启DevTools网络事件捕获，并丢弃之前积累的性能日志"""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.get_log('performance')
+            print("📡 已开启DevTools网络抓包")
+            return True
+        except Exception as e:
+            print(f"⚠️ 无法开启网络抓包，将使用页面提取流程: {str(e)[:80]}")
+            return False
+    
+    def capture_ai_subtitles_from_network(self, driver, timeout=20):
+        """从DevTools网络事件中查找AI字幕接口响应并解析
+        
+        Returns:
+            标准字幕结构列表；超时未捕获到可解析的响应时返回 None
+        """
+        import time
+        
+        pending_requests = {}  # requestId -> url
+        deadline = time.time() + timeout
+        
+        while time.time() < deadline:
+            try:
+                events = self.read_network_events(driver)
+            except Exception as e:
+                print(f"❌ 读取网络日志失败: {str(e)[:80]}")
+                return None
+            
+            for method, params in events:
+                if method == 'Network.responseReceived':
+                    url = (params.get('response') or {}).get('url', '')
+                    if any(pattern in url for pattern in AI_SUBTITLE_RESPONSE_PATTERNS):
+                        print(f"   📥 捕获到AI字幕响应: {url[:100]}")
+                        pending_requests[params.get('requestId')] = url
+                elif method == 'Network.loadingFinished' and params.get('requestId') in pending_requests:
+                    url = pending_requests.pop(params['requestId'])
+                    subtitles = self.read_network_subtitle_response(driver, params['requestId'], url)
+                    if subtitles:
+                        return subtitles
+            
+            time.sleep(0.5)
+        
+        print(f"❌ {timeout}秒内未捕获到可解析的AI字幕响应")
+        return None
+    
+    def read_network_events(self, driver):
+        """读取并清空性能日志中的网络事件，开启请求屏蔽时同时更新流量统计
+        
+        Returns:
+            [(事件名, 参数)] 列表
+        """
+        events = []
+        traffic = self.page_traffic.get(id(driver))
+        for entry in driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+            method = message.get('method') or ''
+            params = message.get('params') or {}
+            if traffic is not None:
+                self.record_page_traffic(traffic, method, params)
+            events.append((method, params))
+        return events
+    
+    def enable_request_blocking(self, driver, reset_stats=True):
+        """在当前标签页屏蔽媒体、图片、字体和统计请求（Network.setBlockedURLs）"""
+        patterns = [pattern for group in BLOCKED_URL_PATTERNS.values() for pattern in group]
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except Exception as e:
+            print(f"⚠️ 无法开启请求屏蔽: {str(e)[:80]}")
+            return False
+        if reset_stats or id(driver) not in self.page_traffic:
+            # 丢弃之前页面积累的网络事件
+            self.page_traffic.pop(id(driver), None)
+            try:
+                driver.get_log('performance')
+            except Exception:
+                pass
+            self.page_traffic[id(driver)] = {'requests': 0, 'bytes': 0, 'blocked': {}, 'urls': {}}
+        print(f"🚫 已开启请求屏蔽（{len(patterns)} 条规则）")
+        return True
+    
+    def record_page_traffic(self, traffic, method, params):
+        """按网络事件累计已下载的请求数、字节数，以及各类被屏蔽的请求数（traffic 为该会话的统计）"""
+        import fnmatch
+        
+        request_id = params.get('requestId')
+        if method == 'Network.requestWillBeSent':
+            traffic['urls'][request_id] = (params.get('request') or {}).get('url', '')
+        elif method == 'Network.loadingFinished':
+            traffic['requests'] += 1
+            traffic['bytes'] += int(params.get('encodedDataLength') or 0)
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            url = traffic['urls'].get(request_id, '')
+            category = next((name for name, patterns in BLOCKED_URL_PATTERNS.items()
+                             if any(fnmatch.fnmatchcase(url, pattern) for pattern in patterns)), 'other')
+            traffic['blocked'][category] = traffic['blocked'].get(category, 0) + 1
+    
+    def report_request_blocking(self, driver):
+        """输出当前页面的请求屏蔽统计
+        
+        被屏蔽的请求没有发出，无法得知其大小，因此只统计屏蔽数量和实际下载的字节数
+        
+        Returns:
+            {'requests': 已下载请求数, 'bytes': 已下载字节数, 'blocked': {类别: 屏蔽数}}
+        """
+        if id(driver) not in self.page_traffic:
+            return None
+        try:
+            self.read_network_events(driver)
+        except Exception:
+            pass
+        traffic = self.page_traffic.pop(id(driver))
+        blocked_total = sum(traffic['blocked'].values())
+        details = ' / '.join(f"{BLOCKED_CATEGORY_NAMES.get(name, name)} {count}"
+                             for name, count in sorted(traffic['blocked'].items()))
+        print(f"🚫 请求屏蔽: 屏蔽 {blocked_total} 个请求" + (f"（{details}）" if details else ''))
+        print(f"   实际下载 {traffic['requests']} 个请求，共 {traffic['bytes'] / 1024:.1f} KB")
+        return {'requests': traffic['requests'], 'bytes': traffic['bytes'], 'blocked': dict(traffic['blocked'])}
+    
+    def read_network_subtitle_response(self, driver, request_id, url):
+        """读取指定请求的响应体并解析为标准字幕结构"""
+        import base64
+        
+        try:
+            response = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            body = response.get('body', '')
+            if response.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8')
+            return self.parse_ai_subtitle_response(json.loads(body), url)
+        except Exception as e:
+            print(f"   ⚠️ 解析响应失败: {str(e)[:80]}")
+            return None
+    
+    def parse_ai_subtitle_response(self, data, subtitle_url=''):
+        """将AI字幕接口的JSON响应解析为标准字幕结构
+        
+        支持两种响应:
+        - 字幕JSON: {"body": [{"from", "to", "content"}]}
+        - AI总结接口: {"data": {"model_result": {"subtitle": [{"part_subtitle": [{"start_timestamp", "end_timestamp", "content"}]}]}}}
+        
+        开启 include_summary 时，AI总结接口响应中的总结和提纲一并保存到第一条字幕的 ai_summary 中。
+        """
+        body = []
+        ai_summary = None
+        
+        if isinstance(data.get('body'), list):
+            for item in data['body']:
+                content = (item.get('content') or '').strip()
+                if content:
+                    body.append({'from': float(item['from']), 'to': float(item['to']), 'content': content})
+        else:
+            model_result = (data.get('data') or {}).get('model_result') or {}
+            if self.include_summary:
+                ai_summary = self.parse_ai_summary(model_result)
+            for part in model_result.get('subtitle') or []:
+                for item in part.get('part_subtitle') or []:
+                    content = (item.get('content') or '').strip()
+                    if content:
+                        body.append({
+                            'from': float(item['start_timestamp']),
+                            'to': float(item['end_timestamp']),
+                            'content': content
+                        })
+        
+        if not body:
+            return None
+        
+        body.sort(key=lambda item: item['from'])
+        subtitle = {
+            'lan': 'ai-zh',
+            'lan_doc': 'AI智能字幕',
+            'subtitle_url': subtitle_url,
+            'body': body
+        }
+        if ai_summary:
+            subtitle['ai_summary'] = ai_summary
+        return [subtitle]
+    
+    def parse_ai_summary(self, model_result):
+        """将AI总结接口的 model_result（或页面状态中的同结构对象）解析为总结结构
+        
+        Returns:
+            {'summary': 总结段落, 'outline': [{'title', 'timestamp', 'items': [{'timestamp', 'content'}]}]}，
+            时间戳单位为秒；没有总结内容时返回 None
+        """
+        if not isinstance(model_result, dict):
+            return None
+        outline = []
+        for section in model_result.get('outline') or []:
+            items = [
+                {'timestamp': float(item.get('timestamp') or 0), 'content': (item.get('content') or '').strip()}
+                for item in section.get('part_outline') or []
+                if (item.get('content') or '').strip()
+            ]
+            title = (section.get('title') or '').strip()
+            if title or items:
+                outline.append({'title': title, 'timestamp': float(section.get('timestamp') or 0), 'items': items})
+        summary = (model_result.get('summary') or '').strip()
+        if not summary and not outline:
+            return None
+        return {'summary': summary, 'outline': outline}
+    
+    def attach_summary_from_panel(self, driver, subtitles):
+        """页面状态中的字幕没有AI总结时，从已打开的AI面板读取视频总结并附加到第一条字幕"""
+        if not self.include_summary or subtitles[0].get('ai_summary'):
+            return subtitles
+        with self.profile_step('summary'):
+            ai_summary = self.harvest_summary_in_page(driver)
+        if ai_summary:
+            subtitles[0]['ai_summary'] = ai_summary
+        else:
+            print("⚠️ 没有读取到AI总结，本次只保存字幕")
+        return subtitles
+    
+    def harvest_summary_in_page(self, driver):
+        """视频总结标签激活时，一次脚本调用读取AI面板文本并解析为总结结构
+        
+        Returns:
+            总结结构（同 parse_ai_summary）；面板未打开、当前不在视频总结标签或没有内容时返回 None
+        """
+        try:
+            result = driver.execute_script(AI_SUMMARY_HARVEST_JS, AI_PANEL_SELECTORS)
         except Exception as e:
-            print(f"转换字幕格式时出错: {str(e)}")
-            return []
+            print(f"   ⚠️ 读取AI总结失败: {str(e)[:60]}")
+            return None
+        if not result or not result.get('text'):
+            print("   ⚠️ 当前不在视频总结标签，跳过AI总结")
+            return None
+        ai_summary = self.parse_summary_text(result['text'])
+        if ai_summary:
+            print(f"   📝 读取AI总结: {len(ai_summary['outline'])} 个段落")
+        return ai_summary
+    
+    def parse_summary_text(self, text):
+        """解析视频总结标签的面板文本
+        
+        文本按时间戳切分：第一个时间戳之前的长段落为总结；紧接时间戳的短文本为段落标题，
+        时间戳之后的文本为提纲条目（时间戳单独成行时取下一行）。
+        """
+        ui_labels = {'AI小助手', '视频总结', '字幕列表', '总结', '提纲'}
+        tokens = []
+        for line in text.splitlines():
+            for i, part in enumerate(re.split(r'((?:\d{1,2}:)?\d{1,2}:\d{2})', line)):
+                part = part.strip()
+                if not part:
+                    continue
+                tokens.append(('time', self.extract_timestamp_from_text(part)) if i % 2 else ('text', part))
+        
+        summary = []
+        outline = []
+        pending = None
+        for index, (kind, value) in enumerate(tokens):
+            if kind == 'time':
+                pending = value
+                continue
+            if value in ui_labels:
+                continue
+            next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+            if pending is not None:
+                if not outline:
+                    outline.append({'title': '', 'timestamp': pending, 'items': []})
+                outline[-1]['items'].append({'timestamp': float(pending), 'content': value})
+                pending = None
+            elif next_token and next_token[0] == 'time' and len(value) <= 40:
+                outline.append({'title': value, 'timestamp': float(next_token[1]), 'items': []})
+            elif not outline and len(value) >= 15:
+                summary.append(value)
+        
+        if not summary and not outline:
+            return None
+        return {'summary': '\n'.join(summary), 'outline': outline}
     
     def find_subtitle_list_button(self, driver, ai_panel):
         """在AI弹窗中查找字幕列表按钮"""
-        from selenium.webdriver.common.by import By
-        
         try:
             print("在AI弹窗中查找字幕列表按钮...")
             
@@ -2222,7 +4717,6 @@ class BilibiliSubtitleExtractor:
     def click_subtitle_list(self, driver, subtitle_button):
         """点击字幕列表按钮"""
         import time
-        from selenium.webdriver.common.action_chains import ActionChains
         
         try:
             # 确保按钮可见
@@ -2258,8 +4752,6 @@ class BilibiliSubtitleExtractor:
     def extract_all_subtitles_with_scroll(self, driver, ai_panel):
         """在AI弹窗中滚动获取所有字幕内容"""
         import time
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.common.keys import Keys
         
         try:
             print("开始提取字幕内容...")
@@ -2307,7 +4799,8 @@ class BilibiliSubtitleExtractor:
                         print(f"滚动失败，停止在第{scroll_attempt + 1}次")
                         break
                     
-                    time.sleep(2)  # 等待内容加载
+                    # 等待内容加载（字幕容器静止即继续）
+                    self.wait_for_dom_quiet(driver, subtitle_container, timeout=self.step_timeouts['scroll'])
                     
                 except Exception as e:
                     print(f"滚动过程中出错: {str(e)}")
@@ -2324,8 +4817,6 @@ class BilibiliSubtitleExtractor:
     
     def find_subtitle_container_in_panel(self, driver, ai_panel):
         """在AI弹窗中查找字幕容器"""
-        from selenium.webdriver.common.by import By
-        
         try:
             # 定义可能的字幕容器选择器
             container_selectors = [
@@ -2364,8 +4855,6 @@ class BilibiliSubtitleExtractor:
     
     def extract_subtitle_items_from_container(self, container):
         """从容器中提取字幕项"""
-        from selenium.webdriver.common.by import By
-        
         subtitles = []
         
         try:
@@ -2412,8 +4901,6 @@ class BilibiliSubtitleExtractor:
     def scroll_subtitle_container(self, driver, container):
         """滚动字幕容器"""
         try:
-            from selenium.webdriver.common.keys import Keys
-            
             # 尝试多种滚动方式
             scroll_methods = [
                 lambda: driver.execute_script("arguments[0].scrollTop += 500;", container),
@@ -2521,24 +5008,1019 @@ class BilibiliSubtitleExtractor:
 
 
 
+class DiagnosticHtmlParser(HTMLParser):
+    """从诊断快照的HTML中收集交互元素（button / a / role=button）的文本和属性"""
+    
+    def __init__(self):
+        super().__init__()
+        self.elements = []
+        self.open = []       # 未闭合的交互元素 [记录, 同名标签嵌套深度]
+        self.skip_depth = 0  # 位于 script / style 内
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip_depth += 1
+            return
+        for item in self.open:
+            if item[0]['tag'] == tag:
+                item[1] += 1
+        attrs = dict(attrs)
+        if tag in ('button', 'a') or attrs.get('role') == 'button':
+            record = {
+                'tag': tag,
+                'text': '',
+                'class': attrs.get('class') or '',
+                'title': attrs.get('title') or '',
+                'aria_label': attrs.get('aria-label') or ''
+            }
+            self.elements.append(record)
+            self.open.append([record, 1])
+    
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style'):
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        for item in self.open:
+            if item[0]['tag'] == tag:
+                item[1] -= 1
+        self.open = [item for item in self.open if item[1] > 0]
+    
+    def handle_data(self, data):
+        if self.skip_depth or not self.open:
+            return
+        data = data.strip()
+        if data:
+            for record, _ in self.open:
+                if len(record['text']) < 200:
+                    record['text'] = (record['text'] + ' ' + data).strip()
+
+
+class StepProfiler:
+    """AI流程分步计时 - 记录每个步骤的耗时、浏览器命令数和返回的元素数，可汇总一批视频并导出JSON
+    
+    attach 包装驱动的命令入口（Selenium 的 execute、DevTools直连的 run、回放驱动的 count），
+    命令计入当前线程正在执行的步骤；未开启时不包装驱动，也不产生任何开销。
+    """
+    
+    # 驱动的命令入口（按顺序取第一个存在的方法）
+    COMMAND_HOOKS = ('execute', 'run', 'count')
+    
+    def __init__(self):
+        self.runs = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+    
+    def attach(self, driver):
+        """包装驱动的命令入口（同一驱动只包装一次）"""
+        if getattr(driver, 'step_profiler', None) is self:
+            return driver
+        for name in self.COMMAND_HOOKS:
+            original = getattr(driver, name, None)
+            if callable(original):
+                break
+        else:
+            return driver
+        
+        def wrapped(*args, **kwargs):
+            result = original(*args, **kwargs)
+            self.record_command(result)
+            return result
+        
+        setattr(driver, name, wrapped)
+        driver.step_profiler = self
+        return driver
+    
+    def record_command(self, result):
+        step = getattr(self.local, 'step', None)
+        if step is None:
+            return
+        step['calls'] += 1
+        if isinstance(result, dict) and 'value' in result:
+            result = result['value']
+        step['elements'] += self.count_elements(result)
+    
+    @classmethod
+    def count_elements(cls, value):
+        """统计命令结果中的元素引用数（WebElement 等元素对象或 {'__element__': id}）"""
+        if isinstance(value, (list, tuple)):
+            return sum(cls.count_elements(item) for item in value)
+        if isinstance(value, dict):
+            if '__element__' in value:
+                return 1
+            return sum(cls.count_elements(item) for item in value.values())
+        return 1 if hasattr(value, 'find_element') else 0
+    
+    @contextlib.contextmanager
+    def run(self, bvid):
+        """一次视频提取；结束时打印分步统计"""
+        record = {'bvid': bvid, 'ms': 0, 'steps': {}}
+        self.local.run = record
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = round((time.perf_counter() - start_time) * 1000, 1)
+            self.local.run = None
+            with self.lock:
+                self.runs.append(record)
+            print(self.format_run(record))
+    
+    @contextlib.contextmanager
+    def step(self, name):
+        """流程中的一个步骤；同名步骤在一次提取中累加，嵌套时命令计入最内层步骤"""
+        run = getattr(self.local, 'run', None)
+        if run is None:
+            yield
+            return
+        step = run['steps'].setdefault(name, {'ms': 0, 'calls': 0, 'elements': 0})
+        outer = getattr(self.local, 'step', None)
+        self.local.step = step
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            step['ms'] = round(step['ms'] + (time.perf_counter() - start_time) * 1000, 1)
+            self.local.step = outer
+    
+    def format_run(self, record):
+        parts = [f"{name} {step['ms']:.0f}ms/{step['calls']}次" for name, step in record['steps'].items()]
+        return f"⏱️ [{record['bvid']}] 共 {record['ms'] / 1000:.1f}秒: " + '，'.join(parts)
+    
+    def aggregate(self):
+        """按步骤汇总全部提取: {步骤: {'runs', 'ms_total', 'ms_mean', 'ms_max', 'calls', 'elements'}}"""
+        with self.lock:
+            runs = list(self.runs)
+        steps = {}
+        for record in runs:
+            for name, step in record['steps'].items():
+                total = steps.setdefault(name, {'runs': 0, 'ms_total': 0, 'ms_max': 0, 'calls': 0, 'elements': 0})
+                total['runs'] += 1
+                total['ms_total'] += step['ms']
+                total['ms_max'] = max(total['ms_max'], step['ms'])
+                total['calls'] += step['calls']
+                total['elements'] += step['elements']
+        for total in steps.values():
+            total['ms_total'] = round(total['ms_total'], 1)
+            total['ms_mean'] = round(total['ms_total'] / total['runs'], 1)
+        return steps
+    
+    def summary(self):
+        """返回汇总表文本"""
+        lines = [f"{'步骤':<16}{'次数':>6}{'平均(ms)':>12}{'最长(ms)':>12}{'命令数':>8}{'元素数':>8}"]
+        for name, total in self.aggregate().items():
+            lines.append(f"{name:<16}{total['runs']:>6}{total['ms_mean']:>12.0f}{total['ms_max']:>12.0f}"
+                         f"{total['calls']:>8}{total['elements']:>8}")
+        return '\n'.join(lines)
+    
+    def save(self, path):
+        """将每次提取的明细和汇总写入JSON文件"""
+        with self.lock:
+            runs = list(self.runs)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'runs': runs, 'steps': self.aggregate()}, f, ensure_ascii=False, indent=2)
+
+
+class SelectorCache:
+    """选择器命中缓存 - 按页面布局指纹记录各阶段最终命中的选择器并持久化到磁盘
+    
+    下次查找时优先尝试上次命中的选择器；命中的选择器不再匹配时删除该记录。
+    文件格式: {"layouts": {指纹: {阶段: 选择器}}, "stats": {阶段: {"hits", "misses", "invalidated"}}}
+    """
+    
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.layouts = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """从磁盘读取缓存，文件损坏时从空缓存开始"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.layouts = data.get('layouts', {})
+            self.stats = data.get('stats', {})
+        except (OSError, ValueError):
+            self.layouts = {}
+            self.stats = {}
+    
+    def save(self):
+        """写回磁盘（先写临时文件再替换，避免中断时损坏缓存）"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'layouts': self.layouts, 'stats': self.stats}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"⚠️ 选择器缓存写入失败: {e}")
+    
+    def lookup(self, fingerprint, stage):
+        """返回该布局下此阶段上次命中的选择器，没有记录时返回 None"""
+        return self.layouts.get(fingerprint, {}).get(stage)
+    
+    def prioritize(self, fingerprint, stage, selectors):
+        """将上次命中的选择器排到最前面"""
+        cached = self.lookup(fingerprint, stage)
+        if cached in selectors:
+            return [cached] + [selector for selector in selectors if selector != cached]
+        return list(selectors)
+    
+    def record(self, fingerprint, stage, winner):
+        """记录本次命中的选择器并更新命中统计
+        
+        Args:
+            winner: 本次最终命中的选择器；None 表示全部未命中
+        """
+        with self.lock:
+            cached = self.lookup(fingerprint, stage)
+            stage_stats = self.stats.setdefault(stage, {'hits': 0, 'misses': 0, 'invalidated': 0})
+            if cached is not None and cached == winner:
+                stage_stats['hits'] += 1
+                return
+            
+            stage_stats['misses'] += 1
+            layout = self.layouts.setdefault(fingerprint, {})
+            if cached is not None:
+                # 缓存的选择器已不再命中，删除该记录
+                stage_stats['invalidated'] += 1
+                layout.pop(stage, None)
+            if winner is not None:
+                layout[stage] = winner
+            if not layout:
+                self.layouts.pop(fingerprint, None)
+            self.save()
+    
+    def flush(self):
+        """持久化命中统计（命中时不立即写盘）"""
+        with self.lock:
+            self.save()
+    
+    def summary(self):
+        """返回各阶段的命中率统计文本"""
+        lines = []
+        for stage, stage_stats in sorted(self.stats.items()):
+            total = stage_stats['hits'] + stage_stats['misses']
+            rate = stage_stats['hits'] / total * 100 if total else 0
+            lines.append(f"{stage}: 命中 {stage_stats['hits']}/{total} ({rate:.0f}%)，失效 {stage_stats['invalidated']}")
+        return '\n'.join(lines)
+
+
+class AiAvailabilityCache:
+    """无AI字幕视频的负缓存 - 记录已确认没有AI小助手字幕的视频并持久化到磁盘，有效期内不再打开浏览器重试
+    
+    文件格式: {"entries": {bvid: {"reason", "checked_at", "expires_at"}}}
+    """
+    
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """从磁盘读取缓存，文件损坏时从空缓存开始"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    def save(self):
+        """写回磁盘（同时清理过期记录）"""
+        now = time.time()
+        self.entries = {bvid: entry for bvid, entry in self.entries.items() if entry['expires_at'] > now}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'entries': self.entries}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"⚠️ 负缓存写入失败: {e}")
+    
+    def lookup(self, bvid):
+        """返回未过期的记录 {"reason", "checked_at", "expires_at"}，没有记录时返回 None"""
+        entry = self.entries.get(bvid)
+        if entry and entry['expires_at'] > time.time():
+            return entry
+        return None
+    
+    def record(self, bvid, reason, ttl):
+        """记录视频没有AI字幕，ttl 秒后过期"""
+        with self.lock:
+            now = time.time()
+            self.entries[bvid] = {'reason': reason, 'checked_at': now, 'expires_at': now + ttl}
+            self.save()
+    
+    def discard(self, bvid):
+        """删除记录（视频已成功提取到AI字幕）"""
+        with self.lock:
+            if self.entries.pop(bvid, None) is not None:
+                self.save()
+
+
+class BrowserMemoryMonitor:
+    """浏览器内存监控 - 每个任务结束后读取标签页的DevTools性能指标（JS堆、DOM节点数）和浏览器进程树内存，
+    达到页面数或内存上限时建议回收标签页或重启浏览器实例，长时间批量运行时内存与吞吐保持平稳
+    
+    进程内存需要 psutil（可选，pip install psutil）和 process_id(driver) 能给出浏览器或驱动进程号；
+    缺少任一时只按标签页指标和页面数判断。各上限为 0 时不检查。
+    restartable(driver) 返回 False 的会话（连接已运行的浏览器）不检查进程内存和重启页面数。
+    """
+    
+    def __init__(self, tab_pages=50, tab_heap_mb=512, restart_pages=500, process_mb=4096, process_id=None,
+                 restartable=None):
+        """
+        Args:
+            tab_pages: 同一标签页处理的页面数达到该值时换新标签页
+            tab_heap_mb: 标签页JS堆（JSHeapTotalSize）超过该值时换新标签页
+            restart_pages: 同一浏览器会话处理的页面数达到该值时重启
+            process_mb: 浏览器进程树常驻内存超过该值时重启
+            process_id: 返回会话对应进程号的函数 process_id(driver)，进程树内存从该进程向下统计
+            restartable: 判断重启会话能否释放浏览器内存的函数 restartable(driver)，为 None 时视为都可以
+        """
+        self.limits = {'tab_pages': tab_pages, 'tab_heap_mb': tab_heap_mb,
+                       'restart_pages': restart_pages, 'process_mb': process_mb}
+        self.process_id = process_id
+        self.restartable = restartable
+        self.pages = {}  # id(driver) -> {'session': 会话处理的页面数, 'tab': 当前标签页处理的页面数}
+        self.stats = {'pages': 0, 'tab_recycles': 0, 'restarts': 0, 'peak_heap_mb': 0.0, 'peak_process_mb': 0.0}
+        self.psutil_warned = False
+    
+    def tab_metrics(self, driver):
+        """当前标签页的性能指标 {'heap_mb', 'heap_used_mb', 'nodes', 'documents'}；驱动不支持DevTools命令时返回 None"""
+        try:
+            driver.execute_cdp_cmd('Performance.enable', {})
+            metrics = driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics') or []
+        except Exception:
+            return None
+        values = {item['name']: item['value'] for item in metrics}
+        return {
+            'heap_mb': values.get('JSHeapTotalSize', 0) / 1048576,
+            'heap_used_mb': values.get('JSHeapUsedSize', 0) / 1048576,
+            'nodes': int(values.get('Nodes', 0)),
+            'documents': int(values.get('Documents', 0)),
+        }
+    
+    def process_memory_mb(self, driver):
+        """浏览器进程树的常驻内存（MB）；没有 psutil 或无法确定进程时返回 None"""
+        if self.process_id is None:
+            return None
+        try:
+            import psutil
+        except ImportError:
+            if self.limits['process_mb'] and not self.psutil_warned:
+                self.psutil_warned = True
+                print(f"⚠️ 未安装 psutil，浏览器进程内存上限（{self.limits['process_mb']}MB）不生效，请安装: pip install psutil")
+            return None
+        try:
+            pid = self.process_id(driver)
+            if not pid:
+                return None
+            root = psutil.Process(pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            return total / 1048576
+        except Exception:
+            return None
+    
+    def check(self, driver):
+        """记录会话完成一个页面并判断是否需要回收
+        
+        Returns:
+            (动作, 原因)：动作为 'restart'（重启实例）、'tab'（换新标签页）或 None
+        """
+        counts = self.pages.setdefault(id(driver), {'session': 0, 'tab': 0})
+        counts['session'] += 1
+        counts['tab'] += 1
+        self.stats['pages'] += 1
+        limits = self.limits
+        
+        if 'restart' not in counts:
+            counts['restart'] = self.restartable is None or bool(self.restartable(driver))
+            if not counts['restart'] and (limits['process_mb'] or limits['restart_pages']):
+                print("ℹ️ 会话连接的是已运行的浏览器，进程内存和重启页面数上限不生效（重启只会断开连接），只按标签页回收")
+        
+        if counts['restart']:
+            process_mb = self.process_memory_mb(driver)
+            if process_mb is not None:
+                self.stats['peak_process_mb'] = max(self.stats['peak_process_mb'], process_mb)
+                if limits['process_mb'] and process_mb > limits['process_mb']:
+                    return 'restart', f"浏览器进程内存 {process_mb:.0f}MB 超过 {limits['process_mb']}MB"
+            if limits['restart_pages'] and counts['session'] >= limits['restart_pages']:
+                return 'restart', f"会话已处理 {counts['session']} 个页面"
+        
+        metrics = self.tab_metrics(driver)
+        if metrics is not None:
+            self.stats['peak_heap_mb'] = max(self.stats['peak_heap_mb'], metrics['heap_mb'])
+            if limits['tab_heap_mb'] and metrics['heap_mb'] > limits['tab_heap_mb']:
+                return 'tab', f"标签页JS堆 {metrics['heap_mb']:.0f}MB 超过 {limits['tab_heap_mb']}MB"
+        if limits['tab_pages'] and counts['tab'] >= limits['tab_pages']:
+            return 'tab', f"标签页已处理 {counts['tab']} 个页面"
+        return None, ''
+    
+    def tab_recycled(self, driver):
+        self.pages.setdefault(id(driver), {'session': 0, 'tab': 0})['tab'] = 0
+        self.stats['tab_recycles'] += 1
+    
+    def restarted(self, driver):
+        self.pages.pop(id(driver), None)
+        self.stats['restarts'] += 1
+    
+    def forget(self, driver):
+        """会话关闭后清除计数"""
+        self.pages.pop(id(driver), None)
+    
+    def summary(self):
+        stats = self.stats
+        text = (f"{stats['pages']} 个页面，换标签页 {stats['tab_recycles']} 次，重启 {stats['restarts']} 次，"
+                f"标签页JS堆峰值 {stats['peak_heap_mb']:.0f}MB")
+        if stats['peak_process_mb']:
+            text += f"，进程内存峰值 {stats['peak_process_mb']:.0f}MB"
+        return text
+
+
+class BrowserSessionPool:
+    """浏览器会话池 - 保持N个已连接的WebDriver会话，按任务借出与归还
+    
+    借出前进行健康检查，失效的会话会被关闭并重新创建。
+    keep_alive=True 时任务结束后不关闭浏览器，下一个任务直接在原标签页导航。
+    设置 monitor（BrowserMemoryMonitor）时，归还后按页面数和内存回收标签页或重启会话。
+    """
+    
+    def __init__(self, driver_factory, size=1, keep_alive=True, on_discard=None, separate_tabs=True,
+                 monitor=None, on_restart=None):
+        """
+        Args:
+            driver_factory: 创建新WebDriver会话的函数
+            size: 最大会话数
+            keep_alive: 归还后是否保留会话
+            on_discard: 会话关闭后的回调 on_discard(driver)
+            separate_tabs: 多个会话连接同一浏览器时各自新开标签页（每个会话独占一个浏览器实例时无需）
+            monitor: 浏览器内存监控（BrowserMemoryMonitor），为 None 时不回收
+            on_restart: 因内存或页面数重启会话时、关闭会话之后的回调 on_restart(driver)，
+                用于重启会话连接的浏览器进程（会话自己启动的浏览器随 quit 一起退出，无需回调）
+        """
+        self.driver_factory = driver_factory
+        self.on_discard = on_discard
+        self.on_restart = on_restart
+        self.monitor = monitor
+        self.separate_tabs = separate_tabs
+        self.size = max(1, size)
+        self.keep_alive = keep_alive
+        self.idle_drivers = queue.Queue()
+        self.created_count = 0
+        self.own_tabs = {}  # id(driver) -> 会话池为该会话打开的标签页
+        self.lock = threading.Lock()
+        self.stats = {'created': 0, 'reused': 0, 'recycled': 0, 'closed': 0}
+    
+    def warm_up(self):
+        """预先创建全部会话"""
+        print(f"🔥 预热浏览器会话池: {self.size} 个会话")
+        while self.reserve_slot():
+            self.idle_drivers.put(self.open_session())
+    
+    def reserve_slot(self):
+        """占用一个会话名额，名额已满时返回 False"""
+        with self.lock:
+            if self.created_count >= self.size:
+                return False
+            self.created_count += 1
+            return True
+    
+    def open_session(self):
+        """创建新会话（调用前需已占用名额）"""
+        try:
+            driver = self.driver_factory()
+            # 多个会话连接同一个调试实例时，各自使用独立标签页，避免抢占同一标签页
+            if self.size > 1 and self.separate_tabs:
+                driver.switch_to.new_window('tab')
+                self.own_tabs[id(driver)] = driver.current_window_handle
+        except Exception:
+            with self.lock:
+                self.created_count -= 1
+            raise
+        self.stats['created'] += 1
+        return driver
+    
+    def acquire(self, timeout=None):
+        """借出一个健康的会话；全部会话都被占用时等待归还
+        
+        Raises:
+            queue.Empty: 超过 timeout 秒仍无可用会话
+        """
+        while True:
+            try:
+                driver = self.idle_drivers.get_nowait()
+            except queue.Empty:
+                if self.reserve_slot():
+                    return self.open_session()
+                driver = self.idle_drivers.get(timeout=timeout)
+            
+            if self.is_healthy(driver):
+                self.stats['reused'] += 1
+                print("♻️ 复用会话池中的浏览器会话")
+                return driver
+            
+            print("⚠️ 浏览器会话已失效，关闭并重新创建")
+            self.stats['recycled'] += 1
+            self.discard(driver)
+    
+    def release(self, driver):
+        """归还会话：keep_alive 模式下保留健康会话，否则关闭；超过内存或页面数上限时先回收"""
+        if not (self.keep_alive and self.is_healthy(driver)):
+            self.discard(driver)
+            return
+        action, reason = self.monitor.check(driver) if self.monitor else (None, '')
+        if action == 'tab':
+            print(f"♻️ {reason}，换用新标签页")
+            try:
+                self.recycle_tab(driver)
+                self.monitor.tab_recycled(driver)
+            except Exception as e:
+                print(f"⚠️ 换用新标签页失败，重启会话: {str(e)[:60]}")
+                action = 'restart'
+        if action == 'restart':
+            print(f"🔄 {reason}，重启浏览器会话")
+            self.monitor.restarted(driver)
+            self.discard(driver, restart=True)
+            return
+        self.idle_drivers.put(driver)
+    
+    def recycle_tab(self, driver):
+        """打开新标签页并关闭当前标签页，释放旧页面的渲染进程和JS堆"""
+        old_tab = driver.current_window_handle
+        driver.switch_to.new_window('tab')
+        new_tab = driver.current_window_handle
+        driver.switch_to.window(old_tab)
+        driver.close()
+        driver.switch_to.window(new_tab)
+        if self.own_tabs.get(id(driver)) == old_tab:
+            self.own_tabs[id(driver)] = new_tab
+    
+    def discard(self, driver, restart=False):
+        """关闭会话并释放名额（restart=True 时随后调用 on_restart 重启会话连接的浏览器）"""
+        try:
+            own_tab = self.own_tabs.pop(id(driver), None)
+            if own_tab and driver.current_window_handle == own_tab:
+                driver.close()
+            driver.quit()
+        except Exception:
+            pass
+        if restart and self.on_restart:
+            try:
+                self.on_restart(driver)
+            except Exception as e:
+                print(f"⚠️ 重启浏览器失败: {str(e)[:80]}")
+        if self.monitor:
+            self.monitor.forget(driver)
+        if self.on_discard:
+            self.on_discard(driver)
+        with self.lock:
+            self.created_count -= 1
+        self.stats['closed'] += 1
+    
+    def is_healthy(self, driver):
+        """健康检查：会话仍能执行脚本且页面可访问"""
+        try:
+            return driver.execute_script("return document.readyState") is not None
+        except Exception:
+            return False
+    
+    def close_all(self):
+        """关闭全部空闲会话"""
+        while True:
+            try:
+                driver = self.idle_drivers.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+        print(f"🔚 会话池已关闭: {self.stats}")
+        if self.monitor:
+            print(f"🧠 浏览器内存: {self.monitor.summary()}")
+
+
+class ChromiumBrowser:
+    """Chromium内核浏览器后端 - 描述 Edge / Chrome / Chromium 的可执行文件、用户数据目录和Selenium驱动
+    
+    各平台的默认路径见 BROWSERS；可执行文件和用户数据目录均可单独指定。
+    Linux服务器上没有图形界面时自动使用无头模式，以root运行（如容器内）时关闭沙箱。
+    """
+    
+    # 各浏览器在各平台的候选可执行文件（绝对路径或 PATH 中的命令名）与默认用户数据目录
+    BROWSERS = {
+        'edge': {
+            'name': 'Edge',
+            'executables': {
+                'win32': [r'%ProgramFiles(x86)%\Microsoft\Edge\Application\msedge.exe',
+                          r'%ProgramFiles%\Microsoft\Edge\Application\msedge.exe'],
+                'darwin': ['/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge'],
+                'linux': ['microsoft-edge-stable', 'microsoft-edge', 'msedge'],
+            },
+            'user_data_dirs': {
+                'win32': r'%USERPROFILE%\AppData\Local\Microsoft\Edge\User Data',
+                'darwin': '~/Library/Application Support/Microsoft Edge',
+                'linux': '~/.config/microsoft-edge',
+            },
+        },
+        'chrome': {
+            'name': 'Chrome',
+            'executables': {
+                'win32': [r'%ProgramFiles%\Google\Chrome\Application\chrome.exe',
+                          r'%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe',
+                          r'%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe'],
+                'darwin': ['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'],
+                'linux': ['google-chrome-stable', 'google-chrome', 'chrome'],
+            },
+            'user_data_dirs': {
+                'win32': r'%USERPROFILE%\AppData\Local\Google\Chrome\User Data',
+                'darwin': '~/Library/Application Support/Google/Chrome',
+                'linux': '~/.config/google-chrome',
+            },
+        },
+        'chromium': {
+            'name': 'Chromium',
+            'executables': {
+                'win32': [r'%LOCALAPPDATA%\Chromium\Application\chrome.exe'],
+                'darwin': ['/Applications/Chromium.app/Contents/MacOS/Chromium'],
+                'linux': ['chromium', 'chromium-browser', '/usr/lib/chromium/chromium',
+                          '/snap/bin/chromium', 'headless_shell'],
+            },
+            'user_data_dirs': {
+                'win32': r'%USERPROFILE%\AppData\Local\Chromium\User Data',
+                'darwin': '~/Library/Application Support/Chromium',
+                'linux': '~/.config/chromium',
+            },
+        },
+    }
+    
+    def __init__(self, kind='edge', binary=None, user_data_dir=None, driver_path=None):
+        """
+        Args:
+            kind: 浏览器类型 'edge' / 'chrome' / 'chromium'
+            binary: 浏览器可执行文件（默认按平台自动查找）
+            user_data_dir: 已登录的用户数据目录（默认为该浏览器在当前平台的默认目录）
+            driver_path: msedgedriver / chromedriver 路径（默认由 Selenium 自动查找）
+        """
+        if kind not in self.BROWSERS:
+            raise ValueError(f"不支持的浏览器类型: {kind}（可选: {', '.join(self.BROWSERS)}）")
+        self.kind = kind
+        self.binary = binary
+        self.user_data_dir = user_data_dir or self.default_user_data_dir(kind)
+        self.driver_path = driver_path
+    
+    @property
+    def name(self):
+        return self.BROWSERS[self.kind]['name']
+    
+    @staticmethod
+    def platform_key():
+        if sys.platform.startswith('win'):
+            return 'win32'
+        if sys.platform == 'darwin':
+            return 'darwin'
+        return 'linux'
+    
+    @classmethod
+    def default_user_data_dir(cls, kind='edge'):
+        path = cls.BROWSERS[kind]['user_data_dirs'][cls.platform_key()]
+        return os.path.expanduser(os.path.expandvars(path))
+    
+    def find_executable(self):
+        """返回浏览器可执行文件路径：优先使用指定的 binary，否则按平台候选列表查找"""
+        if self.binary:
+            return self.binary
+        for candidate in self.BROWSERS[self.kind]['executables'][self.platform_key()]:
+            path = os.path.expandvars(candidate)
+            if os.path.isabs(path):
+                if os.path.exists(path):
+                    return path
+            elif shutil.which(path):
+                return shutil.which(path)
+        return None
+    
+    def has_display(self):
+        """是否可以显示浏览器窗口（Linux服务器上没有 DISPLAY / WAYLAND_DISPLAY 时只能无头运行）"""
+        if self.platform_key() != 'linux':
+            return True
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    
+    def platform_args(self):
+        """当前平台需要的额外启动参数"""
+        args = []
+        if self.platform_key() == 'linux':
+            # 容器内 /dev/shm 通常只有64MB；root用户下Chromium拒绝在沙箱中启动
+            args.append('--disable-dev-shm-usage')
+            if hasattr(os, 'geteuid') and os.geteuid() == 0:
+                args.append('--no-sandbox')
+        return args
+    
+    def new_options(self):
+        """创建对应浏览器的 Selenium Options（指定了可执行文件时写入 binary_location）"""
+        if self.kind == 'edge':
+            from selenium.webdriver.edge.options import Options
+        else:
+            from selenium.webdriver.chrome.options import Options
+        options = Options()
+        if self.binary:
+            options.binary_location = self.binary
+        for arg in self.platform_args():
+            options.add_argument(arg)
+        return options
+    
+    def start_driver(self, options):
+        """用 Options 启动（或连接）浏览器，返回 WebDriver"""
+        from selenium import webdriver
+        if self.kind == 'edge':
+            from selenium.webdriver.edge.service import Service
+            driver_class = webdriver.Edge
+        else:
+            from selenium.webdriver.chrome.service import Service
+            driver_class = webdriver.Chrome
+        if self.driver_path:
+            return driver_class(options=options, service=Service(executable_path=self.driver_path))
+        return driver_class(options=options)
+    
+    def debug_command(self, port=9222):
+        """手动启动调试模式的命令行"""
+        executable = self.find_executable() or self.BROWSERS[self.kind]['executables'][self.platform_key()][0]
+        return f'"{executable}" --remote-debugging-port={port} --user-data-dir="{self.user_data_dir}"'
+
+
+class BrowserFleet:
+    """浏览器集群 - 将登录配置的Cookie复制到多个独立的用户数据目录，并在不同调试端口启动无头实例
+    
+    各实例互不共享配置文件锁，可在多核上并行运行；只结束自己启动的进程，不影响用户正在使用的浏览器。
+    """
+    
+    # 复制到配置副本中的登录状态文件（相对配置目录；新版Edge的Cookie位于 Network 子目录）
+    PROFILE_FILES = ['Network/Cookies', 'Network/Cookies-journal', 'Cookies', 'Cookies-journal', 'Preferences']
+    PROFILE_DIRS = ['Local Storage']
+    # 用户数据目录根部的文件（Local State 中保存Cookie加密密钥）
+    ROOT_FILES = ['Local State']
+    
+    def __init__(self, source_user_data_dir, base_dir, size=2, base_port=9300,
+                 profile='Default', browser=None, headless=True):
+        """
+        Args:
+            source_user_data_dir: 已登录的浏览器用户数据目录
+            base_dir: 存放配置副本的目录
+            size: 实例数
+            base_port: 第一个实例的调试端口
+            profile: 要复制的配置名
+            browser: ChromiumBrowser 后端（默认Edge，可执行文件按平台自动查找）
+            headless: 是否以无头模式启动
+        """
+        self.source_user_data_dir = Path(source_user_data_dir)
+        self.base_dir = Path(base_dir)
+        self.size = max(1, size)
+        self.ports = [base_port + i for i in range(self.size)]
+        self.profile = profile
+        self.browser = browser or ChromiumBrowser('edge')
+        self.browser_path = None
+        self.headless = headless
+        self.processes = {}  # 端口 -> 启动的浏览器进程
+        self.attached = {}   # id(driver) -> 端口
+        self.lock = threading.Lock()
+    
+    def clone_profile(self, index):
+        """将登录配置中的Cookie等登录状态复制到第 index 个实例的用户数据目录（每次启动时刷新）"""
+        target_root = self.base_dir / f'worker_{index}'
+        source_profile = self.source_user_data_dir / self.profile
+        target_profile = target_root / self.profile
+        target_profile.mkdir(parents=True, exist_ok=True)
+        
+        copied = 0
+        jobs = [(self.source_user_data_dir / name, target_root / name) for name in self.ROOT_FILES]
+        jobs += [(source_profile / name, target_profile / name) for name in self.PROFILE_FILES]
+        for source, target in jobs:
+            if not source.exists():
+                continue
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source, target)
+                copied += 1
+            except OSError as e:
+                # 源浏览器运行时Cookie数据库可能被独占锁定
+                print(f"⚠️ 复制 {source.name} 失败: {e}")
+        for name in self.PROFILE_DIRS:
+            source = source_profile / name
+            if source.is_dir():
+                shutil.copytree(source, target_profile / name, dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns('LOCK'))
+                copied += 1
+        return target_root, copied
+    
+    def launch(self, index, user_data_dir):
+        """在 ports[index] 上启动一个浏览器实例"""
+        port = self.ports[index]
+        args = [
+            self.browser_path,
+            f'--remote-debugging-port={port}',
+            f'--user-data-dir={user_data_dir}',
+            f'--profile-directory={self.profile}',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--window-size=1920,1080',
+            '--mute-audio',
+            '--disable-background-networking',
+            '--autoplay-policy=user-gesture-required',
+            '--disable-blink-features=AutomationControlled',
+        ] + self.browser.platform_args()
+        if self.headless:
+            args += ['--headless=new', '--disable-gpu']
+        args.append('about:blank')
+        self.processes[port] = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    @staticmethod
+    def wait_for_port(port, timeout=20):
+        """等待调试端口开始监听"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                if sock.connect_ex(('127.0.0.1', port)) == 0:
+                    return True
+            time.sleep(0.2)
+        return False
+    
+    def start(self):
+        """复制配置并启动全部实例；任一实例的调试端口未能开启时关闭已启动的实例并报错"""
+        self.browser_path = self.browser.find_executable()
+        if not self.browser_path:
+            raise Exception(f"未找到{self.browser.name}浏览器可执行文件，请指定 --browser-binary")
+        
+        print(f"🚀 启动浏览器集群: {self.size} 个实例，调试端口 {self.ports[0]}-{self.ports[-1]}")
+        for index, port in enumerate(self.ports):
+            if self.wait_for_port(port, timeout=0):
+                self.stop()
+                raise Exception(f"调试端口 {port} 已被占用，请更换起始端口")
+            user_data_dir, copied = self.clone_profile(index)
+            print(f"📋 实例 {index + 1}: 已复制 {copied} 项登录状态到 {user_data_dir}")
+            self.launch(index, user_data_dir)
+        
+        for port in self.ports:
+            if not self.wait_for_port(port):
+                self.stop()
+                raise Exception(f"浏览器实例启动失败: 调试端口 {port} 未开启")
+        print("✅ 浏览器集群已就绪")
+    
+    def attach(self, driver_factory):
+        """在当前连接数最少的实例上创建会话（driver_factory(port) 返回连接到该端口的驱动）"""
+        placeholder = object()  # 创建期间占位，避免并发创建的会话选中同一实例
+        with self.lock:
+            load = {port: 0 for port in self.ports}
+            for port in self.attached.values():
+                load[port] += 1
+            port = min(self.ports, key=lambda item: load[item])
+            self.attached[id(placeholder)] = port
+        try:
+            driver = driver_factory(port)
+        finally:
+            with self.lock:
+                self.attached.pop(id(placeholder), None)
+        with self.lock:
+            self.attached[id(driver)] = port
+        return driver
+    
+    def detach(self, driver):
+        """会话关闭后释放实例上的连接计数"""
+        with self.lock:
+            self.attached.pop(id(driver), None)
+    
+    def process_id(self, driver):
+        """会话所连接实例的浏览器进程号"""
+        process = self.processes.get(self.attached.get(id(driver)))
+        return process.pid if process else None
+    
+    def restart(self, driver):
+        """重启会话所连接的实例（刷新登录状态副本）；实例上还有其他会话时不重启
+        
+        Returns:
+            是否已重启
+        """
+        with self.lock:
+            port = self.attached.get(id(driver))
+            if port is None or sum(1 for value in self.attached.values() if value == port) > 1:
+                return False
+        self.stop_process(port)
+        user_data_dir, _ = self.clone_profile(self.ports.index(port))
+        self.launch(self.ports.index(port), user_data_dir)
+        if not self.wait_for_port(port):
+            raise Exception(f"实例（端口 {port}）重启后调试端口未开启")
+        print(f"🔄 已重启浏览器实例（端口 {port}）")
+        return True
+    
+    def stop_process(self, port):
+        """结束指定端口上集群启动的浏览器进程"""
+        process = self.processes.pop(port, None)
+        if process is None:
+            return
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except OSError:
+            pass
+    
+    def stop(self):
+        """关闭集群启动的浏览器进程"""
+        for port in list(self.processes):
+            self.stop_process(port)
+        self.attached.clear()
+        print("🔚 浏览器集群已关闭")
+
+
 def main():
     """主函数 - 命令行接口"""
     parser = argparse.ArgumentParser(description='B站视频字幕提取工具 v2.0 - 增强版')
-    parser.add_argument('url', nargs='?', help='B站视频URL')
+    parser.add_argument('url', nargs='*', help='B站视频URL（可提供多个进行批量提取）')
     parser.add_argument('-o', '--output', default='./subtitles', help='输出目录 (默认: ./subtitles)')
     parser.add_argument('-p', '--page', type=int, default=1, help='多P视频的页面号 (默认: 1)')
     parser.add_argument('--ai', action='store_true', help='使用AI小助手字幕')
     parser.add_argument('--speech', action='store_true', help='使用语音识别提取字幕')
+    parser.add_argument('--cc', action='store_true', help='下载视频现有的字幕（通过接口，无需浏览器）')
+    parser.add_argument('--format', default='srt', choices=['srt', 'txt', 'json'], help='现有字幕的保存格式 (默认: srt)')
+    parser.add_argument('--cc-login', action='store_true',
+                        help='现有字幕模式下从已运行的调试模式浏览器导出登录Cookie（部分字幕只对登录用户可见）')
+    parser.add_argument('--connections', type=int, default=32,
+                        help='现有字幕模式下多个URL并发请求的连接数上限，需要 httpx 或 aiohttp (默认: 32, 1 为逐个请求)')
+    parser.add_argument('--api-base', default='https://api.bilibili.com',
+                        help='B站接口地址，可指向本地模拟服务器 (默认: https://api.bilibili.com)')
+    parser.add_argument('--network', action='store_true', help='AI模式下通过DevTools网络抓包获取字幕（更快，时间轴更精确）')
+    parser.add_argument('--pool', type=int, default=0, help='AI模式下复用的浏览器会话数 (默认: 0, 不复用)')
+    parser.add_argument('--backend', default='selenium', choices=['selenium', 'devtools'],
+                       help='AI模式的浏览器驱动后端 (默认: selenium; devtools 需要 pip install websockets，'
+                            '只连接已运行的调试实例，无头模式需配合 --fleet)')
+    parser.add_argument('--headless', action='store_true',
+                       help='AI模式下启动无头Edge并屏蔽媒体/图片/字体/统计请求（需关闭占用该用户配置的Edge）')
+    parser.add_argument('--block', action='store_true', help='AI模式下屏蔽媒体/图片/字体/统计请求（可用于已连接的调试实例）')
+    parser.add_argument('--tabs', type=int, default=0, help='AI模式下同时打开的标签页数，多个URL时并发提取 (默认: 0, 逐个提取)')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='AI模式下多个URL时在后台标签页预加载下一个视频，与当前视频的采集重叠')
+    parser.add_argument('--fleet', type=int, default=0,
+                       help='AI模式下启动的无头浏览器实例数，各实例使用登录配置的副本，多个URL时并行提取 (默认: 0, 不启动)')
+    parser.add_argument('--no-api', action='store_true',
+                       help='AI模式下不使用浏览器导出的登录Cookie直接请求接口，始终通过浏览器页面提取')
+    parser.add_argument('--no-precheck', action='store_true',
+                       help='AI模式下不预检AI字幕是否存在，也不跳过负缓存中已知没有AI字幕的视频')
+    parser.add_argument('--summary', action='store_true',
+                        help='AI模式下同时保存AI视频总结（与字幕在同一次页面访问中取得，保存为Markdown）')
+    parser.add_argument('--fleet-port', type=int, default=9300, help='浏览器集群的起始调试端口 (默认: 9300)')
+    parser.add_argument('--tab-pages', type=int, default=50,
+                        help='会话池中同一标签页处理多少个视频后换新标签页 (默认: 50, 0 不限)')
+    parser.add_argument('--tab-mb', type=int, default=512, help='标签页JS堆超过该值(MB)时换新标签页 (默认: 512, 0 不限)')
+    parser.add_argument('--restart-pages', type=int, default=500,
+                        help='会话池中同一浏览器会话处理多少个视频后重启，连接已运行的调试实例时不生效 (默认: 500, 0 不限)')
+    parser.add_argument('--browser-mb', type=int, default=4096,
+                        help='浏览器进程内存超过该值(MB)时重启，需要 psutil，连接已运行的调试实例时不生效 (默认: 4096, 0 不限)')
+    parser.add_argument('--browser', default='edge', choices=list(ChromiumBrowser.BROWSERS),
+                       help='AI模式使用的浏览器 (默认: edge; Linux服务器可用 chromium / chrome)')
+    parser.add_argument('--browser-binary', help='浏览器可执行文件路径 (默认按平台自动查找)')
+    parser.add_argument('--profile-dir', help='已登录B站的浏览器用户数据目录 (默认为该浏览器在当前平台的默认目录)')
+    parser.add_argument('--driver-path', help='msedgedriver / chromedriver 路径 (默认由 Selenium 自动查找)')
     parser.add_argument('--model', default='base', choices=['tiny', 'base', 'small', 'medium', 'large'], 
                        help='Whisper模型大小 (默认: base)')
+    parser.add_argument('--diagnostics', default='background', choices=['background', 'offline', 'off'],
+                       help='AI模式失败时的诊断快照: background 后台分析, offline 只保存, off 关闭 (默认: background)')
+    parser.add_argument('--analyze-diagnostics', metavar='PATH', help='离线分析诊断快照文件或目录')
+    parser.add_argument('--profile', nargs='?', const='', metavar='JSON',
+                       help='AI模式下记录各步骤的耗时、命令数和元素数，结束时打印汇总（可同时写入JSON文件）')
     parser.add_argument('--check-deps', action='store_true', help='检查依赖工具')
     parser.add_argument('--fix-numpy', action='store_true', help='修复NumPy兼容性问题')
     parser.add_argument('--start-edge', action='store_true', help='启动Edge调试模式')
     
     args = parser.parse_args()
+    if args.backend == 'devtools' and args.headless and args.fleet <= 0:
+        parser.error("--backend devtools 只连接已运行的调试模式浏览器，不能与 --headless 同时使用；"
+                     "需要无头浏览器时请加上 --fleet N（由集群启动无头实例）或改用 selenium 后端")
+    if args.network and args.tabs > 1 and len(args.url or []) > 1:
+        parser.error("--tabs 多标签页模式不支持 --network 网络抓包，请去掉其中一个参数")
     
     # 创建提取器实例
     extractor = BilibiliSubtitleExtractor(args.output)
+    extractor.browser_backend = args.backend
+    extractor.browser = ChromiumBrowser(args.browser, binary=args.browser_binary,
+                                        user_data_dir=args.profile_dir, driver_path=args.driver_path)
+    extractor.headless = args.headless
+    extractor.block_resources = args.headless or args.block
+    extractor.use_http_api = not args.no_api
+    extractor.ai_precheck = not args.no_precheck
+    extractor.include_summary = args.summary
+    extractor.api_base = args.api_base.rstrip('/')
+    extractor.cc_login = args.cc_login
+    extractor.browser_recycle = {'tab_pages': args.tab_pages, 'tab_heap_mb': args.tab_mb,
+                                 'restart_pages': args.restart_pages, 'process_mb': args.browser_mb}
+    extractor.diagnostics_mode = args.diagnostics
+    if args.profile is not None:
+        extractor.profiler = StepProfiler()
     extractor.print_banner()
     
     # 修复NumPy兼容性
@@ -2557,8 +6039,13 @@ def main():
         if os.path.exists(batch_file):
             subprocess.run([batch_file], shell=True)
         else:
-            print("警告: 找不到启动脚本，手动运行 Edge 并加上参数:")
-            print("msedge.exe --remote-debugging-port=9222 --user-data-dir=\"%USERPROFILE%\\AppData\\Local\\Microsoft\\Edge\\User Data\"")
+            print(f"警告: 找不到启动脚本，手动运行 {extractor.browser.name} 并加上参数:")
+            print(extractor.browser.debug_command())
+        return
+    
+    # 离线分析诊断快照
+    if args.analyze_diagnostics:
+        extractor.analyze_diagnostics(args.analyze_diagnostics)
         return
     
     # 检查依赖
@@ -2583,23 +6070,94 @@ def main():
     try:
         if args.speech:
             print("使用语音识别模式...")
-            result = extractor.extract_subtitle_with_speech_recognition(args.url, args.model)
-            if result:
-                print(f"\n✓ 字幕提取成功!")
-                print(f"保存位置: {result}")
+            failed = []
+            for url in args.url:
+                result = extractor.extract_subtitle_with_speech_recognition(url, args.model)
+                if result:
+                    print(f"\n✓ 字幕提取成功!")
+                    print(f"保存位置: {result}")
+                else:
+                    print("\n✗ 字幕提取失败")
+                    failed.append(url)
+            if failed:
+                sys.exit(1)
+        elif args.cc:
+            print("使用现有字幕模式...")
+            if args.connections > 1 and len(args.url) > 1:
+                from async_api_client import require_async_http
+                try:
+                    require_async_http()
+                except ImportError as e:
+                    print(f"⚠️ {e}；本次改为逐个请求")
+                    args.connections = 1
+            if args.connections > 1 and len(args.url) > 1:
+                outcome = extractor.extract_existing_subtitles_from_urls(args.url, args.format, args.connections,
+                                                                         page_num=args.page)
+                failed = [url for url, success in outcome.items() if not success]
             else:
-                print("\n✗ 字幕提取失败")
+                failed = [url for url in args.url
+                          if not extractor.extract_subtitle_from_url(url, args.page, use_ai=False,
+                                                                     output_format=args.format)]
+            print(f"保存目录: {extractor.output_dir}")
+            if failed:
+                for url in failed:
+                    print(f"\n✗ 现有字幕提取失败: {url}")
                 sys.exit(1)
         else:
             # 默认使用AI模式（v2版本主要特性）
             print("使用AI小助手模式...")
-            success = extractor.extract_subtitle_from_url(args.url, args.page, use_ai=True)
-            if success:
-                print(f"\n✓ 字幕提取成功!")
-                print(f"保存目录: {extractor.output_dir}")
-            else:
-                print("\n✗ AI字幕提取失败，尝试使用语音识别模式:")
-                print(f"python bilibili_subtitle_extractor_v2.py --speech '{args.url}'")
+            if args.fleet > 0:
+                extractor.enable_browser_fleet(size=args.fleet, base_port=args.fleet_port, capture_network=args.network)
+            elif args.pool > 0:
+                extractor.enable_browser_pool(size=args.pool, capture_network=args.network)
+            failed = []
+            try:
+                if args.tabs > 1 and len(args.url) > 1:
+                    # 多标签页并发提取
+                    outcome = extractor.extract_ai_subtitles_from_urls_multi_tab(args.url, tabs=args.tabs)
+                    failed = [url for url, success in outcome.items() if not success]
+                    for url in failed:
+                        print(f"\n✗ AI字幕提取失败: {url}")
+                    print(f"保存目录: {extractor.output_dir}")
+                elif args.pipeline and len(args.url) > 1:
+                    # 流水线提取：后台预加载下一个视频
+                    outcome = extractor.extract_ai_subtitles_from_urls_pipelined(args.url, capture_network=args.network)
+                    failed = [url for url, success in outcome.items() if not success]
+                    for url in failed:
+                        print(f"\n✗ AI字幕提取失败: {url}")
+                    print(f"保存目录: {extractor.output_dir}")
+                elif args.fleet > 1 and len(args.url) > 1:
+                    # 浏览器集群并行提取
+                    outcome = extractor.extract_ai_subtitles_from_urls_parallel(
+                        args.url, workers=args.fleet, page_num=args.page, capture_network=args.network
+                    )
+                    failed = [url for url, success in outcome.items() if not success]
+                    for url in failed:
+                        print(f"\n✗ AI字幕提取失败: {url}")
+                    print(f"保存目录: {extractor.output_dir}")
+                else:
+                    for url in args.url:
+                        success = extractor.extract_subtitle_from_url(url, args.page, use_ai=True,
+                                                                      capture_network=args.network)
+                        if success:
+                            print(f"\n✓ 字幕提取成功!")
+                            print(f"保存目录: {extractor.output_dir}")
+                        else:
+                            print("\n✗ AI字幕提取失败，尝试使用语音识别模式:")
+                            print(f"python bilibili_subtitle_extractor_v2.py --speech '{url}'")
+                            failed.append(url)
+            finally:
+                extractor.close_browser_pool()
+                if extractor.profiler and extractor.profiler.runs:
+                    print("\n⏱️ 分步计时汇总:")
+                    print(extractor.profiler.summary())
+                    if args.profile:
+                        extractor.profiler.save(args.profile)
+                        print(f"📄 计时明细已保存到: {args.profile}")
+                if extractor.selector_cache.stats:
+                    print("\n💾 选择器缓存统计:")
+                    print(extractor.selector_cache.summary())
+            if failed:
                 sys.exit(1)
                 
     except KeyboardInterrupt:
@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站视频字幕提取工具 - DevTools协议直连后端
+作者: wjm
+版本: v2.0.0
+
+功能说明:
+- 通过WebSocket直接与浏览器调试端口（--remote-debugging-port）通信，不经过WebDriver HTTP中转
+- 一条浏览器级连接复用多个标签页会话，单线程 asyncio 并发驱动多个标签页
+- 提供执行脚本、页面导航、鼠标点击、网络事件捕获
+- DevToolsDriver 同步适配器提供AI流程使用的WebDriver接口子集，可直接替换Selenium驱动
+
+依赖:
+- websockets（可选）: pip install websockets
+
+版权声明:
+Copyright (c) 2024 wjm. All rights reserved.
+本软件由 wjm 开发，仅供个人学习和研究使用。
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+import urllib.request
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+# execute_script 包装函数：参数中的元素引用 {__element__: id} 还原为DOM节点，返回值中的DOM节点编码为元素引用
+# 元素保存在 window.__devtoolsElements 中，页面导航后引用失效（与WebDriver的过期元素一致）
+EXECUTE_SCRIPT_WRAPPER_JS = r"""
+function (script, args, isAsync, timeoutMs) {
+    var store = window.__devtoolsElements || (window.__devtoolsElements = {nodes: [], ids: new Map()});
+    function decode(value) {
+        if (Array.isArray(value)) { return value.map(decode); }
+        if (value && typeof value === 'object') {
+            if ('__element__' in value) { return store.nodes[value.__element__]; }
+            var out = {};
+            for (var key in value) { out[key] = decode(value[key]); }
+            return out;
+        }
+        return value;
+    }
+    function encode(value, depth) {
+        if (value === undefined || value === null || depth > 32) { return null; }
+        if (typeof Node !== 'undefined' && value instanceof Node) {
+            if (!store.ids.has(value)) { store.ids.set(value, store.nodes.length); store.nodes.push(value); }
+            return {__element__: store.ids.get(value)};
+        }
+        if (Array.isArray(value) || (typeof NodeList !== 'undefined' && value instanceof NodeList) ||
+            (typeof HTMLCollection !== 'undefined' && value instanceof HTMLCollection)) {
+            return Array.prototype.map.call(value, function (item) { return encode(item, depth + 1); });
+        }
+        if (typeof value === 'function') { return null; }
+        if (typeof value === 'object') {
+            var out = {};
+            for (var key in value) { out[key] = encode(value[key], depth + 1); }
+            return out;
+        }
+        return value;
+    }
+    var fn = new Function(script);
+    var decoded = decode(args);
+    if (!isAsync) { return encode(fn.apply(window, decoded), 0); }
+    return new Promise(function (resolve, reject) {
+        var timer = setTimeout(function () { reject(new Error('script timeout')); }, timeoutMs);
+        decoded.push(function (value) { clearTimeout(timer); resolve(encode(value, 0)); });
+        try { fn.apply(window, decoded); } catch (e) { clearTimeout(timer); reject(e); }
+    });
+}
+"""
+
+# 元素定位脚本（By.CSS_SELECTOR / XPATH / TAG_NAME / CLASS_NAME），arguments[2] 为查找范围（null 表示整个文档）
+FIND_ELEMENTS_JS = r"""
+var by = arguments[0], value = arguments[1], root = arguments[2] || document;
+if (by === 'xpath') {
+    var snap = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var out = [];
+    for (var i = 0; i < snap.snapshotLength; i++) { out.push(snap.snapshotItem(i)); }
+    return out;
+}
+if (by === 'tag name') { return root.getElementsByTagName(value); }
+if (by === 'class name') { return root.getElementsByClassName(value); }
+return root.querySelectorAll(value);
+"""
+
+# 元素中心点坐标（点击前滚动到视口中部），元素不存在或不可见时返回 null
+ELEMENT_CENTER_JS = r"""
+var el = arguments[0];
+if (typeof el === 'string') { el = document.querySelector(el); }
+if (!el) { return null; }
+el.scrollIntoView({block: 'center', inline: 'center'});
+var rect = el.getBoundingClientRect();
+if (!rect.width && !rect.height) { return null; }
+return {x: rect.left + rect.width / 2, y: rect.top + rect.height / 2};
+"""
+
+
+
+class By:
+    """元素定位方式，取值与 selenium.webdriver.common.by.By 一致（未安装 selenium 时代替使用）"""
+    CSS_SELECTOR = 'css selector'
+    XPATH = 'xpath'
+    TAG_NAME = 'tag name'
+    CLASS_NAME = 'class name'
+
+
+SUPPORTED_LOCATORS = (By.CSS_SELECTOR, By.XPATH, By.TAG_NAME, By.CLASS_NAME)
+
+
+class DevToolsError(Exception):
+    """DevTools协议命令失败或页面脚本抛出异常"""
+
+
+def require_websockets():
+    """检查可选依赖 websockets"""
+    if websockets is None:
+        raise ImportError("DevTools直连后端需要 websockets 库，请安装: pip install websockets")
+
+
+def discover_browser_ws_url(host='127.0.0.1', port=9222, timeout=5):
+    """从调试端口的 /json/version 读取浏览器级WebSocket地址"""
+    with urllib.request.urlopen(f'http://{host}:{port}/json/version', timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))['webSocketDebuggerUrl']
+
+
+def build_execute_expression(script, args, is_async=False, timeout_ms=30000):
+    """构造执行 execute_script 语义脚本的 Runtime.evaluate 表达式"""
+    return (f"({EXECUTE_SCRIPT_WRAPPER_JS.strip()})("
+            f"{json.dumps(script)}, {json.dumps(args)}, {'true' if is_async else 'false'}, {int(timeout_ms)})")
+
+
+class DevToolsConnection:
+    """浏览器级WebSocket连接：命令按 id 匹配响应，事件按 sessionId 分发给各标签页"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.ids = itertools.count(1)
+        self.pending = {}      # 命令id -> Future
+        self.listeners = []    # [sessionId, 事件名或 '*', 回调]
+        self.command_count = 0
+        self.closed = False
+        self.reader = asyncio.ensure_future(self.read_loop())
+
+    @classmethod
+    async def connect(cls, ws_url):
+        require_websockets()
+        # 页面源码、响应体等消息可能很大，不限制消息长度
+        websocket = await websockets.connect(ws_url, max_size=None)
+        return cls(websocket)
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        """发送命令并等待结果"""
+        if self.closed:
+            raise DevToolsError("DevTools连接已关闭")
+        message_id = next(self.ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = future
+        self.command_count += 1
+        try:
+            await self.websocket.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise DevToolsError(f"{method} 在 {timeout} 秒内未返回")
+        finally:
+            self.pending.pop(message_id, None)
+
+    async def read_loop(self):
+        try:
+            async for raw in self.websocket:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self.pending.get(message['id'])
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        error = message['error']
+                        future.set_exception(DevToolsError(f"{error.get('message')} ({error.get('code')})"))
+                    else:
+                        future.set_result(message.get('result') or {})
+                else:
+                    self.dispatch(message)
+        except Exception:
+            pass
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(DevToolsError("DevTools连接已断开"))
+
+    def dispatch(self, message):
+        session_id = message.get('sessionId')
+        method = message.get('method')
+        params = message.get('params') or {}
+        for listener in list(self.listeners):
+            if listener[0] == session_id and listener[1] in (method, '*'):
+                try:
+                    listener[2](method, params)
+                except Exception:
+                    pass
+
+    def add_listener(self, session_id, method, callback):
+        listener = [session_id, method, callback]
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    async def close(self):
+        self.closed = True
+        await self.websocket.close()
+        try:
+            await self.reader
+        except Exception:
+            pass
+
+
+class DevToolsTab:
+    """一个标签页会话（Target.attachToTarget flatten 模式）"""
+
+    def __init__(self, connection, target_id, session_id):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.page_enabled = False
+        # 网络事件缓冲（Network.enable 之后浏览器才会推送）
+        self.network_events = []
+        self.network_listener = connection.add_listener(session_id, '*', self.record_network_event)
+
+    def record_network_event(self, method, params):
+        if method.startswith('Network.'):
+            self.network_events.append({'method': method, 'params': params, 'timestamp': time.time()})
+
+    def drain_network_events(self):
+        """取出并清空已缓冲的网络事件"""
+        events, self.network_events = self.network_events, []
+        return events
+
+    async def send(self, method, params=None, timeout=30):
+        return await self.connection.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def evaluate(self, expression, await_promise=False, timeout=30):
+        """在页面中求值表达式，返回JSON可序列化的结果"""
+        result = await self.send('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': await_promise
+        }, timeout=timeout)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            description = (details.get('exception') or {}).get('description') or details.get('text')
+            raise DevToolsError(f"页面脚本出错: {description}")
+        return (result.get('result') or {}).get('value')
+
+    async def execute(self, script, args=(), is_async=False, timeout=30):
+        """按 execute_script / execute_async_script 语义执行函数体脚本，元素以引用字典传递"""
+        expression = build_execute_expression(script, list(args), is_async, timeout * 1000)
+        return await self.evaluate(expression, await_promise=is_async, timeout=timeout + 5)
+
+    async def enable_page_events(self):
+        if not self.page_enabled:
+            await self.send('Page.enable')
+            self.page_enabled = True
+
+    async def wait_for_event(self, method, timeout=30, predicate=None):
+        """等待本标签页的指定事件，返回事件参数"""
+        future = asyncio.get_running_loop().create_future()
+
+        def on_event(event_method, params):
+            if not future.done() and (predicate is None or predicate(params)):
+                future.set_result(params)
+
+        listener = self.connection.add_listener(self.session_id, method, on_event)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise DevToolsError(f"{timeout} 秒内未收到事件 {method}")
+        finally:
+            self.connection.remove_listener(listener)
+
+    async def navigate(self, url, wait_load=True, timeout=30):
+        """导航到指定地址；wait_load 为 True 时等待 load 事件"""
+        await self.enable_page_events()
+        loaded = asyncio.ensure_future(self.wait_for_event('Page.loadEventFired', timeout)) if wait_load else None
+        try:
+            result = await self.send('Page.navigate', {'url': url}, timeout=timeout)
+            if result.get('errorText'):
+                raise DevToolsError(f"页面导航失败: {result['errorText']}")
+            if loaded is not None:
+                await loaded
+        finally:
+            if loaded is not None and not loaded.done():
+                loaded.cancel()
+        return result
+
+    async def click_at(self, x, y, click_count=1):
+        """在视口坐标处派发真实的鼠标点击事件"""
+        await self.send('Input.dispatchMouseEvent', {'type': 'mouseMoved', 'x': x, 'y': y})
+        for event_type in ('mousePressed', 'mouseReleased'):
+            await self.send('Input.dispatchMouseEvent', {
+                'type': event_type, 'x': x, 'y': y, 'button': 'left', 'clickCount': click_count
+            })
+
+    async def click(self, target, click_count=1):
+        """点击CSS选择器或元素引用对应的元素中心
+
+        Returns:
+            元素是否存在且可点击
+        """
+        center = await self.execute(ELEMENT_CENTER_JS, [target])
+        if not center:
+            return False
+        await self.click_at(center['x'], center['y'], click_count)
+        return True
+
+    async def enable_network(self):
+        await self.send('Network.enable')
+
+    async def get_response_body(self, request_id):
+        """读取响应体文本（base64 编码的响应自动解码）"""
+        import base64
+
+        response = await self.send('Network.getResponseBody', {'requestId': request_id})
+        body = response.get('body', '')
+        if response.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8')
+        return body
+
+    def detach(self):
+        self.connection.remove_listener(self.network_listener)
+
+
+class DevToolsBrowser:
+    """浏览器级会话：创建、附着和关闭标签页，所有标签页共用一条连接"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.tabs = {}  # targetId -> DevToolsTab
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=9222, ws_url=None):
+        """连接浏览器调试端口（ws_url 为空时通过 /json/version 获取）"""
+        require_websockets()
+        if ws_url is None:
+            loop = asyncio.get_running_loop()
+            ws_url = await loop.run_in_executor(None, discover_browser_ws_url, host, port)
+        return cls(await DevToolsConnection.connect(ws_url))
+
+    async def list_pages(self):
+        """列出浏览器中的页面目标"""
+        result = await self.connection.send('Target.getTargets')
+        return [info for info in result.get('targetInfos', []) if info.get('type') == 'page']
+
+    async def attach_tab(self, target_id):
+        """附着到已存在的标签页"""
+        if target_id in self.tabs:
+            return self.tabs[target_id]
+        result = await self.connection.send('Target.attachToTarget', {'targetId': target_id, 'flatten': True})
+        tab = DevToolsTab(self.connection, target_id, result['sessionId'])
+        self.tabs[target_id] = tab
+        return tab
+
+    async def new_tab(self, url='about:blank'):
+        """新建标签页并附着"""
+        result = await self.connection.send('Target.createTarget', {'url': url})
+        return await self.attach_tab(result['targetId'])
+
+    async def close_tab(self, tab):
+        self.tabs.pop(tab.target_id, None)
+        tab.detach()
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': tab.target_id})
+        except DevToolsError:
+            pass
+
+    async def close(self):
+        """断开连接（不关闭浏览器本身及用户的标签页）"""
+        for tab in list(self.tabs.values()):
+            tab.detach()
+        self.tabs.clear()
+        await self.connection.close()
+
+
+class DevToolsElement:
+    """页面元素引用，提供AI流程用到的WebElement接口子集"""
+
+    def __init__(self, driver, tab, element_id):
+        self.parent = driver
+        self.tab = tab
+        self.id = element_id
+
+    def __eq__(self, other):
+        return isinstance(other, DevToolsElement) and other.tab is self.tab and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.tab), self.id))
+
+    def __repr__(self):
+        return f"<DevToolsElement {self.id} on {self.tab.target_id[:8]}>"
+
+    def run(self, script, *args):
+        return self.parent.execute_script_in_tab(self.tab, script, [self] + list(args))
+
+    @property
+    def text(self):
+        return self.run("return (arguments[0].innerText || '').trim();")
+
+    @property
+    def tag_name(self):
+        return self.run("return arguments[0].tagName.toLowerCase();")
+
+    @property
+    def location(self):
+        return self.run(
+            "var r = arguments[0].getBoundingClientRect();"
+            "return {x: Math.round(r.left + window.scrollX), y: Math.round(r.top + window.scrollY)};"
+        )
+
+    @property
+    def size(self):
+        return self.run(
+            "var r = arguments[0].getBoundingClientRect();"
+            "return {width: Math.round(r.width), height: Math.round(r.height)};"
+        )
+
+    def get_attribute(self, name):
+        # 与WebDriver一致：优先返回同名属性（property），其次返回HTML特性（attribute）
+        return self.run(
+            "var el = arguments[0], name = arguments[1];"
+            "var value = el[name];"
+            "if (value === undefined || value === null || typeof value === 'object' || typeof value === 'function') {"
+            "    value = el.getAttribute(name);"
+            "}"
+            "return value === null || value === undefined ? null : String(value);",
+            name
+        )
+
+    def is_displayed(self):
+        return bool(self.run(
+            "var el = arguments[0], style = window.getComputedStyle(el);"
+            "return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length) &&"
+            "    style.visibility !== 'hidden' && style.display !== 'none';"
+        ))
+
+    def is_enabled(self):
+        return not self.run("return !!arguments[0].disabled;")
+
+    def click(self):
+        if not self.parent.run(self.tab.click(self.encode())):
+            raise DevToolsError("元素不可点击")
+
+    def send_keys(self, *keys):
+        raise DevToolsError("DevTools后端不支持 send_keys")
+
+    def find_elements(self, by, value):
+        return self.parent.find_elements(by, value, root=self)
+
+    def find_element(self, by, value):
+        return self.parent.find_element(by, value, root=self)
+
+    def encode(self):
+        return {'__element__': self.id}
+
+
+class DevToolsSwitchTo:
+    """driver.switch_to 的对应实现（标签页以 targetId 作为窗口句柄）"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.tab = self.driver.run(self.driver.browser.attach_tab(handle))
+
+    def new_window(self, type_hint='tab'):
+        self.driver.tab = self.driver.run(self.driver.browser.new_tab())
+        self.driver.opened_targets.add(self.driver.tab.target_id)
+
+
+class DevToolsDriver:
+    """同步适配器：在后台线程运行事件循环，对外提供AI流程使用的WebDriver接口子集
+
+    支持 execute_script、execute_async_script、get、find_element(s)、窗口切换、
+    execute_cdp_cmd 和 get_log('performance')，元素以 DevToolsElement 表示。
+    """
+
+    def __init__(self, loop, thread, browser, tab):
+        self.loop = loop
+        self.thread = thread
+        self.browser = browser
+        self.tab = tab
+        self.switch_to = DevToolsSwitchTo(self)
+        self.script_timeout = 30
+        self.opened_targets = set()  # 由本驱动新建的标签页，quit 时关闭
+
+    @classmethod
+    def connect(cls, host='127.0.0.1', port=9222, ws_url=None):
+        """连接浏览器调试端口，附着到第一个已打开的页面（与 debuggerAddress 连接方式一致）"""
+        require_websockets()
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name='devtools-loop', daemon=True)
+        thread.start()
+
+        async def setup():
+            browser = await DevToolsBrowser.connect(host, port, ws_url)
+            pages = await browser.list_pages()
+            if pages:
+                return browser, await browser.attach_tab(pages[0]['targetId']), False
+            return browser, await browser.new_tab(), True
+
+        try:
+            browser, tab, created = asyncio.run_coroutine_threadsafe(setup(), loop).result(30)
+        except Exception:
+            loop.call_soon_threadsafe(loop.stop)
+            raise
+        driver = cls(loop, thread, browser, tab)
+        if created:
+            driver.opened_targets.add(tab.target_id)
+        return driver
+
+    def run(self, coroutine, timeout=None):
+        """在后台事件循环中执行协程并同步等待结果"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    @property
+    def command_count(self):
+        """已发送的DevTools命令数"""
+        return self.browser.connection.command_count
+
+    # ---- 脚本执行 ----
+
+    def encode_args(self, value):
+        if isinstance(value, DevToolsElement):
+            return value.encode()
+        if isinstance(value, (list, tuple)):
+            return [self.encode_args(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.encode_args(item) for key, item in value.items()}
+        return value
+
+    def decode_result(self, tab, value):
+        if isinstance(value, list):
+            return [self.decode_result(tab, item) for item in value]
+        if isinstance(value, dict):
+            if len(value) == 1 and '__element__' in value:
+                return DevToolsElement(self, tab, value['__element__'])
+            return {key: self.decode_result(tab, item) for key, item in value.items()}
+        return value
+
+    def execute_script_in_tab(self, tab, script, args, is_async=False):
+        timeout = self.script_timeout if is_async else 30
+        result = self.run(tab.execute(script, self.encode_args(list(args)), is_async, timeout))
+        return self.decode_result(tab, result)
+
+    def execute_script(self, script, *args):
+        return self.execute_script_in_tab(self.tab, script, args)
+
+    def execute_async_script(self, script, *args):
+        return self.execute_script_in_tab(self.tab, script, args, is_async=True)
+
+    def set_script_timeout(self, seconds):
+        self.script_timeout = seconds
+
+    # ---- 页面与元素 ----
+
+    def get(self, url):
+        self.run(self.tab.navigate(url))
+
+    def find_elements(self, by, value, root=None):
+        if by not in SUPPORTED_LOCATORS:
+            raise DevToolsError(f"DevTools后端不支持的定位方式: {by}")
+        tab = root.tab if root is not None else self.tab
+        return self.execute_script_in_tab(tab, FIND_ELEMENTS_JS, [by, value, root]) or []
+
+    def find_element(self, by, value, root=None):
+        elements = self.find_elements(by, value, root)
+        if not elements:
+            raise DevToolsError(f"未找到元素: {by}={value}")
+        return elements[0]
+
+    @property
+    def current_url(self):
+        return self.execute_script("return location.href;")
+
+    @property
+    def title(self):
+        return self.execute_script("return document.title;")
+
+    @property
+    def page_source(self):
+        return self.execute_script("return document.documentElement.outerHTML;")
+
+    def get_window_size(self):
+        return self.execute_script("return {width: window.outerWidth, height: window.outerHeight};")
+
+    def maximize_window(self):
+        # 附着到用户已打开的浏览器时不调整窗口
+        pass
+
+    # ---- 窗口（标签页） ----
+
+    @property
+    def current_window_handle(self):
+        return self.tab.target_id
+
+    @property
+    def window_handles(self):
+        return [page['targetId'] for page in self.run(self.browser.list_pages())]
+
+    def close(self):
+        """关闭当前标签页"""
+        self.opened_targets.discard(self.tab.target_id)
+        self.run(self.browser.close_tab(self.tab))
+
+    # ---- DevTools命令与网络日志 ----
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.run(self.tab.send(cmd, cmd_args))
+
+    def get_log(self, log_type):
+        """读取性能日志：返回与Selenium performance日志相同格式的网络事件并清空缓冲"""
+        if log_type != 'performance':
+            return []
+        return [
+            {
+                'message': json.dumps({'message': {'method': event['method'], 'params': event['params']}}),
+                'timestamp': int(event['timestamp'] * 1000),
+                'level': 'INFO'
+            }
+            for event in self.tab.drain_network_events()
+        ]
+
+    def quit(self):
+        """关闭本驱动新建的标签页并断开连接，用户原有的标签页保持不变"""
+        async def shutdown():
+            for target_id in list(self.opened_targets):
+                tab = self.browser.tabs.get(target_id)
+                if tab:
+                    await self.browser.close_tab(tab)
+            await self.browser.close()
+
+        try:
+            self.run(shutdown(), timeout=10)
+        except Exception:
+            pass
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
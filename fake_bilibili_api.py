@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站视频字幕提取工具 - 本地模拟B站接口服务器
+作者: wjm
+版本: v2.0.0
+
+功能说明:
+- 实现现有字幕流程用到的接口子集：视频信息（/x/web-interface/view）、WBI密钥（/x/web-interface/nav）、
+  播放器字幕列表（/x/player/wbi/v2）和字幕JSON（/subtitle/...），校验WBI签名参数
+- 视频与字幕轨道由 add_video 预置；可设置字幕列表需要登录、模拟签名被拒绝（-352）
+- 记录收到的全部请求，check 子命令用它离线验证"现有字幕"模式（不启动浏览器）
+
+用法:
+    python fake_bilibili_api.py check
+
+    server = FakeBilibiliApiServer()
+    server.add_video('BV1xx411c7mD', '示例视频', tracks=[{'lan': 'zh-CN', 'lan_doc': '中文', 'rows': 100}])
+    extractor.api_base = server.start_background()
+    ...
+    server.stop_background()
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import bilibili_subtitle_extractor as bse
+
+
+class FakeBilibiliApiServer:
+    """本地模拟B站接口服务器（HTTP/1.1 长连接，标准库实现）"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.videos = {}           # bvid -> {'title', 'pages': [cid], 'tracks': {cid: [轨道]}}
+        self.subtitles = {}        # 路径 -> 字幕JSON
+        self.login_required = set()  # 字幕列表需要登录的 bvid（未携带 SESSDATA 时返回空列表）
+        self.reject_wbi = 0        # 接下来多少次播放器请求返回 -352（签名被拒绝）
+        self.requests = []         # 收到的请求 (路径, 参数)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    # ---- 场景配置 ----
+
+    def add_video(self, bvid, title, pages=1, tracks=(), login_required=False):
+        """预置视频
+
+        Args:
+            pages: 分P数，每个分P的字幕轨道相同（内容中带分P序号）
+            tracks: 字幕轨道 [{'lan', 'lan_doc', 'rows'}]，lan 以 ai- 开头表示AI生成
+            login_required: 字幕列表只对登录用户返回
+        """
+        cids = [len(self.videos) * 100 + page + 1 for page in range(pages)]
+        self.videos[bvid] = {'title': title, 'pages': cids, 'tracks': {}}
+        for page, cid in enumerate(cids, 1):
+            entries = []
+            for track in tracks:
+                path = f"/subtitle/{bvid}/{cid}/{track['lan']}.json"
+                self.subtitles[path] = {'body': [
+                    {'from': i * 2.0, 'to': i * 2 + 1.5, 'content': f"{track['lan_doc']} P{page} 第{i + 1}句"}
+                    for i in range(track.get('rows', 10))
+                ]}
+                entries.append({'lan': track['lan'], 'lan_doc': track['lan_doc'], 'subtitle_url': path})
+            self.videos[bvid]['tracks'][cid] = entries
+        if login_required:
+            self.login_required.add(bvid)
+
+    def request_count(self, path):
+        return sum(1 for item, _ in self.requests if item == path)
+
+    # ---- 服务器生命周期 ----
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def start_background(self):
+        """在后台线程中启动服务器，返回接口地址（用作 extractor.api_base）"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = -1  # 响应头和响应体合并发送（逐段写出时长连接会受 Nagle 算法延迟约40ms）
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                with fake.lock:
+                    fake.requests.append((parsed.path, params))
+                status, data = fake.handle(parsed.path, params, self.headers.get('Cookie') or '')
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-bilibili-api', daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop_background(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    # ---- 接口处理 ----
+
+    def handle(self, path, params, cookie):
+        """返回 (HTTP状态码, JSON)"""
+        if path == '/x/web-interface/nav':
+            # 未登录时 code 为 -101，但仍返回 WBI 密钥
+            return 200, {'code': -101, 'message': '账号未登录', 'data': {'wbi_img': {
+                'img_url': 'https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png',
+                'sub_url': 'https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png'}}}
+        if path == '/x/web-interface/view':
+            video = self.videos.get(params.get('bvid'))
+            if video is None:
+                return 200, {'code': -404, 'message': '啥都木有', 'data': None}
+            return 200, {'code': 0, 'message': '0', 'data': {
+                'bvid': params['bvid'], 'aid': 1, 'title': video['title'], 'cid': video['pages'][0],
+                'owner': {'mid': 1},
+                'pages': [{'cid': cid, 'page': page} for page, cid in enumerate(video['pages'], 1)]}}
+        if path == '/x/player/wbi/v2':
+            with self.lock:
+                rejected = self.reject_wbi > 0
+                self.reject_wbi -= 1 if rejected else 0
+            if rejected or 'w_rid' not in params or 'wts' not in params:
+                return 200, {'code': -352, 'message': '风控校验失败', 'data': None}
+            video = self.videos.get(params.get('bvid'))
+            if video is None:
+                return 200, {'code': -400, 'message': '请求错误', 'data': None}
+            tracks = video['tracks'].get(int(params.get('cid', 0)), [])
+            if params['bvid'] in self.login_required and 'SESSDATA=' not in cookie:
+                tracks = []
+            return 200, {'code': 0, 'message': '0', 'data': {'subtitle': {'subtitles': tracks}}}
+        if path in self.subtitles:
+            return 200, self.subtitles[path]
+        return 404, {'code': -404, 'message': 'not found'}
+
+
+def check():
+    """离线验证"现有字幕"模式：匿名请求、优先UP主字幕、多P、无字幕视频、异步批量，且不连接或启动浏览器"""
+    server = FakeBilibiliApiServer()
+    server.add_video('BV1CC411c001', '带字幕的视频 v1.2',
+                     tracks=[{'lan': 'ai-zh', 'lan_doc': '中文（自动生成）', 'rows': 50},
+                             {'lan': 'zh-CN', 'lan_doc': '中文（中国）', 'rows': 300}])
+    server.add_video('BV1CC411c002', '多P视频', pages=2, tracks=[{'lan': 'zh-CN', 'lan_doc': '中文', 'rows': 20}])
+    server.add_video('BV1CC411c003', '没有字幕的视频')
+    server.add_video('BV1CC411c004', '需要登录的字幕', tracks=[{'lan': 'zh-CN', 'lan_doc': '中文', 'rows': 5}],
+                     login_required=True)
+    api_base = server.start_background()
+
+    # 保存的字幕文件在检查结束后随临时目录一起删除
+    with tempfile.TemporaryDirectory(prefix='fake_api_') as output_dir:
+        extractor = bse.BilibiliSubtitleExtractor(output_dir)
+        extractor.api_base = api_base
+        browser_attempts = []
+        extractor.import_browser_cookies = lambda driver=None: browser_attempts.append(driver) or False
+
+        cases = [
+            ('优先UP主字幕', 'BV1CC411c001', 1, 'srt', lambda files: any('中文_中国_.srt' in name for name in files)),
+            ('多P第2P', 'BV1CC411c002', 2, 'txt',
+             lambda files: any(name.endswith('.txt') and ' P2 ' in (extractor.output_dir / name).read_text('utf-8')
+                               for name in files)),
+            ('无字幕视频', 'BV1CC411c003', 1, 'srt', None),
+            ('需要登录（匿名）', 'BV1CC411c004', 1, 'json', None),
+        ]
+        failures = 0
+        try:
+            for name, bvid, page, output_format, expect_files in cases:
+                before = set(path.name for path in extractor.output_dir.iterdir())
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    success = extractor.extract_subtitle_from_url(f'https://www.bilibili.com/video/{bvid}?p={page}',
+                                                                  page, use_ai=False, output_format=output_format)
+                elapsed = (time.perf_counter() - start) * 1000
+                created = sorted(set(path.name for path in extractor.output_dir.iterdir()) - before)
+                ok = success == (expect_files is not None) and (expect_files is None or expect_files(created))
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} {name:<14}{elapsed:>8.1f}ms  {', '.join(created) or '-'}")
+
+            failures += check_async_batch(server, extractor)
+
+            ok = not browser_attempts
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} 未连接或启动浏览器（Cookie导出尝试 {len(browser_attempts)} 次）")
+        finally:
+            server.stop_background()
+    return failures
+
+
+def check_async_batch(server, extractor):
+    """异步批量路径：签名被拒绝（-352）时刷新密钥重试，无法解析的链接不影响其他视频"""
+    try:
+        from async_api_client import require_async_http
+        require_async_http()
+    except ImportError as e:
+        print(f"⏭️ 异步批量（跳过：{e}）")
+        return 0
+
+    urls = ['https://www.bilibili.com/video/BV1CC411c001', 'https://www.bilibili.com/video/BV1CC411c002',
+            'https://www.bilibili.com/video/BV1CC411c003', 'https://example.com/not-a-video']
+    server.reject_wbi = 2
+    nav_before = server.request_count('/x/web-interface/nav')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        outcome = extractor.extract_existing_subtitles_from_urls(urls, 'srt', max_connections=4)
+    elapsed = (time.perf_counter() - start) * 1000
+    refreshed = server.request_count('/x/web-interface/nav') - nav_before
+    ok = outcome == dict(zip(urls, [True, True, False, False])) and refreshed == 1
+    print(f"{'✅' if ok else '❌'} {'异步批量（-352重试）':<14}{elapsed:>8.1f}ms  "
+          f"{sum(outcome.values())}/{len(urls)} 成功，刷新签名密钥 {refreshed} 次")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟B站接口服务器')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help='离线验证现有字幕模式')
+    serve_parser = subparsers.add_parser('serve', help='启动模拟服务器并预置示例视频（Ctrl+C 退出）')
+    serve_parser.add_argument('--port', type=int, default=8765, help='监听端口 (默认: 8765)')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        sys.exit(1 if check() else 0)
+
+    server = FakeBilibiliApiServer(port=args.port)
+    server.add_video('BV1xx411c7mD', '示例视频', tracks=[{'lan': 'zh-CN', 'lan_doc': '中文（中国）', 'rows': 100}])
+    print(f"🌐 模拟接口: {server.start_background()}（示例视频 BV1xx411c7mD，可用 --api-base 指向该地址）")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop_background()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站视频字幕提取工具 - 本地模拟DevTools服务器
+作者: wjm
+版本: v2.0.0
+
+功能说明:
+- 实现 devtools_backend 用到的DevTools协议子集（Target/Page/Runtime/Input/Network）
+- 页面脚本由Python函数模拟：按脚本原文注册响应函数，无需真实浏览器即可离线验证后端和AI流程
+- 可预置接口响应，在导航或点击时推送 Network 事件，并记录收到的全部命令
+
+用法:
+    python fake_devtools_server.py check
+
+    server = FakeDevToolsServer()
+    server.on_script(PAGE_READY_SCRIPT, lambda page, args: True)
+    ws_url = server.start_background()
+    driver = DevToolsDriver.connect(ws_url=ws_url)
+    ...
+    server.stop_background()
+
+依赖:
+- websockets（可选）: pip install websockets
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+
+from devtools_backend import (ELEMENT_CENTER_JS, EXECUTE_SCRIPT_WRAPPER_JS, FIND_ELEMENTS_JS, DevToolsDriver,
+                              require_websockets)
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+class FakePage:
+    """模拟的标签页"""
+
+    def __init__(self, target_id, url='about:blank'):
+        self.target_id = target_id
+        self.url = url
+        self.title = ''
+        self.clicks = []        # 收到的鼠标点击坐标 (x, y)
+        self.elements = []      # 脚本返回的元素（以序号作为元素引用）
+        self.network_enabled = False
+        self.page_enabled = False
+        self.state = {}         # 供脚本响应函数保存页面状态
+
+
+class FakeDevToolsServer:
+    """本地模拟DevTools服务器：单个WebSocket端点，支持 flatten 模式的多标签页会话"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.pages = {}          # targetId -> FakePage
+        self.sessions = {}       # sessionId -> FakePage
+        self.script_handlers = {}
+        self.evaluate_handler = None
+        self.responses = []      # 预置的接口响应
+        self.commands = []       # 收到的命令 (method, sessionId)
+        self.ids = itertools.count(1)
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.connections = set()
+        self.new_page()  # 与真实浏览器一致：启动时已有一个标签页
+
+    # ---- 场景配置 ----
+
+    def new_page(self, url='about:blank'):
+        target_id = f'TARGET{next(self.ids):04d}'
+        self.pages[target_id] = FakePage(target_id, url)
+        return self.pages[target_id]
+
+    def on_script(self, script, handler):
+        """注册 execute_script 脚本的响应函数 handler(page, args)，args 中的元素引用已还原为对象"""
+        self.script_handlers[script] = handler
+
+    def on_evaluate(self, handler):
+        """注册其他 Runtime.evaluate 表达式的响应函数 handler(page, expression)"""
+        self.evaluate_handler = handler
+
+    def add_network_response(self, url, body, trigger='navigate', mime_type='application/json'):
+        """预置接口响应：导航（trigger='navigate'）或点击（trigger='click'）后推送对应的Network事件"""
+        if not isinstance(body, str):
+            body = json.dumps(body, ensure_ascii=False)
+        self.responses.append({'url': url, 'body': body, 'trigger': trigger, 'mime_type': mime_type})
+
+    def command_counts(self):
+        """按方法名统计收到的命令数"""
+        counts = {}
+        for method, _ in self.commands:
+            counts[method] = counts.get(method, 0) + 1
+        return counts
+
+    # ---- 服务器生命周期 ----
+
+    @property
+    def ws_url(self):
+        return f'ws://{self.host}:{self.port}/devtools/browser/fake'
+
+    async def start(self):
+        require_websockets()
+        self.server = await websockets.serve(self.handle_connection, self.host, self.port, max_size=None)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.ws_url
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def start_background(self):
+        """在后台线程中启动服务器，返回WebSocket地址"""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='fake-devtools', daemon=True)
+        self.thread.start()
+        return asyncio.run_coroutine_threadsafe(self.start(), self.loop).result(10)
+
+    def stop_background(self):
+        if not self.loop:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop = None
+
+    # ---- 协议处理 ----
+
+    async def handle_connection(self, websocket, *unused):
+        self.connections.add(websocket)
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                session_id = message.get('sessionId')
+                self.commands.append((message['method'], session_id))
+                response = {'id': message['id']}
+                if session_id:
+                    response['sessionId'] = session_id
+                events = []
+                try:
+                    result, events = self.handle_command(message['method'], message.get('params') or {}, session_id)
+                    response['result'] = result
+                except LookupError as e:
+                    response['error'] = {'code': -32601, 'message': str(e)}
+                except Exception as e:
+                    response['error'] = {'code': -32000, 'message': str(e)}
+                await websocket.send(json.dumps(response, ensure_ascii=False))
+                for event in events:
+                    await websocket.send(json.dumps(event, ensure_ascii=False))
+        except Exception:
+            pass
+        finally:
+            self.connections.discard(websocket)
+
+    def handle_command(self, method, params, session_id):
+        """处理一条命令，返回 (结果, 需要随后推送的事件列表)"""
+        if session_id is None:
+            return self.handle_browser_command(method, params), []
+
+        page = self.sessions.get(session_id)
+        if page is None:
+            raise ValueError(f"No session with given id: {session_id}")
+
+        if method in ('Runtime.enable', 'Page.enable', 'Network.enable', 'Network.setBlockedURLs',
+                      'Network.setCacheDisabled', 'Emulation.setDeviceMetricsOverride'):
+            if method == 'Page.enable':
+                page.page_enabled = True
+            elif method == 'Network.enable':
+                page.network_enabled = True
+            return {}, []
+        if method == 'Runtime.evaluate':
+            return self.evaluate(page, params), []
+        if method == 'Page.navigate':
+            page.url = params['url']
+            page.elements = []
+            page.state = {}
+            events = self.network_events(page, session_id, 'navigate')
+            if page.page_enabled:
+                events.append({'method': 'Page.loadEventFired', 'params': {'timestamp': 0}, 'sessionId': session_id})
+            return {'frameId': page.target_id, 'loaderId': f'LOADER{next(self.ids)}'}, events
+        if method == 'Input.dispatchMouseEvent':
+            if params.get('type') == 'mouseReleased':
+                page.clicks.append((params['x'], params['y']))
+                return {}, self.network_events(page, session_id, 'click')
+            return {}, []
+        if method == 'Network.getResponseBody':
+            for response in self.responses:
+                if response.get('request_id') == params['requestId']:
+                    return {'body': response['body'], 'base64Encoded': False}, []
+            raise ValueError("No resource with given identifier found")
+        raise LookupError(f"'{method}' wasn't found")
+
+    def handle_browser_command(self, method, params):
+        if method == 'Browser.getVersion':
+            return {'product': 'FakeDevTools/1.0', 'protocolVersion': '1.3'}
+        if method == 'Target.getTargets':
+            return {'targetInfos': [
+                {'targetId': page.target_id, 'type': 'page', 'url': page.url, 'title': page.title, 'attached': False}
+                for page in self.pages.values()
+            ]}
+        if method == 'Target.createTarget':
+            return {'targetId': self.new_page(params.get('url', 'about:blank')).target_id}
+        if method == 'Target.attachToTarget':
+            page = self.pages.get(params['targetId'])
+            if page is None:
+                raise ValueError("No target with given id found")
+            session_id = f'SESSION{next(self.ids):04d}'
+            self.sessions[session_id] = page
+            return {'sessionId': session_id}
+        if method == 'Target.closeTarget':
+            page = self.pages.pop(params['targetId'], None)
+            for session_id in [key for key, value in self.sessions.items() if value is page]:
+                del self.sessions[session_id]
+            return {'success': page is not None}
+        raise LookupError(f"'{method}' wasn't found")
+
+    def network_events(self, page, session_id, trigger):
+        """生成预置响应的 requestWillBeSent / responseReceived / loadingFinished 事件"""
+        if not page.network_enabled:
+            return []
+        events = []
+        for response in self.responses:
+            if response['trigger'] != trigger:
+                continue
+            request_id = f'REQ{next(self.ids)}'
+            response['request_id'] = request_id
+            for method, params in (
+                ('Network.requestWillBeSent', {'request': {'url': response['url'], 'method': 'GET'}}),
+                ('Network.responseReceived', {'response': {
+                    'url': response['url'], 'status': 200, 'mimeType': response['mime_type'],
+                    'encodedDataLength': len(response['body'].encode('utf-8'))
+                }}),
+                ('Network.loadingFinished', {'encodedDataLength': len(response['body'].encode('utf-8'))}),
+            ):
+                params = dict(params, requestId=request_id)
+                events.append({'method': method, 'params': params, 'sessionId': session_id})
+        return events
+
+    def evaluate(self, page, params):
+        expression = params['expression']
+        prefix = f"({EXECUTE_SCRIPT_WRAPPER_JS.strip()})("
+        try:
+            if expression.startswith(prefix):
+                script, args, is_async, _ = json.loads('[' + expression[len(prefix):-1] + ']')
+                handler = self.script_handlers.get(script)
+                if handler is None:
+                    raise LookupError(f"未注册的脚本: {script.strip()[:60]}")
+                value = self.encode(page, handler(page, self.decode(page, args)))
+            elif self.evaluate_handler is not None:
+                value = self.evaluate_handler(page, expression)
+            else:
+                raise LookupError(f"未注册的表达式: {expression[:60]}")
+        except Exception as e:
+            return {
+                'result': {'type': 'object', 'subtype': 'error'},
+                'exceptionDetails': {'text': 'Uncaught', 'exception': {'description': str(e)}}
+            }
+        return {'result': {'type': 'object' if isinstance(value, (dict, list)) else 'string', 'value': value}}
+
+    def decode(self, page, value):
+        if isinstance(value, list):
+            return [self.decode(page, item) for item in value]
+        if isinstance(value, dict):
+            if '__element__' in value:
+                return page.elements[value['__element__']]
+            return {key: self.decode(page, item) for key, item in value.items()}
+        return value
+
+    def encode(self, page, value):
+        """响应函数返回的 FakeElement 编码为元素引用"""
+        if isinstance(value, FakeElement):
+            if value not in page.elements:
+                page.elements.append(value)
+            return {'__element__': page.elements.index(value)}
+        if isinstance(value, (list, tuple)):
+            return [self.encode(page, item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.encode(page, item) for key, item in value.items()}
+        return value
+
+
+class FakeElement:
+    """脚本响应函数可返回的模拟元素"""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __repr__(self):
+        return f"<FakeElement {self.name}>"
+
+
+def check():
+    """离线验证 DevToolsDriver：两个标签页上的脚本执行、导航、点击和 Network 事件互不串扰"""
+    try:
+        require_websockets()
+    except ImportError as e:
+        print(f"❌ {e}")
+        return 1
+
+    server = FakeDevToolsServer()
+    server.on_script("return location.href;", lambda page, args: page.url)
+    server.on_script("return arguments[0] + arguments[1];", lambda page, args: args[0] + args[1])
+    server.on_script(FIND_ELEMENTS_JS, lambda page, args: [FakeElement('ai-button')] if args[1] == '.ai-button' else [])
+    server.on_script(ELEMENT_CENTER_JS, lambda page, args: {'x': 100, 'y': 40})
+    server.add_network_response('https://api.bilibili.com/x/web-interface/view/conclusion/get', {'code': 0},
+                                trigger='click')
+    driver = DevToolsDriver.connect(ws_url=server.start_background())
+
+    def network(driver):
+        return [json.loads(entry['message'])['message'] for entry in driver.get_log('performance')]
+
+    def click_and_read(driver):
+        # 事件在命令响应之后推送，与真实浏览器一样需要轮询性能日志
+        driver.find_element('css selector', '.ai-button').click()
+        events, finished, deadline = [], [], time.time() + 2
+        while not finished and time.time() < deadline:
+            events += network(driver)
+            finished = [event for event in events if event['method'] == 'Network.loadingFinished']
+            if not finished:
+                time.sleep(0.01)
+        if not finished:
+            return events, None
+        body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': finished[0]['params']['requestId']})
+        return events, json.loads(body['body'])
+
+    handles = {}
+
+    def navigate(url):
+        driver.get(url)
+        return driver.current_url == url
+
+    def click_with_network():
+        driver.execute_cdp_cmd('Network.enable', {})
+        return click_and_read(driver)[1] == {'code': 0}
+
+    def open_second_tab():
+        handles['a'] = driver.current_window_handle
+        driver.switch_to.new_window('tab')
+        return navigate('https://www.bilibili.com/video/BV1B')
+
+    def back_to_first_tab():
+        driver.switch_to.window(handles['a'])
+        return driver.current_url == 'https://www.bilibili.com/video/BV1A' and network(driver) == []
+
+    def quit_driver():
+        driver.quit()
+        return list(server.pages) == [handles['a']]
+
+    cases = [
+        ('执行脚本', lambda: driver.execute_script("return arguments[0] + arguments[1];", 2, 3) == 5),
+        ('标签页A导航', lambda: navigate('https://www.bilibili.com/video/BV1A')),
+        ('标签页A点击与Network', click_with_network),
+        ('标签页B导航', open_second_tab),
+        ('标签页B点击与Network', click_with_network),
+        ('切回A：地址与网络事件独立', back_to_first_tab),
+        ('点击分别送达两个标签页', lambda: [len(page.clicks) for page in server.pages.values()] == [1, 1]),
+        ('退出后只关闭新建的标签页', quit_driver),
+    ]
+    failures = 0
+    try:
+        for name, run in cases:
+            start = time.perf_counter()
+            try:
+                ok = bool(run())
+                detail = ''
+            except Exception as e:
+                ok = False
+                detail = str(e)[:80]
+            elapsed = (time.perf_counter() - start) * 1000
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name:<16}{elapsed:>8.1f}ms  {detail}")
+    finally:
+        server.stop_background()
+    counts = ', '.join(f"{method}×{count}" for method, count in sorted(server.command_counts().items()))
+    print(f"📊 DevTools命令: {counts}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟DevTools服务器')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help='离线验证 DevToolsDriver（两个标签页的脚本、导航、点击和网络事件）')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        sys.exit(1 if check() else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1762 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站视频字幕提取工具 - 离线回放用模拟WebDriver
+作者: wjm
+版本: v2.0.0
+
+功能说明:
+- FakeWebDriver 按录制的DOM快照回答 find_elements、get_attribute、点击、滚动和 execute_script，
+  无需登录的Edge和B站即可离线运行整个AI字幕流程
+- 录制文件包含 视频页 / 视频总结页 / 字幕列表页 三个状态及点击切换规则，字幕列表按虚拟列表回放
+  （只渲染可视区域附近的行，滚动后重新渲染）
+- 页面内脚本（采集、批量特征、等待条件等）由Python等价实现，CSS/XPath支持流程用到的子集
+- 统计每个步骤的WebDriver调用次数（每次调用对应一次WebDriver HTTP请求）
+
+用法:
+    python fake_webdriver.py bench recordings/bilibili_ai_panel.json --repeat 5
+    python fake_webdriver.py record BV1xx411c7mD recordings/my_video.json   # 连接调试模式Edge录制
+
+录制文件格式（JSON）:
+    {
+      "url", "title", "window": {"width", "height"}, "initial_state": "video",
+      "states": {
+        "<状态名>": {
+          "dom": 节点,   # {"tag", "attrs", "text"(首个文本节点), "rect": [x, y, 宽, 高], "hidden", "children"}
+          "page_state": {"video", "subtitles"},   # 可选：PAGE_STATE_JS 的返回值，缺省时模拟状态中无数据
+          "virtual_list": {"scroller": CSS, "list": CSS, "row_height", "overscan",
+                           "row_template": 节点(文本中的 {time}/{content} 为占位符，rect 相对行左上角),
+                           "rows": [{"time", "content"}]}
+        }
+      },
+      "transitions": [{"from": 状态, "click": CSS或XPath, "to": 状态}]
+    }
+
+版权声明:
+Copyright (c) 2024 wjm. All rights reserved.
+本软件由 wjm 开发，仅供个人学习和研究使用。
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import math
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import bilibili_subtitle_extractor as bse
+
+
+class FakeWebDriverError(Exception):
+    """模拟驱动不支持的操作或脚本（对应真实驱动中的 WebDriverException）"""
+
+
+class FakeInvalidSelectorError(FakeWebDriverError):
+    """选择器无效或超出支持的子集"""
+
+
+class FakeNoSuchElementError(FakeWebDriverError):
+    """find_element 未找到元素"""
+
+
+class FakeStaleElementError(FakeWebDriverError):
+    """元素已不在当前DOM中（状态切换或虚拟列表重新渲染后）"""
+
+
+# 与 selenium.webdriver.common.by.By 取值一致
+BY_CSS_SELECTOR = 'css selector'
+BY_XPATH = 'xpath'
+BY_TAG_NAME = 'tag name'
+BY_CLASS_NAME = 'class name'
+BY_ID = 'id'
+
+BLOCK_TAGS = {'div', 'p', 'li', 'ul', 'ol', 'section', 'article', 'header', 'footer', 'nav', 'aside',
+              'main', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'tr', 'form', 'body', 'html'}
+
+# 录制页面DOM：首个非空文本节点、页面坐标、隐藏状态；跳过脚本样式和SVG内部细节
+RECORD_DOM_JS = r"""
+var skip = {SCRIPT: 1, STYLE: 1, NOSCRIPT: 1, LINK: 1, META: 1, TEMPLATE: 1};
+function snap(el) {
+    var rect = el.getBoundingClientRect();
+    var style = window.getComputedStyle(el);
+    var node = {tag: el.tagName.toLowerCase()};
+    var attrs = {};
+    for (var i = 0; i < el.attributes.length; i++) {
+        var attr = el.attributes[i];
+        if (attr.name !== 'style' && attr.value.length < 500) { attrs[attr.name] = attr.value; }
+    }
+    if (Object.keys(attrs).length) { node.attrs = attrs; }
+    for (var child = el.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === 3 && child.nodeValue.trim()) { node.text = child.nodeValue.trim(); break; }
+    }
+    node.rect = [Math.round(rect.left + window.scrollX), Math.round(rect.top + window.scrollY),
+                 Math.round(rect.width), Math.round(rect.height)];
+    if (style.display === 'none' || style.visibility === 'hidden') { node.hidden = true; }
+    if (node.tag !== 'svg') {
+        var children = [];
+        for (var k = 0; k < el.children.length; k++) {
+            if (!skip[el.children[k].tagName]) { children.push(snap(el.children[k])); }
+        }
+        if (children.length) { node.children = children; }
+    }
+    return node;
+}
+return {dom: snap(document.documentElement), url: location.href, title: document.title,
+        window: {width: window.innerWidth, height: window.innerHeight}};
+"""
+
+# 录制前为需要回放点击的元素打上 data-replay-ref 标记（arguments[0] = 元素，arguments[1] = 标记名）
+TAG_ELEMENT_JS = "arguments[0].setAttribute('data-replay-ref', arguments[1]);"
+
+# 标记AI面板内的"视频总结"/"字幕列表"标签（取最内层的可见元素）
+TAG_PANEL_TABS_JS = r"""
+var tabs = {'视频总结': 'tab-summary', '字幕列表': 'tab-subtitles'};
+for (var label in tabs) {
+    var snap = document.evaluate("//*[contains(text(), '" + label + "')]", document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = snap.snapshotLength - 1; i >= 0; i--) {
+        var el = snap.snapshotItem(i);
+        if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) {
+            el.setAttribute('data-replay-ref', tabs[label]);
+            break;
+        }
+    }
+}
+"""
+
+
+# ---------------------------------------------------------------- DOM
+
+class FakeNode:
+    """录制DOM中的一个元素节点"""
+
+    def __init__(self, data, parent=None):
+        self.tag = (data.get('tag') or 'div').lower()
+        self.attrs = dict(data.get('attrs') or {})
+        self.text = data.get('text') or ''
+        self.rect = list(data['rect']) if data.get('rect') else None
+        self.hidden = bool(data.get('hidden'))
+        self.parent = parent
+        self.children = [FakeNode(child, self) for child in data.get('children') or []]
+        self.scroll_top = 0
+
+    def __repr__(self):
+        return f"<{self.tag} class='{self.attrs.get('class', '')[:40]}'>"
+
+    def iter_descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.iter_descendants()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def classes(self):
+        return (self.attrs.get('class') or '').split()
+
+    def text_content(self):
+        return self.text + ''.join(child.text_content() for child in self.children)
+
+    def inner_text(self):
+        """近似 innerText：隐藏元素不计入，块级子元素之间换行"""
+        if not self.is_visible():
+            return ''
+        parts = [self.text] if self.text else []
+        for child in self.children:
+            text = child.inner_text()
+            if text:
+                parts.append(('\n' if child.tag in BLOCK_TAGS and parts else '') + text)
+        return ''.join(parts)
+
+    def get_rect(self):
+        node = self
+        while node is not None:
+            if node.rect is not None:
+                return node.rect
+            node = node.parent
+        return [0, 0, 0, 0]
+
+    def is_visible(self):
+        if self.hidden or any(node.hidden for node in self.ancestors()):
+            return False
+        rect = self.get_rect()
+        return rect[2] > 0 or rect[3] > 0
+
+    def client_height(self):
+        return self.get_rect()[3]
+
+    def content_height(self):
+        """非虚拟列表容器的内容高度（子元素最低点相对容器顶部）"""
+        top = self.get_rect()[1]
+        bottom = max((child.get_rect()[1] + child.get_rect()[3] for child in self.iter_descendants()), default=top)
+        return max(bottom - top, self.client_height())
+
+
+class VirtualList:
+    """字幕虚拟列表：按滚动位置只渲染可视区域附近的行"""
+
+    def __init__(self, document, config):
+        self.document = document
+        self.scroller = document.query_selector(config['scroller'])
+        self.list = document.query_selector(config['list'])
+        if self.scroller is None or self.list is None:
+            raise FakeWebDriverError(f"录制文件中的虚拟列表选择器无效: {config['scroller']} / {config['list']}")
+        self.rows = config['rows']
+        self.row_height = config['row_height']
+        self.overscan = config.get('overscan', 2)
+        self.template = config['row_template']
+        self.row_nodes = {}  # 行序号 -> 节点（同一行重复渲染时保持同一元素）
+        list_rect = self.list.get_rect()
+        self.offset = list_rect[1] - self.scroller.get_rect()[1]
+        self.render()
+
+    def scroll_height(self):
+        return max(self.offset + len(self.rows) * self.row_height, self.scroller.client_height())
+
+    def build_row(self, index):
+        row = self.rows[index]
+        list_rect = self.list.get_rect()
+        origin_x = list_rect[0]
+        origin_y = list_rect[1] + index * self.row_height - self.scroller.scroll_top
+
+        def instantiate(data):
+            data = dict(data)
+            if data.get('text'):
+                data['text'] = data['text'].replace('{time}', row['time']).replace('{content}', row['content'])
+            if data.get('rect'):
+                x, y, width, height = data['rect']
+                data['rect'] = [origin_x + x, origin_y + y, width, height]
+            data['children'] = [instantiate(child) for child in data.get('children') or []]
+            return data
+
+        return FakeNode(instantiate(self.template), self.list)
+
+    def render(self):
+        client_height = self.scroller.client_height()
+        top = self.scroller.scroll_top - self.offset
+        first = max(0, int(math.floor(top / self.row_height)) - self.overscan)
+        last = min(len(self.rows), int(math.ceil((top + client_height) / self.row_height)) + self.overscan)
+        children = []
+        for index in range(first, last):
+            node = self.row_nodes.get(index)
+            if node is None:
+                node = self.row_nodes[index] = self.build_row(index)
+            else:
+                self.move_row(node, index)
+            children.append(node)
+        self.list.children = children
+
+    def move_row(self, node, index):
+        """滚动后更新已渲染行的坐标"""
+        list_rect = self.list.get_rect()
+        expected_y = list_rect[1] + index * self.row_height - self.scroller.scroll_top
+        delta = expected_y - node.rect[1]
+        if delta:
+            for item in [node] + list(node.iter_descendants()):
+                if item.rect:
+                    item.rect[1] += delta
+
+
+class FakeDocument:
+    """录制文件的当前页面状态"""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.window = recording.get('window') or {'width': 1920, 'height': 1080}
+        self.url = recording.get('url', 'about:blank')
+        self.title = recording.get('title', '')
+        self.root = None
+        self.doc_node = None
+        self.state = None
+        self.virtual_list = None
+        self.load_state(recording.get('initial_state') or next(iter(recording['states'])))
+
+    def load_state(self, name):
+        state = self.recording['states'][name]
+        self.state = name
+        self.doc_node = FakeNode({'tag': '#document'})
+        self.root = FakeNode(state['dom'], self.doc_node)
+        self.doc_node.children = [self.root]
+        self.virtual_list = VirtualList(self, state['virtual_list']) if state.get('virtual_list') else None
+
+    def all_nodes(self):
+        return self.root.iter_descendants()
+
+    def is_attached(self, node):
+        while node.parent is not None:
+            if node not in node.parent.children:
+                return False
+            node = node.parent
+        return node is self.doc_node
+
+    def resolve(self, node):
+        """状态切换后按节点路径重新定位元素（对应真实页面中保留下来的DOM节点）"""
+        if self.is_attached(node):
+            return node
+        path = []
+        current = node
+        while current.parent is not None:
+            siblings = current.parent.children
+            if current not in siblings:
+                raise FakeStaleElementError("stale element reference: 元素已不在页面中")
+            path.append((siblings.index(current), current.tag, current.attrs.get('class')))
+            current = current.parent
+        resolved = self.doc_node
+        for index, tag, class_name in reversed(path):
+            if index >= len(resolved.children):
+                raise FakeStaleElementError("stale element reference: 元素已不在页面中")
+            resolved = resolved.children[index]
+            if resolved.tag != tag or resolved.attrs.get('class') != class_name:
+                raise FakeStaleElementError("stale element reference: 元素已不在页面中")
+        return resolved
+
+    def query_selector_all(self, selector, root=None):
+        selectors = parse_css(selector)
+        scope = root if root is not None else self.doc_node
+        return [node for node in scope.iter_descendants() if any(match_css(node, s) for s in selectors)]
+
+    def query_selector(self, selector, root=None):
+        matches = self.query_selector_all(selector, root)
+        return matches[0] if matches else None
+
+    def query(self, selector, root=None):
+        """CSS 或 XPath（以 / 或 ./ 开头）"""
+        if selector.startswith('/') or selector.startswith('.') and selector[1:2] in ('/', '.'):
+            return evaluate_xpath(selector, root if root is not None else self.doc_node, self)
+        return self.query_selector_all(selector, root)
+
+    def click(self, node):
+        """点击元素：命中当前状态的切换规则时切换页面状态"""
+        targets = [node] + list(node.ancestors())
+        for transition in self.recording.get('transitions') or []:
+            if transition['from'] != self.state:
+                continue
+            matches = self.query(transition['click'])
+            if any(target in matches for target in targets):
+                self.load_state(transition['to'])
+                return True
+        return False
+
+    def scroll_height(self, node):
+        if self.virtual_list and node is self.virtual_list.scroller:
+            return self.virtual_list.scroll_height()
+        return node.content_height()
+
+    def set_scroll_top(self, node, value):
+        max_top = max(0, self.scroll_height(node) - node.client_height())
+        node.scroll_top = int(min(max(value, 0), max_top))
+        if self.virtual_list and node is self.virtual_list.scroller:
+            self.virtual_list.render()
+
+
+# ---------------------------------------------------------------- CSS
+
+CSS_ATTR_PATTERN = re.compile(
+    r"\[\s*([\w-]+)\s*(?:([~|^$*]?=)\s*(\"[^\"]*\"|'[^']*'|[^\]\s]+)\s*(i)?\s*)?\]"
+)
+
+
+def parse_css(selector):
+    """解析选择器组，返回 [[(组合符, 复合选择器), ...], ...]"""
+    groups = []
+    for part in split_top_level(selector, ','):
+        part = part.strip()
+        if not part:
+            raise FakeInvalidSelectorError(f"invalid selector: {selector}")
+        tokens = re.split(r'\s*(>|\+|~)\s*|\s+', part)
+        compounds = []
+        combinator = ' '
+        for token in tokens:
+            if token is None or token == '':
+                continue
+            if token in ('>', '+', '~'):
+                combinator = token
+                continue
+            compounds.append((combinator, parse_compound(token, selector)))
+            combinator = ' '
+        groups.append(compounds)
+    return groups
+
+
+def split_top_level(text, separator):
+    parts, depth, quote, current = [], 0, None, ''
+    for char in text:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def parse_compound(token, selector):
+    compound = {'tag': None, 'id': None, 'classes': [], 'attrs': []}
+    position = 0
+    match = re.match(r'\*|[a-zA-Z][\w-]*', token)
+    if match:
+        compound['tag'] = None if match.group(0) == '*' else match.group(0).lower()
+        position = match.end()
+    while position < len(token):
+        char = token[position]
+        if char == '#':
+            match = re.match(r'#([\w-]+)', token[position:])
+            if not match:
+                raise FakeInvalidSelectorError(f"invalid selector: {selector}")
+            compound['id'] = match.group(1)
+        elif char == '.':
+            match = re.match(r'\.([\w-]+)', token[position:])
+            if not match:
+                raise FakeInvalidSelectorError(f"invalid selector: {selector}")
+            compound['classes'].append(match.group(1))
+        elif char == '[':
+            match = CSS_ATTR_PATTERN.match(token, position)
+            if not match:
+                # 如 [data-v-*]：浏览器同样抛出 SyntaxError
+                raise FakeInvalidSelectorError(f"invalid selector: {selector}")
+            value = match.group(3)
+            if value and value[0] in '"\'':
+                value = value[1:-1]
+            compound['attrs'].append((match.group(1), match.group(2), value, bool(match.group(4))))
+            position = match.end()
+            continue
+        else:
+            raise FakeInvalidSelectorError(f"unsupported selector: {selector}")
+        position += match.end()
+    return compound
+
+
+def match_compound(node, compound):
+    if node.tag.startswith('#'):
+        return False
+    if compound['tag'] and node.tag != compound['tag']:
+        return False
+    if compound['id'] and node.attrs.get('id') != compound['id']:
+        return False
+    classes = node.classes()
+    if any(name not in classes for name in compound['classes']):
+        return False
+    for name, operator, value, ignore_case in compound['attrs']:
+        actual = node.attrs.get(name)
+        if actual is None:
+            return False
+        if operator is None:
+            continue
+        if ignore_case:
+            actual, value = actual.lower(), value.lower()
+        if operator == '=' and actual != value:
+            return False
+        if operator == '~=' and value not in actual.split():
+            return False
+        if operator == '|=' and not (actual == value or actual.startswith(value + '-')):
+            return False
+        if operator == '^=' and not (value and actual.startswith(value)):
+            return False
+        if operator == '$=' and not (value and actual.endswith(value)):
+            return False
+        if operator == '*=' and not (value and value in actual):
+            return False
+    return True
+
+
+def match_css(node, compounds, index=None):
+    """从右向左匹配复杂选择器"""
+    if index is None:
+        index = len(compounds) - 1
+    combinator, compound = compounds[index]
+    if not match_compound(node, compound):
+        return False
+    if index == 0:
+        return True
+    if combinator == '>':
+        return node.parent is not None and match_css(node.parent, compounds, index - 1)
+    if combinator in ('+', '~'):
+        siblings = node.parent.children if node.parent else []
+        previous = siblings[:siblings.index(node)] if node in siblings else []
+        if combinator == '+':
+            previous = previous[-1:]
+        return any(match_css(sibling, compounds, index - 1) for sibling in previous)
+    return any(match_css(ancestor, compounds, index - 1) for ancestor in node.ancestors())
+
+
+# ---------------------------------------------------------------- XPath
+
+XPATH_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>'[^']*'|"[^"]*")
+      | (?P<number>\d+(?:\.\d+)?)
+      | (?P<op>//|::|\.\.|!=|[/\[\]()|@,=.*])
+      | (?P<name>[A-Za-z_][\w\-]*(?:\(\))?)
+    )""", re.VERBOSE)
+
+REVERSE_AXES = {'ancestor', 'ancestor-or-self', 'preceding-sibling', 'parent'}
+
+
+def tokenize_xpath(expression):
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = XPATH_TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise FakeInvalidSelectorError(f"invalid xpath: {expression}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class XPathParser:
+    """XPath 1.0 子集：路径、轴、谓词、and/or、=、contains/starts-with/normalize-space/not、位置"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = tokenize_xpath(expression)
+        self.position = 0
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token[1] != value):
+            raise FakeInvalidSelectorError(f"invalid xpath: {self.expression}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        paths = [self.parse_path()]
+        while self.peek()[1] == '|':
+            self.take('|')
+            paths.append(self.parse_path())
+        if self.peek()[0] is not None:
+            raise FakeInvalidSelectorError(f"invalid xpath: {self.expression}")
+        return ('union', paths)
+
+    def parse_path(self):
+        absolute = False
+        steps = []
+        kind, value = self.peek()
+        if value == '/':
+            self.take()
+            absolute = True
+        elif value == '//':
+            self.take()
+            absolute = True
+            steps.append(('descendant-or-self', None, []))
+        steps.append(self.parse_step())
+        while self.peek()[1] in ('/', '//'):
+            if self.take()[1] == '//':
+                steps.append(('descendant-or-self', None, []))
+            steps.append(self.parse_step())
+        return ('path', absolute, steps)
+
+    def parse_step(self):
+        kind, value = self.peek()
+        if value == '.':
+            self.take()
+            return ('self', None, [])
+        if value == '..':
+            self.take()
+            return ('parent', None, [])
+        axis = 'child'
+        if value == '@':
+            raise FakeInvalidSelectorError(f"unsupported xpath: {self.expression}")
+        if kind == 'name' and self.peek(1)[1] == '::':
+            axis = self.take()[1]
+            self.take('::')
+        kind, value = self.take()
+        if value == '*':
+            test = None
+        elif kind == 'name':
+            test = value.lower()
+        else:
+            raise FakeInvalidSelectorError(f"invalid xpath: {self.expression}")
+        predicates = []
+        while self.peek()[1] == '[':
+            self.take('[')
+            predicates.append(self.parse_or())
+            self.take(']')
+        return (axis, test, predicates)
+
+    def parse_or(self):
+        left = self.parse_and()
+        while self.peek() == ('name', 'or'):
+            self.take()
+            left = ('or', left, self.parse_and())
+        return left
+
+    def parse_and(self):
+        left = self.parse_compare()
+        while self.peek() == ('name', 'and'):
+            self.take()
+            left = ('and', left, self.parse_compare())
+        return left
+
+    def parse_compare(self):
+        left = self.parse_primary()
+        if self.peek()[1] in ('=', '!='):
+            operator = self.take()[1]
+            left = (operator, left, self.parse_primary())
+        return left
+
+    def parse_primary(self):
+        kind, value = self.peek()
+        if kind == 'string':
+            self.take()
+            return ('literal', value[1:-1])
+        if kind == 'number':
+            self.take()
+            return ('number', float(value))
+        if value == '@':
+            self.take()
+            return ('attr', self.take()[1])
+        if value == '(':
+            self.take()
+            expression = self.parse_or()
+            self.take(')')
+            return expression
+        if value == '.':
+            self.take()
+            return ('string-value',)
+        if kind == 'name':
+            self.take()
+            if value in ('text()', 'position()', 'last()'):
+                return (value,)
+            if value.endswith('()'):
+                return ('call', value[:-2], [])
+            self.take('(')
+            arguments = []
+            if self.peek()[1] != ')':
+                arguments.append(self.parse_or())
+                while self.peek()[1] == ',':
+                    self.take(',')
+                    arguments.append(self.parse_or())
+            self.take(')')
+            return ('call', value, arguments)
+        raise FakeInvalidSelectorError(f"invalid xpath: {self.expression}")
+
+
+def evaluate_xpath(expression, context, document):
+    tree = XPathParser(expression).parse()
+    order = {id(node): index for index, node in enumerate(document.doc_node.iter_descendants())}
+    results = []
+    seen = set()
+    for path in tree[1]:
+        for node in evaluate_path(path, context, document):
+            if id(node) not in seen and not node.tag.startswith('#'):
+                seen.add(id(node))
+                results.append(node)
+    results.sort(key=lambda node: order.get(id(node), -1))
+    return results
+
+
+def evaluate_path(path, context, document):
+    _, absolute, steps = path
+    nodes = [document.doc_node] if absolute else [context]
+    for axis, test, predicates in steps:
+        next_nodes = []
+        seen = set()
+        for node in nodes:
+            candidates = [candidate for candidate in axis_nodes(axis, node)
+                          if test is None or candidate.tag == test]
+            if test is None and axis not in ('self', 'parent', 'descendant-or-self', 'ancestor-or-self'):
+                candidates = [candidate for candidate in candidates if not candidate.tag.startswith('#')]
+            for predicate in predicates:
+                size = len(candidates)
+                candidates = [candidate for index, candidate in enumerate(candidates)
+                              if predicate_true(predicate, candidate, index + 1, size)]
+            for candidate in candidates:
+                if id(candidate) not in seen:
+                    seen.add(id(candidate))
+                    next_nodes.append(candidate)
+        nodes = next_nodes
+    return nodes
+
+
+def axis_nodes(axis, node):
+    """按轴的顺序返回节点（反向轴由近及远）"""
+    if axis == 'child':
+        return list(node.children)
+    if axis == 'self':
+        return [node]
+    if axis == 'parent':
+        return [node.parent] if node.parent is not None else []
+    if axis == 'descendant':
+        return list(node.iter_descendants())
+    if axis == 'descendant-or-self':
+        return [node] + list(node.iter_descendants())
+    if axis == 'ancestor':
+        return list(node.ancestors())
+    if axis == 'ancestor-or-self':
+        return [node] + list(node.ancestors())
+    siblings = node.parent.children if node.parent is not None else [node]
+    index = siblings.index(node) if node in siblings else 0
+    if axis == 'following-sibling':
+        return siblings[index + 1:]
+    if axis == 'preceding-sibling':
+        return list(reversed(siblings[:index]))
+    raise FakeInvalidSelectorError(f"unsupported xpath axis: {axis}")
+
+
+def predicate_true(predicate, node, position, size):
+    value = evaluate_expression(predicate, node, position, size)
+    if isinstance(value, float):
+        return value == position
+    return to_boolean(value)
+
+
+def evaluate_expression(expression, node, position, size):
+    kind = expression[0]
+    if kind == 'literal':
+        return expression[1]
+    if kind == 'number':
+        return expression[1]
+    if kind == 'attr':
+        value = node.attrs.get(expression[1])
+        return [] if value is None else [value]
+    if kind == 'text()':
+        return [node.text] if node.text else []
+    if kind == 'string-value':
+        return [node.text_content()]
+    if kind == 'position()':
+        return float(position)
+    if kind == 'last()':
+        return float(size)
+    if kind in ('or', 'and'):
+        left = to_boolean(evaluate_expression(expression[1], node, position, size))
+        if kind == 'or' and left:
+            return True
+        if kind == 'and' and not left:
+            return False
+        return to_boolean(evaluate_expression(expression[2], node, position, size))
+    if kind in ('=', '!='):
+        left = evaluate_expression(expression[1], node, position, size)
+        right = evaluate_expression(expression[2], node, position, size)
+        left_values = left if isinstance(left, list) else [left]
+        right_values = right if isinstance(right, list) else [right]
+        pairs = [(a, b) for a in left_values for b in right_values]
+        if kind == '=':
+            return any(compare_values(a, b) for a, b in pairs)
+        return any(not compare_values(a, b) for a, b in pairs)
+    if kind == 'call':
+        name, arguments = expression[1], expression[2]
+        values = [evaluate_expression(argument, node, position, size) for argument in arguments]
+        if name == 'contains':
+            return to_string(values[1]) in to_string(values[0])
+        if name == 'starts-with':
+            return to_string(values[0]).startswith(to_string(values[1]))
+        if name == 'normalize-space':
+            text = to_string(values[0]) if values else node.text_content()
+            return ' '.join(text.split())
+        if name == 'not':
+            return not to_boolean(values[0])
+        if name == 'string':
+            return to_string(values[0]) if values else node.text_content()
+        raise FakeInvalidSelectorError(f"unsupported xpath function: {name}")
+    raise FakeInvalidSelectorError(f"unsupported xpath expression: {kind}")
+
+
+def compare_values(left, right):
+    if isinstance(left, float) or isinstance(right, float):
+        try:
+            return float(left) == float(right)
+        except (TypeError, ValueError):
+            return False
+    return str(left) == str(right)
+
+
+def to_string(value):
+    if isinstance(value, list):
+        return value[0] if value else ''
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return str(value)
+
+
+def to_boolean(value):
+    if isinstance(value, list):
+        return len(value) > 0
+    return bool(value)
+
+
+# ---------------------------------------------------------------- WebDriver
+
+class FakeWebElement:
+    """录制DOM节点的WebElement接口"""
+
+    def __init__(self, driver, node):
+        self.parent = driver
+        self._node = node
+
+    def __eq__(self, other):
+        return isinstance(other, FakeWebElement) and other.node is self.node
+
+    def __hash__(self):
+        return id(self._node)
+
+    def __repr__(self):
+        return f"<FakeWebElement {self._node!r}>"
+
+    @property
+    def node(self):
+        self._node = self.parent.document.resolve(self._node)
+        return self._node
+
+    @property
+    def id(self):
+        return f"fake-{id(self._node):x}"
+
+    @property
+    def text(self):
+        self.parent.count('text')
+        return self.node.inner_text().strip()
+
+    @property
+    def tag_name(self):
+        self.parent.count('tag_name')
+        return self.node.tag
+
+    @property
+    def location(self):
+        self.parent.count('location')
+        rect = self.node.get_rect()
+        return {'x': rect[0], 'y': rect[1]}
+
+    @property
+    def size(self):
+        self.parent.count('size')
+        rect = self.node.get_rect()
+        return {'width': rect[2], 'height': rect[3]}
+
+    @property
+    def rect(self):
+        self.parent.count('rect')
+        x, y, width, height = self.node.get_rect()
+        return {'x': x, 'y': y, 'width': width, 'height': height}
+
+    def get_attribute(self, name):
+        self.parent.count('get_attribute')
+        node = self.node
+        if name == 'textContent':
+            return node.text_content()
+        if name == 'innerText':
+            return node.inner_text()
+        if name in ('className', 'class'):
+            return node.attrs.get('class', '')
+        if name == 'tagName':
+            return node.tag.upper()
+        if name in ('outerHTML', 'innerHTML'):
+            return serialize_html(node, outer=(name == 'outerHTML'))
+        if name in ('disabled', 'hidden') and name in node.attrs:
+            return 'true'
+        return node.attrs.get(name)
+
+    def get_property(self, name):
+        return self.get_attribute(name)
+
+    def is_displayed(self):
+        self.parent.count('is_displayed')
+        return self.node.is_visible()
+
+    def is_enabled(self):
+        self.parent.count('is_enabled')
+        return 'disabled' not in self.node.attrs
+
+    def click(self):
+        self.parent.count('click')
+        node = self.node
+        if not node.is_visible():
+            raise FakeWebDriverError("element not interactable")
+        self.parent.document.click(node)
+
+    def send_keys(self, *values):
+        self.parent.count('send_keys')
+
+    def find_elements(self, by, value):
+        self.parent.count('find_elements')
+        return self.parent.locate(by, value, self.node)
+
+    def find_element(self, by, value):
+        self.parent.count('find_element')
+        elements = self.parent.locate(by, value, self.node)
+        if not elements:
+            raise FakeNoSuchElementError(f"no such element: {by}={value}")
+        return elements[0]
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.count('switch_to_window')
+        if handle not in self.driver.windows:
+            raise FakeWebDriverError("no such window")
+        self.driver.current_window_handle = handle
+
+    def new_window(self, type_hint=None):
+        self.driver.count('new_window')
+        self.driver.current_window_handle = self.driver.open_window('about:blank')
+
+
+class FakeWebDriver:
+    """按录制文件回放的WebDriver
+
+    Args:
+        recording: 录制文件路径或已加载的字典
+        disabled_scripts: 模拟为执行失败的脚本列表（用于测量回退路径）
+    """
+
+    def __init__(self, recording, disabled_scripts=()):
+        if not isinstance(recording, dict):
+            with open(recording, 'r', encoding='utf-8') as f:
+                recording = json.load(f)
+        self.recording = recording
+        self.windows = {}  # 标签页句柄 -> FakeDocument（每个标签页独立回放录制文件）
+        self.navigations = Counter()  # 标签页句柄 -> 导航次数（模拟JS堆随页面数增长）
+        self.window_counter = 0
+        self.current_window_handle = self.open_window(recording.get('url', 'about:blank'))
+        self.switch_to = FakeSwitchTo(self)
+        self.wire_calls = Counter()
+        self.disabled_scripts = {normalize_script(script) for script in disabled_scripts}
+        self.ai_button_candidates = []
+        self.quit_called = False
+        self.capabilities = {'browserName': 'replay', 'browserVersion': str(recording.get('version', 1))}
+
+        conditions = {
+            bse.PAGE_READY_CONDITION: self.condition_page_ready,
+            bse.NAVIGATED_PAGE_READY_CONDITION: self.condition_navigated_page_ready,
+            bse.ELEMENT_IN_VIEW_CONDITION: lambda args: True,
+            bse.VISIBLE_TEXT_CONDITION: self.condition_visible_text,
+            bse.SUBTITLE_TAB_ACTIVE_CONDITION: self.condition_subtitle_tab_active,
+            bse.PANEL_SUBTITLE_TAB_ACTIVE_CONDITION: self.condition_panel_subtitle_tab_active,
+            bse.SUBTITLE_ROWS_READY_CONDITION: self.condition_subtitle_rows_ready,
+            bse.AI_PANEL_VISIBLE_CONDITION: self.condition_ai_panel_visible,
+            bse.DOM_QUIET_CONDITION: lambda args: True,
+        }
+        self.conditions = {normalize_script(body): handler for body, handler in conditions.items()}
+
+        scripts = {
+            bse.AI_SUBTITLE_HARVEST_JS: self.js_harvest,
+            bse.LAYOUT_FINGERPRINT_JS: self.js_layout_fingerprint,
+            bse.AI_BUTTON_FEATURES_JS: self.js_ai_button_features,
+            bse.SUBTITLE_TAB_CLICK_JS: self.js_subtitle_tab_click,
+            bse.AI_PANEL_TABS_JS: self.js_panel_tabs,
+            bse.AI_SUMMARY_HARVEST_JS: self.js_summary_harvest,
+            bse.SCROLL_STEP_JS: self.js_scroll_step,
+            bse.PAGE_STATE_JS: self.js_page_state,
+            bse.PAGE_ACCESS_JS: self.js_page_access,
+            bse.DIAGNOSTIC_SNAPSHOT_JS: self.js_diagnostic_snapshot,
+            bse.AI_BUTTON_TAKE_JS: self.js_take_ai_button,
+            bse.AI_BUTTON_RELEASE_JS: self.js_release_ai_buttons,
+            "return window.innerWidth;": lambda: self.document.window['width'],
+            "return document.readyState": lambda: 'complete',
+            "window.focus();": lambda: None,
+            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})": lambda: None,
+            "arguments[0].click();": self.js_click,
+            "arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();": self.js_click,
+            "arguments[0].scrollIntoView({block: 'center'});": lambda element: None,
+            """
+                arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});
+                arguments[0].style.border = '2px solid red';
+            """: lambda element: None,
+            "arguments[0].scrollTop += 500;": lambda element: self.scroll_by(element, 500),
+            "arguments[0].scrollBy(0, 500);": lambda element: self.scroll_by(element, 500),
+            "arguments[0].scrollTop = arguments[0].scrollHeight;": lambda element: self.scroll_by(element, 10 ** 9),
+            "window.scrollBy(0, 300);": lambda: None,
+            "window.location.href = arguments[0];": lambda url: self.get(url),
+        }
+        self.scripts = {normalize_script(script): handler for script, handler in scripts.items()}
+
+    # ---- 调用统计 ----
+
+    def count(self, command):
+        self.wire_calls[command] += 1
+
+    def reset_wire_calls(self):
+        self.wire_calls = Counter()
+
+    @property
+    def wire_call_total(self):
+        return sum(self.wire_calls.values())
+
+    # ---- 页面与标签页 ----
+
+    @property
+    def document(self):
+        document = self.windows.get(self.current_window_handle)
+        if document is None:
+            raise FakeWebDriverError("no such window: 当前标签页已关闭")
+        return document
+
+    @property
+    def window_handles(self):
+        self.count('window_handles')
+        return list(self.windows)
+
+    def open_window(self, url):
+        """新建标签页（不切换），返回句柄"""
+        self.window_counter += 1
+        handle = f'fake-window-{self.window_counter}'
+        document = FakeDocument(self.recording)
+        document.url = url
+        self.windows[handle] = document
+        return handle
+
+    def get(self, url):
+        self.count('get')
+        document = FakeDocument(self.recording)
+        document.url = url
+        self.windows[self.current_window_handle] = document
+        self.navigations[self.current_window_handle] += 1
+
+    @property
+    def current_url(self):
+        self.count('current_url')
+        return self.document.url
+
+    @property
+    def title(self):
+        self.count('title')
+        return self.document.title
+
+    @property
+    def page_source(self):
+        self.count('page_source')
+        return serialize_html(self.document.root, outer=True)
+
+    def get_window_size(self):
+        self.count('get_window_size')
+        return {'width': self.document.window['width'], 'height': self.document.window['height']}
+
+    def maximize_window(self):
+        self.count('maximize_window')
+
+    def set_script_timeout(self, seconds):
+        self.count('set_script_timeout')
+
+    def get_log(self, log_type):
+        raise FakeWebDriverError("模拟驱动不提供性能日志")
+
+    def get_screenshot_as_base64(self):
+        self.count('screenshot')
+        raise FakeWebDriverError("模拟驱动不支持截图")
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        # 只模拟性能指标：标签页JS堆按 24MB + 每次导航 9MB 增长（旧页面未完全释放）
+        self.count('execute_cdp_cmd')
+        if cmd == 'Performance.enable':
+            return {}
+        if cmd == 'Performance.getMetrics':
+            navigations = self.navigations[self.current_window_handle]
+            return {'metrics': [
+                {'name': 'JSHeapTotalSize', 'value': (24 + 9 * navigations) * 1048576},
+                {'name': 'JSHeapUsedSize', 'value': (16 + 7 * navigations) * 1048576},
+                {'name': 'Nodes', 'value': sum(1 for _ in self.document.all_nodes())},
+                {'name': 'Documents', 'value': navigations},
+            ]}
+        raise FakeWebDriverError("模拟驱动不支持DevTools命令")
+
+    def close(self):
+        self.count('close')
+        self.windows.pop(self.current_window_handle, None)
+
+    def quit(self):
+        self.count('quit')
+        self.quit_called = True
+
+    # ---- 元素定位 ----
+
+    def element(self, node):
+        return FakeWebElement(self, node) if node is not None else None
+
+    def locate(self, by, value, root=None):
+        document = self.document
+        if by == BY_XPATH:
+            nodes = evaluate_xpath(value, root if root is not None else document.doc_node, document)
+        elif by == BY_CSS_SELECTOR:
+            nodes = document.query_selector_all(value, root)
+        elif by == BY_TAG_NAME:
+            nodes = document.query_selector_all(value, root)
+        elif by == BY_CLASS_NAME:
+            nodes = document.query_selector_all('.' + value, root)
+        elif by == BY_ID:
+            nodes = document.query_selector_all('#' + value, root)
+        else:
+            raise FakeInvalidSelectorError(f"unsupported locator: {by}")
+        return [FakeWebElement(self, node) for node in nodes]
+
+    def find_elements(self, by, value):
+        self.count('find_elements')
+        return self.locate(by, value)
+
+    def find_element(self, by, value):
+        self.count('find_element')
+        elements = self.locate(by, value)
+        if not elements:
+            raise FakeNoSuchElementError(f"no such element: {by}={value}")
+        return elements[0]
+
+    # ---- 脚本 ----
+
+    def execute_script(self, script, *args):
+        self.count('execute_script')
+        key = normalize_script(script)
+        if key in self.disabled_scripts:
+            raise FakeWebDriverError("javascript error: 脚本已在回放中禁用")
+        handler = self.scripts.get(key)
+        if handler is not None:
+            return handler(*args)
+        condition = self.match_condition_wrapper(script)
+        if condition is not None:
+            return condition(args[0] if args else [])
+        raise FakeWebDriverError(f"javascript error: 模拟驱动未实现该脚本: {key[:60]}")
+
+    def execute_async_script(self, script, *args):
+        self.count('execute_async_script')
+        key = normalize_script(script)
+        if key in self.disabled_scripts:
+            raise FakeWebDriverError("javascript error: 脚本已在回放中禁用")
+        if script is bse.WAIT_FOR_CONDITION_JS or key == normalize_script(bse.WAIT_FOR_CONDITION_JS):
+            # 回放页面在操作之间保持不变，条件的结果即为等待结束时的结果
+            condition = self.conditions.get(normalize_script(args[0]))
+            if condition is None:
+                raise FakeWebDriverError("javascript error: 模拟驱动未实现该等待条件")
+            return condition(args[2] if len(args) > 2 else [])
+        if script is bse.WAIT_FOR_DOM_QUIET_JS or key == normalize_script(bse.WAIT_FOR_DOM_QUIET_JS):
+            return False
+        raise FakeWebDriverError(f"javascript error: 模拟驱动未实现该异步脚本: {key[:60]}")
+
+    def match_condition_wrapper(self, script):
+        """识别 check_condition 的单次检查包装（含多标签页模式的地址前缀）"""
+        match = re.match(r'return \(function\(args\) \{ (.*) \}\)\(arguments\[0\]\);$', script, re.S)
+        if not match:
+            return None
+        body = match.group(1)
+        prefix = "if (location.href.indexOf(args[0]) === -1) { return false; }"
+        url_check = body.startswith(prefix)
+        if url_check:
+            body = body[len(prefix):]
+        condition = self.conditions.get(normalize_script(body))
+        if condition is None:
+            return None
+        if url_check:
+            return lambda args: args[0] in self.document.url and condition(args)
+        return condition
+
+    def node_of(self, element):
+        if not isinstance(element, FakeWebElement):
+            raise FakeWebDriverError("javascript error: 参数不是元素")
+        return element.node
+
+    def js_click(self, element):
+        self.document.click(self.node_of(element))
+
+    def scroll_by(self, element, delta):
+        node = self.node_of(element)
+        self.document.set_scroll_top(node, node.scroll_top + delta)
+
+    def js_layout_fingerprint(self, root_selectors):
+        pattern = re.compile(r'(?:^|\s)_[A-Za-z][A-Za-z0-9]*_([a-z0-9]{5})_\d+(?=\s|$)')
+        roots = []
+        for selector in root_selectors:
+            try:
+                found = self.document.query_selector_all(selector)
+            except FakeInvalidSelectorError:
+                continue
+            roots.extend(node for node in found if node not in roots)
+        hashes = set()
+        for root in roots:
+            for node in [root] + list(root.iter_descendants()):
+                hashes.update(pattern.findall(node.attrs.get('class') or ''))
+        return sorted(hashes)
+
+    def js_ai_button_features(self, selectors):
+        elements, index, groups = [], {}, []
+        for selector in selectors:
+            try:
+                found = self.document.query_selector_all(selector)
+            except FakeInvalidSelectorError:
+                groups.append(None)
+                continue
+            ids = []
+            for node in found:
+                if id(node) not in index:
+                    index[id(node)] = len(elements)
+                    elements.append(node)
+                ids.append(index[id(node)])
+            groups.append(ids)
+        self.ai_button_candidates = elements
+        window_width = self.document.window['width']
+        features = []
+        for node in elements:
+            x, y, width, height = node.get_rect()
+            parent = node.parent if node.parent is not None and not node.parent.tag.startswith('#') else None
+            grandparent = parent.parent if parent is not None and parent.parent is not None else None
+            features.append({
+                'text': node.text_content().strip()[:100],
+                'class_name': node.attrs.get('class', ''),
+                'tag_name': node.tag,
+                'title': node.attrs.get('title', ''),
+                'aria_label': node.attrs.get('aria-label', ''),
+                'href': node.attrs.get('href', ''),
+                'data_name': node.attrs.get('data-name', ''),
+                'onclick': node.attrs.get('onclick', ''),
+                'role': node.attrs.get('role', ''),
+                'x': x,
+                'y': y,
+                'width': width,
+                'height': height,
+                'window_width': window_width,
+                'parent_classes': [(parent.attrs.get('class', '') if parent else ''),
+                                   (grandparent.attrs.get('class', '') if grandparent else '')],
+                'displayed': width > 0 and height > 0 and node.is_visible(),
+                'enabled': 'disabled' not in node.attrs
+            })
+        return {'groups': groups, 'features': [copy.deepcopy(feature) for feature in features]}
+
+    def js_take_ai_button(self, index):
+        candidates, self.ai_button_candidates = self.ai_button_candidates, []
+        return self.element(candidates[index]) if index < len(candidates) else None
+
+    def js_release_ai_buttons(self):
+        self.ai_button_candidates = []
+
+    def js_page_state(self, selectors):
+        state = self.recording['states'][self.document.state].get('page_state')
+        return copy.deepcopy(state) if state else {'video': None, 'subtitles': None}
+
+    def js_page_access(self):
+        # 录制时浏览器已登录；录制文件可用 logged_in: false 模拟未登录
+        return {'ready': self.condition_page_ready(()), 'loggedIn': self.recording.get('logged_in', True),
+                'blocked': False}
+
+    def js_diagnostic_snapshot(self, max_chars):
+        document = self.document
+        html = serialize_html(document.root, outer=True)
+        window_width = document.window['width']
+        right = []
+        for node in document.all_nodes():
+            x, y, width, height = node.get_rect()
+            if x > window_width * 0.6 and width > 100 and height > 100 and len(right) < 50:
+                right.append({'tag': node.tag, 'className': node.attrs.get('class', '')[:100],
+                              'left': round(x), 'top': round(y), 'width': round(width), 'height': round(height),
+                              'text': node.text_content().strip()[:50]})
+        return {
+            'url': document.url, 'title': document.title,
+            'window': {'width': window_width, 'height': document.window['height']},
+            'htmlLength': len(html), 'html': html[:max_chars],
+            'text': document.root.inner_text()[:max_chars // 10],
+            'rightElements': right
+        }
+
+    def js_subtitle_tab_click(self):
+        for node in self.visible_text_nodes('字幕列表', tags=('div', 'span')):
+            self.document.click(node)
+            return True
+        return False
+
+    def js_summary_harvest(self, panel_selectors):
+        """AI_SUMMARY_HARVEST_JS 的等价实现"""
+        state = self.js_panel_tabs(panel_selectors, [], False)
+        if not state['found'] or not state['tabs'].get('视频总结', {}).get('active'):
+            return None
+        panel, _ = self.find_ai_panel(panel_selectors, ['视频总结'])
+        return {'text': panel.inner_text()}
+
+    def find_ai_panel(self, panel_selectors, tab_names):
+        """AI_PANEL_TABS_FUNCTION 中 findAiPanel 的等价实现，返回 (面板节点, 选择器)"""
+        for selector in panel_selectors:
+            try:
+                candidates = self.document.query(selector)
+            except FakeInvalidSelectorError:
+                continue
+            for node in candidates:
+                text = node.text_content()
+                if node.is_visible() and any(name in text for name in tab_names):
+                    return node, selector
+        return None, None
+
+    def js_panel_tabs(self, panel_selectors, item_selectors, activate):
+        """AI_PANEL_TABS_FUNCTION 的等价实现"""
+        document = self.document
+        tab_names = ['字幕列表', '视频总结']
+        state = {'found': False, 'selector': None, 'tabs': {}, 'rows': 0, 'clicked': False}
+        panel, state['selector'] = self.find_ai_panel(panel_selectors, tab_names)
+        if panel is None:
+            return state
+        state['found'] = True
+
+        tabs = {}
+        for node in panel.iter_descendants():
+            if node.tag not in ('div', 'span', 'button', 'li', 'a'):
+                continue
+            text = node.text.strip()
+            for name in tab_names:
+                if name not in text or len(text) > len(name) + 10 or not node.is_visible():
+                    continue
+                if name not in tabs or (text == name and tabs[name].text.strip() != name):
+                    tabs[name] = node
+        for name, node in tabs.items():
+            classes = node.attrs.get('class', '') + ' ' + (node.parent.attrs.get('class', '') if node.parent else '')
+            state['tabs'][name] = {'active': bool(re.search(r'active|selected', classes, re.I)), 'text': node.text.strip()}
+
+        for selector in item_selectors:
+            try:
+                items = document.query(selector, panel)
+            except FakeInvalidSelectorError:
+                continue
+            state['rows'] = sum(1 for item in items if item.is_visible() and re.search(r'\d{1,2}:\d{2}', item.text_content()))
+            if state['rows']:
+                break
+
+        if activate and '字幕列表' in tabs and not state['tabs']['字幕列表']['active']:
+            document.click(tabs['字幕列表'])
+            state['clicked'] = True
+        return state
+
+    def js_scroll_step(self, element, ratio):
+        node = self.node_of(element)
+        document = self.document
+        before = node.scroll_top
+        at_end = before + node.client_height() >= document.scroll_height(node) - 1
+        document.set_scroll_top(node, before + node.client_height() * ratio)
+        return {'atEnd': at_end, 'scrolled': node.scroll_top != before}
+
+    def js_harvest(self, config):
+        """AI_SUBTITLE_HARVEST_JS 的等价实现"""
+        document = self.document
+        result = {'found': False, 'rows': [], 'selectors': {}, 'scrollTop': 0, 'clientHeight': 0,
+                  'scrollHeight': 0, 'scrolled': False, 'atEnd': False}
+
+        def query_all(root, selector):
+            try:
+                return document.query(selector, root)
+            except FakeInvalidSelectorError:
+                return []
+
+        def first_visible(root, selectors):
+            for selector in selectors:
+                for node in query_all(root, selector):
+                    if node.is_visible():
+                        return node, selector
+            return None, None
+
+        panel = None
+        for selector in config['panel']:
+            for node in query_all(None, selector):
+                if node.is_visible() and '字幕列表' in node.text_content():
+                    panel = node
+                    result['selectors']['panel'] = selector
+                    break
+            if panel is not None:
+                break
+        if panel is None:
+            return result
+        result['found'] = True
+
+        container, result['selectors']['container'] = first_visible(panel, config['container'])
+        container = container or panel
+        scroller, result['selectors']['scroll'] = first_visible(panel, config['scroll'])
+        scroller = scroller or container
+
+        items = []
+        for selector in config['item']:
+            found = []
+            for node in query_all(container, selector):
+                if not node.is_visible():
+                    continue
+                text = node.inner_text().strip()
+                if (text and '选集' not in text and 'P' not in text) or ':' in text:
+                    found.append(node)
+            if found:
+                items = found
+                result['selectors']['item'] = selector
+                break
+
+        def first_text(item, selectors):
+            for selector in selectors:
+                match = query_all(item, selector)
+                if match:
+                    return match[0].inner_text().strip()
+            return ''
+
+        for item in items:
+            time_text = first_text(item, config['time'])
+            content_text = first_text(item, config['content'])
+            if not content_text:
+                item_text = item.inner_text().strip()
+                content_text = item_text.replace(time_text, '', 1).strip() if time_text and time_text in item_text else item_text
+            if time_text and content_text and len(content_text) > 1:
+                result['rows'].append({'time': time_text, 'content': content_text})
+
+        before = scroller.scroll_top
+        result['atEnd'] = before + scroller.client_height() >= document.scroll_height(scroller) - 1
+        if config.get('scroll_ratio', 0) > 0:
+            document.set_scroll_top(scroller, before + scroller.client_height() * config['scroll_ratio'])
+        result['scrolled'] = scroller.scroll_top != before
+        result['container'] = self.element(container)
+        result['scrollTop'] = scroller.scroll_top
+        result['clientHeight'] = scroller.client_height()
+        result['scrollHeight'] = document.scroll_height(scroller)
+        return result
+
+    # ---- 等待条件 ----
+
+    def visible_text_nodes(self, text, tags=None):
+        for node in self.document.all_nodes():
+            if (tags is None or node.tag in tags) and text in node.text and node.is_visible():
+                yield node
+
+    def condition_page_ready(self, args):
+        return bool(self.document.query_selector('.video-toolbar-right, .video-toolbar, [class*="video-toolbar"]'))
+
+    def condition_navigated_page_ready(self, args):
+        return args[0] in self.document.url and self.condition_page_ready(args)
+
+    def condition_visible_text(self, args):
+        texts, minimum = args[0], args[1]
+        found = sum(1 for text in texts if next(self.visible_text_nodes(text), None) is not None)
+        return found >= minimum
+
+    def condition_subtitle_tab_active(self, args):
+        for node in self.visible_text_nodes('字幕列表', tags=('div', 'span')):
+            classes = node.attrs.get('class', '') + ' ' + (node.parent.attrs.get('class', '') if node.parent else '')
+            if re.search(r'active|selected', classes, re.I):
+                return True
+        return False
+
+    def condition_panel_subtitle_tab_active(self, args):
+        tab = self.js_panel_tabs(args[0], [], False)['tabs'].get('字幕列表')
+        return bool(tab and tab['active'])
+
+    def condition_subtitle_rows_ready(self, args):
+        for selector in args[0]:
+            if selector.startswith('//'):
+                continue
+            for panel in self.document.query_selector_all(selector):
+                if '字幕列表' not in panel.text_content():
+                    continue
+                for item_selector in args[1]:
+                    try:
+                        if self.document.query_selector(item_selector, panel) is not None:
+                            return True
+                    except FakeInvalidSelectorError:
+                        continue
+        return False
+
+    def condition_ai_panel_visible(self, args):
+        keywords = ['AI小助手', '视频总结', '字幕列表', 'AI', '总结', '小助手', '智能', 'assistant', 'summary']
+        window_width = self.document.window['width']
+        for selector in args[0]:
+            for node in self.document.query_selector_all(selector):
+                x, y, width, height = node.get_rect()
+                text = node.text_content()
+                if width < 300 or height < 400 or len(text.strip()) <= 100:
+                    continue
+                has_ai_content = any(keyword in text for keyword in keywords)
+                is_right_side = x > window_width * 0.5
+                has_tabs = self.document.query_selector("[class*='tab'], [class*='Tab']", node) is not None
+                if (is_right_side or has_ai_content) and (has_ai_content or has_tabs):
+                    return True
+        return False
+
+
+def normalize_script(script):
+    return ' '.join((script or '').split())
+
+
+def serialize_html(node, outer=True):
+    children = ''.join(serialize_html(child) for child in node.children)
+    inner = escape_html(node.text) + children
+    if not outer:
+        return inner
+    attrs = ''.join(f' {name}="{escape_html(value)}"' for name, value in node.attrs.items())
+    return f'<{node.tag}{attrs}>{inner}</{node.tag}>'
+
+
+def escape_html(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+# ---------------------------------------------------------------- 录制
+
+def record_ai_page(extractor, bvid, output_file):
+    """连接调试模式Edge，依次录制视频页、视频总结页、字幕列表页并保存为回放文件"""
+    driver = extractor.create_edge_driver()
+    try:
+        video_url = f"https://www.bilibili.com/video/{bvid}"
+        print(f"📺 访问视频页面: {video_url}")
+        driver.get(video_url)
+        extractor.wait_for_condition(driver, bse.PAGE_READY_CONDITION, extractor.step_timeouts['page_load'], '页面加载')
+
+        ai_button = extractor.find_ai_assistant_button_enhanced(driver, None)
+        if not ai_button:
+            raise FakeWebDriverError("未找到AI小助手按钮，无法录制")
+        driver.execute_script(TAG_ELEMENT_JS, ai_button, 'ai-button')
+        states = {'video': driver.execute_script(RECORD_DOM_JS)}
+        print("📸 已录制: 视频页")
+
+        if not extractor.click_ai_assistant_enhanced(driver, ai_button):
+            raise FakeWebDriverError("AI小助手按钮点击失败，无法录制")
+        extractor.wait_for_condition(driver, bse.VISIBLE_TEXT_CONDITION, extractor.step_timeouts['panel_render'],
+                                     'AI面板标签页渲染', args=[['字幕列表'], 1])
+        driver.execute_script(TAG_PANEL_TABS_JS)
+        states['summary'] = driver.execute_script(RECORD_DOM_JS)
+        print("📸 已录制: 视频总结页")
+
+        if not extractor.ensure_subtitle_tab_active(driver):
+            raise FakeWebDriverError("无法切换到字幕列表标签页，无法录制")
+        extractor.wait_for_condition(driver, bse.SUBTITLE_ROWS_READY_CONDITION, extractor.step_timeouts['tab_switch'],
+                                     '字幕列表渲染', args=[bse.AI_PANEL_SELECTORS, bse.SUBTITLE_ITEM_SELECTORS])
+        driver.execute_script(TAG_PANEL_TABS_JS)
+        config = extractor.build_harvest_config('default')
+        probe = driver.execute_script(bse.AI_SUBTITLE_HARVEST_JS, dict(config, scroll_ratio=0))
+        states['subtitles'] = driver.execute_script(RECORD_DOM_JS)
+        print("📸 已录制: 字幕列表页")
+
+        rows = extractor.harvest_subtitles_in_page(driver) or []
+        states['subtitles']['virtual_list'] = build_virtual_list(states['subtitles']['dom'], probe, rows)
+    finally:
+        extractor.close_edge_driver(driver)
+
+    first = states['video']
+    recording = {
+        'url': first['url'],
+        'title': first['title'],
+        'window': first['window'],
+        'initial_state': 'video',
+        'states': {name: {key: value for key, value in state.items() if key in ('dom', 'virtual_list')}
+                   for name, state in states.items()},
+        'transitions': [
+            {'from': 'video', 'click': "[data-replay-ref='ai-button']", 'to': 'summary'},
+            {'from': 'summary', 'click': "[data-replay-ref='tab-subtitles']", 'to': 'subtitles'},
+            {'from': 'subtitles', 'click': "[data-replay-ref='tab-summary']", 'to': 'summary'},
+        ]
+    }
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(recording, f, ensure_ascii=False, indent=1)
+    print(f"✅ 录制完成: {output_file}（{len(rows)} 条字幕）")
+    return recording
+
+
+def build_virtual_list(dom, probe, rows):
+    """根据录制的字幕列表页和采集结果生成虚拟列表配置：首行作为行模板，字幕行全部保存"""
+    selectors = (probe or {}).get('selectors') or {}
+    if not rows or not selectors.get('item'):
+        return None
+    document = FakeDocument({'states': {'page': {'dom': dom}}})
+    scroller_selector = selectors.get('scroll') or selectors.get('container')
+    list_selector = selectors.get('container') or scroller_selector
+    container = document.query_selector(list_selector)
+    items = document.query(selectors['item'], container)
+    if container is None or not items:
+        return None
+
+    first = items[0]
+    row_height = (items[1].get_rect()[1] - first.get_rect()[1]) if len(items) > 1 else first.get_rect()[3]
+    origin_x, origin_y = first.get_rect()[0], first.get_rect()[1]
+    first_row = (probe.get('rows') or rows)[0]
+
+    def to_template(node):
+        data = {'tag': node.tag}
+        if node.attrs:
+            data['attrs'] = dict(node.attrs)
+        if node.text:
+            data['text'] = node.text.replace(first_row['time'], '{time}').replace(first_row['content'], '{content}')
+        if node.rect:
+            data['rect'] = [node.rect[0] - origin_x, node.rect[1] - origin_y, node.rect[2], node.rect[3]]
+        if node.children:
+            data['children'] = [to_template(child) for child in node.children]
+        return data
+
+    # 列表容器的子元素由回放时按滚动位置生成
+    container.children = []
+    return {
+        'scroller': scroller_selector,
+        'list': list_selector,
+        'row_height': max(row_height, 1),
+        'overscan': 2,
+        'row_template': to_template(first),
+        'rows': rows
+    }
+
+
+# ---------------------------------------------------------------- 基准测试
+
+def run_step(name, repeat, setup, action, check=None):
+    """重复执行一个步骤，返回耗时中位数、WebDriver调用次数和校验结果"""
+    durations, calls, result = [], None, None
+    for _ in range(repeat):
+        driver = setup()
+        driver.reset_wire_calls()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = action(driver)
+        durations.append(time.perf_counter() - start)
+        calls = driver.wire_calls
+    return {
+        'step': name,
+        'ms': statistics.median(durations) * 1000,
+        'wire_calls': sum(calls.values()),
+        'top_calls': calls.most_common(3),
+        'check': check(result) if check else ''
+    }
+
+
+def benchmark(recording_file, repeat=5):
+    """在录制文件上测量AI流程各步骤的耗时与WebDriver调用次数"""
+    with open(recording_file, 'r', encoding='utf-8') as f:
+        recording = json.load(f)
+    subtitle_state = next((name for name, state in recording['states'].items() if state.get('virtual_list')), None)
+    expected_rows = len(recording['states'][subtitle_state]['virtual_list']['rows']) if subtitle_state else 0
+    # 各步骤的输出目录都建在临时目录下，测量结束后一并删除
+    with tempfile.TemporaryDirectory(prefix='replay_') as output_dir:
+
+        def new_extractor():
+            # 每次使用独立的输出目录，选择器缓存从空开始（测量首次访问的路径）
+            return bse.BilibiliSubtitleExtractor(tempfile.mkdtemp(dir=output_dir))
+
+        def driver_in(state, disabled=()):
+            def setup():
+                driver = FakeWebDriver(recording, disabled_scripts=disabled)
+                if state:
+                    driver.document.load_state(state)
+                return driver
+            return setup
+
+        def rows_check(entries):
+            count = len(entries[0]['body']) if entries and isinstance(entries[0], dict) and 'body' in entries[0] else len(entries or [])
+            return f"{count}/{expected_rows} 行"
+
+        def full_flow(driver):
+            extractor = new_extractor()
+            extractor.acquire_edge_driver = lambda capture_network=False: (driver, False)
+            extractor.release_edge_driver = lambda released, pooled: released.quit()
+            return extractor.get_ai_subtitle_with_edge('BVREPLAY')
+
+        def long_batch_flow(driver, videos=120):
+            # 会话池保持一个会话连续处理多个视频，按默认回收策略换标签页
+            extractor = new_extractor()
+            extractor.create_edge_driver = lambda capture_network=False, port=None: driver
+            extractor.close_edge_driver = lambda closed: closed.quit()
+            pool = extractor.enable_browser_pool(size=1, warm_up=False)
+            done = sum(1 for i in range(videos) if extractor.get_ai_subtitle_with_edge(f'BVREPLAY{i}'))
+            return done, videos, pool.monitor
+
+        def long_batch_check(result):
+            done, videos, monitor = result
+            return f"{done}/{videos} 换标签页{monitor.stats['tab_recycles']}次 堆峰值{monitor.stats['peak_heap_mb']:.0f}MB"
+
+        def summary_flow(driver):
+            extractor = new_extractor()
+            extractor.include_summary = True
+            extractor.acquire_edge_driver = lambda capture_network=False: (driver, False)
+            extractor.release_edge_driver = lambda released, pooled: released.quit()
+            return extractor.get_ai_subtitle_with_edge('BVREPLAY')
+
+        def summary_check(entries):
+            ai_summary = entries[0].get('ai_summary') if entries else None
+            outline = ai_summary['outline'] if ai_summary else []
+            return f"{rows_check(entries)} 总结{len(outline)}段" if ai_summary else f"{rows_check(entries)} 无总结"
+
+        def pipelined_flow(driver):
+            extractor = new_extractor()
+            extractor.acquire_edge_driver = lambda capture_network=False: (driver, False)
+            extractor.release_edge_driver = lambda released, pooled: released.quit()
+            return extractor.get_ai_subtitles_pipelined(['BVREPLAY1', 'BVREPLAY2', 'BVREPLAY3'])
+
+        def multi_tab_flow(driver):
+            extractor = new_extractor()
+            extractor.acquire_edge_driver = lambda capture_network=False: (driver, False)
+            extractor.release_edge_driver = lambda released, pooled: released.quit()
+            return extractor.get_ai_subtitles_multi_tab(['BVREPLAY1', 'BVREPLAY2', 'BVREPLAY3'], tabs=2)
+
+        def pipelined_check(results):
+            done = sum(1 for entries in results.values() if entries)
+            return f"{done}/{len(results)} 个视频"
+
+        results = [
+            run_step('查找AI按钮（批量特征）', repeat, driver_in(None),
+                     lambda driver: new_extractor().find_ai_assistant_button_enhanced(driver, None),
+                     lambda element: '找到' if element else '未找到'),
+            run_step('查找AI按钮（逐元素回退）', repeat, driver_in(None, [bse.AI_BUTTON_FEATURES_JS]),
+                     lambda driver: new_extractor().find_ai_assistant_button_enhanced(driver, None),
+                     lambda element: '找到' if element else '未找到'),
+        ]
+        if subtitle_state:
+            results += [
+                run_step('检查字幕列表标签', repeat, driver_in(subtitle_state),
+                         lambda driver: new_extractor().check_if_on_subtitle_tab(driver), str),
+                run_step('检查字幕列表标签（逐元素回退）', repeat, driver_in(subtitle_state, [bse.AI_PANEL_TABS_JS]),
+                         lambda driver: new_extractor().check_if_on_subtitle_tab(driver), str),
+                run_step('页面内采集', repeat, driver_in(subtitle_state),
+                         lambda driver: new_extractor().harvest_subtitles_in_page(driver), rows_check),
+                run_step('逐元素采集（回退路径）', repeat, driver_in(subtitle_state),
+                         lambda driver: new_extractor().extract_subtitles_by_elements(driver), rows_check),
+            ]
+        tab_state = next((item['from'] for item in recording.get('transitions') or []
+                          if item['to'] == subtitle_state and item['from'] != 'video'), None)
+        if tab_state:
+            results.append(run_step('切换到字幕列表标签', repeat, driver_in(tab_state),
+                                    lambda driver: new_extractor().ensure_subtitle_tab_active(driver), str))
+            results.append(run_step('读取AI总结', repeat, driver_in(tab_state),
+                                    lambda driver: new_extractor().harvest_summary_in_page(driver),
+                                    lambda ai_summary: f"{len(ai_summary['outline'])} 段" if ai_summary else '无'))
+        results.append(run_step('完整AI流程', repeat, driver_in(None), full_flow, rows_check))
+        results.append(run_step('完整AI流程（含总结）', repeat, driver_in(None), summary_flow, summary_check))
+        results.append(run_step('会话池长批量（120个视频）', 1, driver_in(None), long_batch_flow, long_batch_check))
+        results.append(run_step('多标签页（3个视频）', repeat, driver_in(None), multi_tab_flow, pipelined_check))
+        results.append(run_step('流水线批量（3个视频）', repeat, driver_in(None), pipelined_flow, pipelined_check))
+
+        print(f"📼 回放: {recording_file}（重复 {repeat} 次，耗时取中位数）")
+        print(f"{'步骤':<22}{'耗时(ms)':>10}{'调用次数':>10}  {'结果':<12}主要调用")
+        for item in results:
+            top = ', '.join(f"{name}×{count}" for name, count in item['top_calls'])
+            print(f"{item['step']:<22}{item['ms']:>10.1f}{item['wire_calls']:>10}  {item['check']:<12}{top}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI字幕流程离线回放与录制')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench_parser = subparsers.add_parser('bench', help='在录制文件上测量各步骤耗时与WebDriver调用次数')
+    bench_parser.add_argument('recording', help='录制文件路径')
+    bench_parser.add_argument('--repeat', type=int, default=5, help='每个步骤的重复次数 (默认: 5)')
+    bench_parser.add_argument('--json', help='将结果另存为JSON文件')
+    record_parser = subparsers.add_parser('record', help='连接调试模式Edge录制视频页的AI面板')
+    record_parser.add_argument('bvid', help='视频BV号')
+    record_parser.add_argument('output', help='录制文件保存路径')
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        results = benchmark(args.recording, args.repeat)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    else:
+        with tempfile.TemporaryDirectory(prefix='record_') as output_dir:
+            record_ai_page(bse.BilibiliSubtitleExtractor(output_dir), args.bvid, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -36,7 +36,7 @@ import queue
 from tkinter import font
 
 # 导入主要的提取器类
-from bilibili_subtitle_extractor import BilibiliSubtitleExtractor
+from bilibili_subtitle_extractor import BilibiliSubtitleExtractor, ChromiumBrowser
 
 # 版本信息
 __version__ = "2.0.0"
@@ -464,14 +464,19 @@ class ModernSubtitleExtractorGUI:
                 import subprocess
                 import os
                 import time
+                import socket
                 
-                # 先关闭所有Edge进程，然后启动调试模式
-                try:
-                    subprocess.run('taskkill /f /im msedge.exe', shell=True, capture_output=True)
-                    time.sleep(2)  # 等待进程完全关闭
-                    self.log_output("🔄 已关闭所有Edge进程")
-                except:
-                    pass
+                def debug_port_open():
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    try:
+                        return sock.connect_ex(('127.0.0.1', 9222)) == 0
+                    finally:
+                        sock.close()
+                
+                # 调试端口已开启时直接使用，不关闭用户正在使用的Edge窗口
+                if debug_port_open():
+                    self.log_output("✅ Edge调试模式已在运行（端口9222），无需重新启动")
+                    return
                 
                 # 查找启动脚本
                 batch_file = os.path.join(os.path.dirname(__file__), '启动Edge调试模式.bat')
@@ -479,22 +484,14 @@ class ModernSubtitleExtractorGUI:
                     subprocess.Popen([batch_file], shell=True)
                     self.log_output("✅ Edge调试模式已启动（使用脚本）")
                 else:
-                    # 手动启动命令 - 使用默认用户数据目录
-                    edge_paths = [
-                        r'C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe',
-                        r'C:\Program Files\Microsoft\Edge\Application\msedge.exe'
-                    ]
-                    
-                    edge_exe = None
-                    for path in edge_paths:
-                        if os.path.exists(path):
-                            edge_exe = path
-                            break
+                    # 手动启动命令 - 使用默认用户数据目录（按平台查找Edge安装路径）
+                    browser = ChromiumBrowser('edge')
+                    edge_exe = browser.find_executable()
                     
                     if edge_exe:
                         # 使用默认用户数据目录启动调试模式
-                        cmd = f'"{edge_exe}" --remote-debugging-port=9222 --user-data-dir="%USERPROFILE%\\AppData\\Local\\Microsoft\\Edge\\User Data" --profile-directory=Default'
-                        subprocess.Popen(cmd, shell=True)
+                        subprocess.Popen([edge_exe, '--remote-debugging-port=9222',
+                                          f'--user-data-dir={browser.user_data_dir}', '--profile-directory=Default'])
                         self.log_output("✅ Edge调试模式已启动（手动命令）")
                     else:
                         self.log_output("⚠️ 未找到Edge浏览器安装路径")
@@ -504,12 +501,7 @@ class ModernSubtitleExtractorGUI:
                 
                 # 检测Edge是否成功启动
                 try:
-                    import socket
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    result = sock.connect_ex(('127.0.0.1', 9222))
-                    sock.close()
-                    
-                    if result == 0:
+                    if debug_port_open():
                         self.log_output("✅ Edge调试端口已开启（端口9222）")
                         self.log_output("📝 使用说明：")
                         self.log_output("1. 如果您之前已经在Edge中登录B站，在新窗口中应该保持登录状态")
@@ -520,6 +512,8 @@ class ModernSubtitleExtractorGUI:
                     else:
                         self.log_output("⚠️ Edge调试端口未检测到，请手动检查浏览器是否启动")
                         self.log_output("💡 如果Edge未启动，请稍等几秒或点击'测试连接'")
+                        self.log_output("💡 已有Edge窗口使用同一用户配置时，新窗口会并入已运行的Edge而不开启调试端口：")
+                        self.log_output("   请先自行关闭Edge窗口后重试，或使用命令行 --fleet 启动使用配置副本的独立实例")
                 except Exception as e:
                     self.log_output("📝 状态检测失败，请手动验证Edge是否启动")
                     
@@ -707,7 +701,8 @@ B站视频字幕提取工具 v{__version__} 使用帮助
                 if mode == 'ai':
                     success = extractor.extract_subtitle_from_url(url, page_num, use_ai=True)
                 elif mode == 'subtitle':
-                    success = extractor.extract_subtitle_from_url(url, page_num, use_ai=False)
+                    success = extractor.extract_subtitle_from_url(url, page_num, use_ai=False,
+                                                                  output_format=output_format)
                 elif mode == 'speech':
                     result = extractor.extract_subtitle_with_speech_recognition(url, model_size)
                     success = result is not None